@@ -0,0 +1,128 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import threading
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+from urllib.parse import urlsplit
+
+import requests
+from requests import Response
+from requests.adapters import HTTPAdapter
+
+from config import ConfigClass
+
+# seconds or (connect, read) seconds, None waits forever
+Timeout = Optional[Union[float, Tuple[float, Optional[float]]]]
+
+DEFAULT_POOL_SIZE = 16
+# as with plain requests calls there is no timeout unless the endpoint has its own one
+DEFAULT_TIMEOUT: Timeout = None
+
+ENDPOINT_TIMEOUTS: Dict[str, Timeout] = {
+    ConfigClass.DATA_OPS_UT_V2 + 'resource/lock': (5, 30),
+    # listing of large folders
+    ConfigClass.NEO4J_SERVICE_V1 + 'relations/query': (5, 120),
+    ConfigClass.NEO4J_SERVICE_V2 + 'nodes/query': (5, 120),
+}
+
+
+class HttpClient:
+    """Keep-alive http sessions for service calls, one session with its own connection pool per service host.
+
+    Timeout is taken from the longest endpoint prefix matching the url, unless it is passed explicitly. Sessions
+    are shared with the log shipper thread, so sessions replaced by configure() are closed only by close().
+    """
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        timeouts: Optional[Dict[str, Timeout]] = None,
+    ) -> None:
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+
+        self._sessions: Dict[str, requests.Session] = {}
+        # replaced sessions may still serve requests started before configure()
+        self._retired_sessions: List[requests.Session] = []
+        self._lock = threading.Lock()
+
+    def configure(self, pool_size: int) -> None:
+        """Resize connection pools to match the number of threads calling the services."""
+
+        with self._lock:
+            self.pool_size = max(pool_size, DEFAULT_POOL_SIZE)
+            self._retired_sessions.extend(self._sessions.values())
+            self._sessions.clear()
+
+    def get_session(self, url: str) -> requests.Session:
+        parts = urlsplit(url)
+        host = f'{parts.scheme}://{parts.netloc}'
+
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+
+        return session
+
+    def get_timeout(self, url: str) -> Timeout:
+        prefixes = [prefix for prefix in self.timeouts if url.startswith(prefix)]
+        if not prefixes:
+            return self.timeout
+
+        return self.timeouts[max(prefixes, key=len)]
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        kwargs.setdefault('timeout', self.get_timeout(url))
+        return self.get_session(url).request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> Response:
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> Response:
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> Response:
+        return self.request('DELETE', url, **kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            sessions = [*self._sessions.values(), *self._retired_sessions]
+            self._sessions.clear()
+            self._retired_sessions.clear()
+
+        for session in sessions:
+            session.close()
+
+
+http = HttpClient(timeouts=ENDPOINT_TIMEOUTS)
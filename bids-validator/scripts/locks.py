@@ -18,9 +18,22 @@
 # permissions and limitations under the Licence.
 # 
 
-import requests
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
 
 from config import ConfigClass
+from http_client import http
+
+READ = 'read'
+WRITE = 'write'
+# hierarchical locks, subtree operation locks the key with every key below it and every ancestor gets intent lock
+SUBTREE_READ = 'subtree_read'
+SUBTREE_WRITE = 'subtree_write'
+INTENT_READ = 'intent_read'
+INTENT_WRITE = 'intent_write'
 
 
 def get_children_nodes(start_geid, start_label="Folder"):
@@ -32,7 +45,7 @@ def get_children_nodes(start_geid, start_label="Folder"):
     }
 
     node_query_url = ConfigClass.NEO4J_SERVICE_V1 + "relations/query"
-    response = requests.post(node_query_url, json=payload)
+    response = http.post(node_query_url, json=payload)
     ffs = [x.get("end_node") for x in response.json()]
 
     return ffs
@@ -47,7 +60,7 @@ def lock_resource(resource_key:str, operation:str) -> dict:
         "operation": operation
     }
 
-    response = requests.post(url, json=post_json)
+    response = http.post(url, json=post_json)
     if response.status_code != 200:
         raise Exception("resource %s already in used"%resource_key)
 
@@ -63,16 +76,100 @@ def unlock_resource(resource_key:str, operation:str) -> dict:
         "operation": operation
     }
     
-    response = requests.delete(url, json=post_json)
+    response = http.delete(url, json=post_json)
     if response.status_code != 200:
         raise Exception("Error when unlock resource %s"%resource_key)
 
     return response.json()
 
 
-def recursive_lock(dataset_geids:str):
+def get_parent_keys(resource_key: str) -> List[str]:
+    """Return keys of all ancestors starting from the bucket, 'core-code/a/b' has 'core-code' and 'core-code/a'."""
+
+    parts = resource_key.split('/')
+    return ['/'.join(parts[:depth]) for depth in range(1, len(parts))]
+
+
+# same as get_hierarchical_keys in filecopy/scripts/locks.py, the image is built from this directory only
+def get_hierarchical_keys(keys: Iterable[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Replace read or write lock of every node with subtree locks of the topmost keys and intent locks above them.
+
+    The number of keys depends on the number of subtrees and their depth rather than on the number of nodes. A read
+    subtree with a write key below it is locked for write as a whole.
+    """
+
+    roots: Dict[str, str] = {}
+    for resource_key, operation in sorted(keys, key=lambda key: key[0].count('/')):
+        parent = next((key for key in get_parent_keys(resource_key) if key in roots), None)
+        if parent is None:
+            if roots.get(resource_key) != WRITE:
+                roots[resource_key] = operation
+        elif operation == WRITE:
+            roots[parent] = WRITE
+
+    intents: Dict[str, str] = {}
+    for resource_key, operation in roots.items():
+        for parent in get_parent_keys(resource_key):
+            # intent write blocks everything intent read does
+            if intents.get(parent) != INTENT_WRITE:
+                intents[parent] = INTENT_WRITE if operation == WRITE else INTENT_READ
+
+    hierarchical_keys = list(intents.items())
+    for resource_key, operation in roots.items():
+        hierarchical_keys.append((resource_key, SUBTREE_WRITE if operation == WRITE else SUBTREE_READ))
+    return sorted(hierarchical_keys, key=lambda key: (key[0].count('/'), key[0]))
+
+
+def get_node_resource_key(node: dict) -> Optional[str]:
+    """Return lock key of the node or None for the name folder which is not locked."""
+
+    # conner case here, we DONT lock the name folder
+    if node.get("display_path") == node.get("uploader"):
+        return None
+
+    bucket = node.get("dataset_code")
+    minio_obj_path = node.get("display_path")
+    # note here the dataset and project are using same class
+    # two file have different attribte so here I just use `location``
+    if not minio_obj_path:
+        if "File" in node.get('labels'):
+            minio_path = node.get('location').split("//")[-1]
+            _, bucket, minio_obj_path = tuple(minio_path.split("/", 2))
+        else:
+            minio_obj_path = "%s/%s" % (node.get('folder_relative_path'), node.get('name'))
+
+    return "{}/{}".format(bucket, minio_obj_path)
+
+
+def get_lock_keys(nodes: List[dict], hierarchical: bool = False) -> List[Tuple[str, str]]:
+    """Recursively trace down the node tree and return read lock keys of all nodes.
+
+    In hierarchical mode children of the locked node are not walked, they are covered by its subtree lock.
+    """
+
+    keys = []
+    for node in nodes:
+        # we will skip the deleted nodes
+        if node.get("archived", False):
+            continue
+
+        resource_key = get_node_resource_key(node)
+        if resource_key is not None:
+            keys.append((resource_key, READ))
+            if hierarchical:
+                continue
+
+        # open the next recursive loop if it is folder
+        if 'Folder' in node.get("labels"):
+            keys.extend(get_lock_keys(get_children_nodes(node.get("global_entity_id", None)), hierarchical))
+
+    return keys
+
+
+def recursive_lock(dataset_geids: str, hierarchical: bool = False):
     '''
-    the function will recursively lock the node tree
+    the function will recursively lock the node tree, in hierarchical mode
+    only the top level nodes are locked together with everything below them
     '''
 
     # this is for crash recovery, if something trigger the exception
@@ -81,51 +178,20 @@ def recursive_lock(dataset_geids:str):
     # then it will affect the processing one.
     locked_node, err = [], None
 
-    def recur_walker(currenct_nodes, new_name=None):
-        '''
-        recursively trace down the node tree and run the lock function
-        '''
-
-        for ff_object in currenct_nodes:
-            # we will skip the deleted nodes
-            if ff_object.get("archived", False):
-                continue
-            
-            # conner case here, we DONT lock the name folder
-            # for the copy we will lock the both source and target
-            if ff_object.get("display_path") != ff_object.get("uploader"):
-                bucket = ff_object.get("dataset_code")
-                minio_obj_path = ff_object.get("display_path")
-                # note here the dataset and project are using same class
-                # two file have different attribte so here I just use `location``
-                if not minio_obj_path:
-                    if "File" in ff_object.get('labels'):
-                        minio_path = ff_object.get('location').split("//")[-1]
-                        _, bucket, minio_obj_path = tuple(minio_path.split("/", 2))
-                    else:
-                        bucket = ff_object.get('dataset_code')
-                        minio_obj_path = "%s/%s"%(ff_object.get('folder_relative_path'), 
-                            ff_object.get('name'))
-
-                source_key = "{}/{}".format(bucket, minio_obj_path)
-                lock_resource(source_key, "read")
-                locked_node.append((source_key, "read"))
-
-            # open the next recursive loop if it is folder
-            if 'Folder' in ff_object.get("labels"):
-                children_nodes = get_children_nodes(ff_object.get("global_entity_id", None))
-                recur_walker(children_nodes)
-
-        return
-
     # start here
     try:
         # slightly different here, since the download only gives
         # the folder/file geid. then I have to get node by geid so
         # that we can get the path/
         nodes = get_children_nodes(dataset_geids, start_label="Dataset")
-        
-        recur_walker(nodes)
+
+        keys = get_lock_keys(nodes, hierarchical)
+        if hierarchical:
+            keys = get_hierarchical_keys(keys)
+
+        for resource_key, operation in keys:
+            lock_resource(resource_key, operation)
+            locked_node.append((resource_key, operation))
     except Exception as e:
         err = e
 
@@ -18,17 +18,134 @@
 # permissions and limitations under the Licence.
 # 
 
+import base64
+import hashlib
+import json
+import threading
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Optional
+
 import requests
 from minio import Minio
 from minio.commonconfig import Tags
 import os
 import time
 import datetime
+from minio.credentials import Credentials
 from minio.credentials.providers import ClientGrantsProvider
+from minio.credentials.providers import Provider
 from minio.commonconfig import REPLACE, CopySource
 from config import ConfigClass
 
 
+# cached credentials are refreshed in the background this long before they expire
+CREDENTIALS_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+
+def get_token_subject(access_token: str) -> str:
+    """Return user of the access token, the hash of the token is used if it can not be decoded."""
+
+    token = access_token.replace("Bearer ", "")
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return claims["sub"]
+    except (IndexError, KeyError, TypeError, ValueError):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+
+def get_credentials_expiration(credentials: Credentials) -> Optional[datetime.datetime]:
+    # minio 7.0 keeps expiration only as a private attribute, later versions expose it, both in utc without timezone
+    return getattr(credentials, "expiration", getattr(credentials, "_expiration", None))
+
+
+class CachedCredentialsProvider(Provider):
+    """Share STS credentials of one user between all minio clients of the process.
+
+    Credentials are refreshed from a background timer before they expire, so requests of the clients do not wait
+    for the token exchange and the STS call.
+    """
+
+    def __init__(
+        self,
+        jwt_provider_func: Callable[[], Dict[str, Any]],
+        sts_endpoint: str,
+        refresh_margin: datetime.timedelta = CREDENTIALS_REFRESH_MARGIN,
+    ) -> None:
+        self.jwt_provider_func = jwt_provider_func
+        self.sts_endpoint = sts_endpoint
+        self.refresh_margin = refresh_margin
+
+        self._credentials: Optional[Credentials] = None
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    @property
+    def is_valid(self) -> bool:
+        """Check if credentials were already retrieved and are not expired."""
+
+        credentials = self._credentials
+        return credentials is not None and not credentials.is_expired()
+
+    def _refresh(self) -> Credentials:
+        credentials = ClientGrantsProvider(self.jwt_provider_func, self.sts_endpoint).retrieve()
+        self._credentials = credentials
+
+        expiration = get_credentials_expiration(credentials)
+        if expiration is not None:
+            lifetime = (expiration - datetime.datetime.utcnow()).total_seconds()
+            delay = lifetime - self.refresh_margin.total_seconds()
+            if delay <= 0:
+                # short lived credentials are refreshed in the middle of their lifetime
+                delay = lifetime / 2
+
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(max(delay, 0), self._refresh_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+
+        return credentials
+
+    def _refresh_in_background(self) -> None:
+        try:
+            with self._lock:
+                self._refresh()
+        except Exception as e:
+            # credentials are retrieved again by the next request once they expire
+            print(f"Unable to refresh minio credentials: {e}")
+
+    def retrieve(self) -> Credentials:
+        with self._lock:
+            if not self.is_valid:
+                return self._refresh()
+
+            return self._credentials
+
+
+_credentials_providers: Dict[str, CachedCredentialsProvider] = {}
+_credentials_providers_lock = threading.Lock()
+
+
+def get_cached_credentials_provider(
+    access_token: str, jwt_provider_func: Callable[[], Dict[str, Any]], sts_endpoint: str
+) -> CachedCredentialsProvider:
+    """Return credentials provider shared by all clients of the token user."""
+
+    key = f"{sts_endpoint}/{get_token_subject(access_token)}"
+    with _credentials_providers_lock:
+        provider = _credentials_providers.get(key)
+        if provider is None:
+            provider = _credentials_providers[key] = CachedCredentialsProvider(jwt_provider_func, sts_endpoint)
+        elif not provider.is_valid:
+            # tokens of the new client are more recent, so they are used for the next token exchange
+            provider.jwt_provider_func = jwt_provider_func
+
+    return provider
+
+
 class Minio_Client_():
 
     def __init__(self, access_token, refresh_token):
@@ -36,8 +153,9 @@ class Minio_Client_():
         self.access_token = access_token
         self.refresh_token = refresh_token
         
-        # retrieve credential provide with tokens
+        # retrieve credential provide with tokens, credentials of the same user are shared between clients
         c = self.get_provider()
+        is_credentials_valid = c.is_valid
 
         self.client = Minio(
             ConfigClass.MINIO_ENDPOINT, 
@@ -45,8 +163,9 @@ class Minio_Client_():
             secure=ConfigClass.MINIO_HTTPS)
 
         # add a sanity check for the token to see if the token
-        # is expired
-        self.client.list_buckets()
+        # is expired, cached credentials were already checked by previous client
+        if not is_credentials_valid:
+            self.client.list_buckets()
 
 
     # function helps to get new token/refresh the token
@@ -80,7 +199,8 @@ class Minio_Client_():
     def get_provider(self):
         minio_http = ("https://" if ConfigClass.MINIO_HTTPS else "http://") + ConfigClass.MINIO_ENDPOINT
         # print(minio_http)
-        provider = ClientGrantsProvider(
+        provider = get_cached_credentials_provider(
+            self.access_token,
             self._get_jwt,
             minio_http,
         )
@@ -18,7 +18,7 @@
 # permissions and limitations under the Licence.
 # 
 
-import requests
+import atexit
 import subprocess
 import json
 import time
@@ -30,27 +30,34 @@ import traceback
 import shutil
 import os
 
+from http_client import http
+from log_shipper import LogShipper
 from minio_client import Minio_Client_
 from locks import recursive_lock, unlock_resource
 
 TEMP_FOLDER = './dataset/'
+# seconds the job waits at exit for buffered log messages to be sent
+LOG_SHIPPER_CLOSE_TIMEOUT = 10
 
 
 def debug_message_sender(message: str):
     url = ConfigClass.DATA_OPS_UT + "files/actions/message"
     print(url)
-    response = requests.post(url, json={
+    response = http.post(url, json={
         "message": message,
         "channel": "pipelinewatch"
     })
     if response.status_code != 200:
-        logger_info("code: " + str(response.status_code) +
-                    ": " + response.text)
+        print("code: " + str(response.status_code) + ": " + response.text)
     return
 
 
+log_shipper = LogShipper(debug_message_sender)
+atexit.register(log_shipper.close, LOG_SHIPPER_CLOSE_TIMEOUT)
+
+
 def logger_info(message: str):
-    debug_message_sender(message)
+    log_shipper.log(message)
     print(message)
 
 
@@ -68,6 +75,9 @@ def parse_inputs() -> dict:
                         help='Refresh Token', required=True)
     parser.add_argument('-access', '--access-token',
                         help='Access Token', required=True)
+    parser.add_argument('-hl', '--hierarchical-locks',
+                        help='Lock top level nodes of the dataset with everything below them instead of every node',
+                        action='store_true')
 
     arguments = vars(parser.parse_args())
     return arguments
@@ -97,7 +107,7 @@ def send_message(dataset_geid, status, bids_output) -> None:
         post_json["payload"]["error_msg"] = bids_output
 
     try:
-        queue_res = requests.post(queue_url, json=post_json)
+        queue_res = http.post(queue_url, json=post_json)
         if queue_res.status_code != 200:
             logger_info("code: " + str(queue_res.status_code) +
                         ": " + queue_res.text)
@@ -122,7 +132,7 @@ def get_files_recursive(dataset_geid, folder_geid=None, all_files=None) -> list:
         query["folder_geid"] = folder_geid
 
     try:
-        resp = requests.get(ConfigClass.DATASET_SERVICE +
+        resp = http.get(ConfigClass.DATASET_SERVICE +
                             "/dataset/{}/files".format(dataset_geid), params=query)
         for node in resp.json()["result"]['data']:
             if "File" in node["labels"]:
@@ -197,7 +207,7 @@ def main():
         locked_node = []
         files_locations = get_files_recursive(dataset_geid)
         # here add recursive read lock on the dataset
-        locked_node, err = recursive_lock(dataset_geid)
+        locked_node, err = recursive_lock(dataset_geid, args['hierarchical_locks'])
         if err: raise err
 
         if len(files_locations) == 0:
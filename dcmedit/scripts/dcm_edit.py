@@ -37,7 +37,7 @@ import subprocess
 import shutil
 import json
 import io
-import requests
+from http_client import http
 from minio_client import Minio_Client_
 from config import ConfigClass
 from lock import ConfigClass, lock_resource, unlock_resource
@@ -239,7 +239,7 @@ def main(env):
                     "location": args["input_file"],
                 }
             }
-            response = requests.post(
+            response = http.post(
                 ConfigClass.NEO4J_SERVICE_V1 + "relations/query", json=payload)
             if response.json():
                 parent_folder = response.json(
@@ -255,7 +255,7 @@ def main(env):
             payload = {
                 "location": args["input_file"]
             }
-            response = requests.post(ConfigClass.NEO4J_SERVICE_V1 + "nodes/File/query", json=payload)
+            response = http.post(ConfigClass.NEO4J_SERVICE_V1 + "nodes/File/query", json=payload)
             input_node = response.json()[0]
             LOGGER.debug(f'Got parent node {input_node}')
         except Exception as e:
@@ -18,8 +18,8 @@
 # permissions and limitations under the Licence.
 # 
 
-import requests
 from config import ConfigClass
+from http_client import http
 
 def lock_resource(resource_key:str, operation:str) -> dict:
     # operation can be either read or write
@@ -30,7 +30,7 @@ def lock_resource(resource_key:str, operation:str) -> dict:
         "operation": operation
     }
 
-    response = requests.post(url, json=post_json)
+    response = http.post(url, json=post_json)
     if response.status_code != 200:
         raise Exception("resource %s already in used"%resource_key)
 
@@ -46,7 +46,7 @@ def unlock_resource(resource_key:str, operation:str) -> dict:
         "operation": operation
     }
     
-    response = requests.delete(url, json=post_json)
+    response = http.delete(url, json=post_json)
     if response.status_code != 200:
         raise Exception("Error when unlock resource %s"%resource_key)
 
@@ -25,10 +25,10 @@ from typing import Dict
 from typing import Optional
 from typing import Tuple
 
-import requests
 from requests import Response
 
 from config import ConfigClass
+from http_client import http
 
 def get_children_nodes(start_geid):
 
@@ -39,7 +39,7 @@ def get_children_nodes(start_geid):
     }
 
     node_query_url = ConfigClass.NEO4J_SERVICE_V1 + "relations/query"
-    response = requests.post(node_query_url, json=payload)
+    response = http.post(node_query_url, json=payload)
     ffs = [x.get("end_node") for x in response.json()]
 
     return ffs
@@ -71,7 +71,7 @@ def create_file_node(
         extra_fields = {}
 
     # fecth the geid from common service
-    geid = requests.get(ConfigClass.COMMON_SERVICE+"utility/id").json().get("result")
+    geid = http.get(ConfigClass.COMMON_SERVICE+"utility/id").json().get("result")
     file_name = new_name if new_name else source_file.get("name")
     # format minio object path
     fuf_path = relative_path+"/"+file_name
@@ -121,7 +121,7 @@ def create_node_with_parent(node_label, node_property, parent_id) -> Tuple[dict,
     # - create_time: neo4j timeobject (API will create but not passed in api)
     # - location: indicate the minio location as minio://http://<domain>/object
     create_node_url = ConfigClass.NEO4J_SERVICE_V1 + 'nodes/' + node_label
-    response = requests.post(create_node_url, json=node_property)
+    response = http.post(create_node_url, json=node_property)
     new_node = response.json()[0]
 
     # now create the relationship
@@ -140,6 +140,6 @@ def create_relation(start_id:int, end_id:int, label="own") -> dict:
     '''
 
     create_node_url = ConfigClass.NEO4J_SERVICE_V1 + 'relations/%s'%(label)
-    new_relation = requests.post(create_node_url, json={"start_id": start_id, "end_id": end_id})
+    new_relation = http.post(create_node_url, json={"start_id": start_id, "end_id": end_id})
 
     return new_relation
\ No newline at end of file
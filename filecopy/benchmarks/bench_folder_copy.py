@@ -0,0 +1,325 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+"""Run folder copy end to end against in-process stand-ins of neo4j, utility, data ops, provenance, cataloguing,
+entityinfo and minio with configurable latencies.
+
+Stand-ins run in the same process as the pipeline, so results are meant for comparing settings and call counts
+rather than as absolute timings. The benchmark needs the pipeline requirements installed, for example:
+
+    python benchmarks/bench_folder_copy.py --width 4 --depth 3 --files 20 --workers 1 8 16 --latency neo4j=20
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import uuid
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+PIPELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, PIPELINE_DIR)
+sys.path.insert(0, os.path.join(PIPELINE_DIR, 'scripts'))
+
+# placeholder settings, service urls are replaced with the stand-in ones before every run
+from benchmarks.settings import set_placeholder_settings  # noqa: E402
+
+set_placeholder_settings()
+
+from benchmarks.fakes import FakeCataloguing  # noqa: E402
+from benchmarks.fakes import FakeDataOps  # noqa: E402
+from benchmarks.fakes import FakeEntityInfo  # noqa: E402
+from benchmarks.fakes import FakeMinio  # noqa: E402
+from benchmarks.fakes import FakeMinioClient  # noqa: E402
+from benchmarks.fakes import FakeNeo4j  # noqa: E402
+from benchmarks.fakes import FakeProvenance  # noqa: E402
+from benchmarks.fakes import FakeService  # noqa: E402
+from benchmarks.fakes import FakeUtility  # noqa: E402
+from config import ConfigClass  # noqa: E402
+import folder_copy  # noqa: E402
+from plan import format_size  # noqa: E402
+from tracing import tracer  # noqa: E402
+from utils import log_shipper  # noqa: E402
+
+PROJECT_CODE = 'bench'
+OPERATOR = 'admin'
+SERVICES = ('neo4j', 'utility', 'data-ops', 'provenance', 'cataloguing', 'entityinfo', 'minio')
+
+
+def new_geid() -> str:
+    return f'{uuid.uuid4()}-{int(time.time())}'
+
+
+class Environment:
+    """Stand-in services with the synthetic source tree, ConfigClass points to them while the environment is open."""
+
+    def __init__(self, latencies: Optional[Dict[str, float]] = None, minio_throughput: Optional[float] = None) -> None:
+        if latencies is None:
+            latencies = {}
+
+        self.neo4j = FakeNeo4j(latencies.get('neo4j', 0.0))
+        self.utility = FakeUtility(latencies.get('utility', 0.0))
+        self.data_ops = FakeDataOps(latencies.get('data-ops', 0.0))
+        self.provenance = FakeProvenance(latencies.get('provenance', 0.0))
+        self.cataloguing = FakeCataloguing(latencies.get('cataloguing', 0.0))
+        self.entityinfo = FakeEntityInfo(latencies.get('entityinfo', 0.0))
+        self.minio = FakeMinio(latencies.get('minio', 0.0), minio_throughput)
+
+        self.source: Optional[Dict[str, Any]] = None
+        self.destination: Optional[Dict[str, Any]] = None
+        self.files = 0
+        self.folders = 0
+
+        self._settings: Dict[str, str] = {}
+
+    @property
+    def services(self) -> List[FakeService]:
+        return [self.neo4j, self.utility, self.data_ops, self.provenance, self.cataloguing, self.entityinfo]
+
+    def __enter__(self) -> 'Environment':
+        for service in self.services:
+            service.start()
+
+        settings = {
+            'NEO4J_SERVICE_V1': f'{self.neo4j.url}/v1/neo4j/',
+            'NEO4J_SERVICE_V2': f'{self.neo4j.url}/v2/neo4j/',
+            'COMMON_SERVICE': f'{self.utility.url}/v1/',
+            'DATA_OPS_UT_V1': f'{self.data_ops.url}/v1/',
+            'DATA_OPS_UT_V2': f'{self.data_ops.url}/v2/',
+            'PROVENANCE_SERVICE': f'{self.provenance.url}/v1/',
+            'CATALOGUING_SERVICE_V2': f'{self.cataloguing.url}/v2/',
+            'ENTITY_INFO_SERVICE': f'{self.entityinfo.url}/v1/',
+        }
+        for name, value in settings.items():
+            self._settings[name] = getattr(ConfigClass, name)
+            setattr(ConfigClass, name, value)
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        for name, value in self._settings.items():
+            setattr(ConfigClass, name, value)
+
+        for service in self.services:
+            service.stop()
+
+    def get_calls(self) -> Dict[str, int]:
+        calls = {service.name: service.calls for service in self.services}
+        calls['minio'] = self.minio.calls
+        return calls
+
+    def create_tree(self, width: int, depth: int, files: int, file_size: int) -> None:
+        """Create project, source folder tree in greenroom and destination name folder in core.
+
+        Every folder has number of subfolders equal to width down to the depth and number of files in every folder.
+        """
+
+        self.neo4j.add_node('Container', {'code': PROJECT_CODE, 'name': PROJECT_CODE, 'global_entity_id': new_geid()})
+
+        minio_url = ('https://' if ConfigClass.MINIO_HTTPS else 'http://') + ConfigClass.MINIO_ENDPOINT
+        common = {'project_code': PROJECT_CODE, 'uploader': OPERATOR, 'tags': []}
+
+        self.destination = self.neo4j.add_node(
+            'Folder',
+            {
+                **common,
+                'name': OPERATOR,
+                'global_entity_id': new_geid(),
+                'folder_relative_path': '',
+                'folder_level': 0,
+                'display_path': OPERATOR,
+                'extra_labels': [ConfigClass.CORE_ZONE_LABEL],
+            },
+        )
+
+        def add_folder(parent: Optional[Dict[str, Any]], name: str, relative_path: str) -> Dict[str, Any]:
+            self.folders += 1
+            return self.neo4j.add_node(
+                'Folder',
+                {
+                    **common,
+                    'name': name,
+                    'global_entity_id': new_geid(),
+                    'folder_relative_path': relative_path,
+                    'folder_level': relative_path.count('/') + 1,
+                    'display_path': f'{relative_path}/{name}',
+                    'extra_labels': [ConfigClass.GR_ZONE_LABEL],
+                },
+                parent,
+            )
+
+        def add_files(folder: Dict[str, Any]) -> None:
+            for index in range(files):
+                display_path = f'{folder["display_path"]}/file-{index}.dat'
+                self.neo4j.add_node(
+                    'File',
+                    {
+                        **common,
+                        'name': f'file-{index}.dat',
+                        'global_entity_id': new_geid(),
+                        'display_path': display_path,
+                        'location': f'minio://{minio_url}/gr-{PROJECT_CODE}/{display_path}',
+                        'file_size': file_size,
+                        'extra_labels': [ConfigClass.GR_ZONE_LABEL],
+                    },
+                    folder,
+                )
+                self.minio.objects[(f'gr-{PROJECT_CODE}', display_path)] = file_size
+                self.files += 1
+
+        self.source = add_folder(None, 'source', OPERATOR)
+        stack = [(self.source, 0)]
+        while stack:
+            folder, level = stack.pop()
+            add_files(folder)
+            if level < depth:
+                for index in range(width):
+                    stack.append((add_folder(folder, f'folder-{level + 1}-{index}', folder['display_path']), level + 1))
+
+
+def run(
+    width: int,
+    depth: int,
+    files: int,
+    file_size: int,
+    workers: int,
+    metadata_workers: int,
+    latencies: Optional[Dict[str, float]] = None,
+    minio_throughput: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Copy a fresh synthetic tree once and return the measurements."""
+
+    with Environment(latencies, minio_throughput) as environment:
+        environment.create_tree(width, depth, files, file_size)
+
+        tracer.reset()
+        original_minio_client = folder_copy.Minio_Client_
+        folder_copy.Minio_Client_ = lambda *args, **kwargs: FakeMinioClient(environment.minio)
+        start = time.perf_counter()
+        try:
+            # the pipeline prints every step, only the benchmark report is shown
+            with contextlib.redirect_stdout(io.StringIO()):
+                folder_copy.copy_execute(
+                    environment.destination['global_entity_id'],
+                    environment.source['global_entity_id'],
+                    PROJECT_CODE,
+                    OPERATOR,
+                    None,
+                    {'at': '', 'rt': ''},
+                    workers,
+                    metadata_workers,
+                )
+        finally:
+            elapsed = time.perf_counter() - start
+            folder_copy.Minio_Client_ = original_minio_client
+            log_shipper.flush()
+
+        copied = environment.neo4j.find({'labels': ['File', ConfigClass.CORE_ZONE_LABEL]})
+
+        return {
+            'workers': workers,
+            'files': environment.files,
+            'folders': environment.folders,
+            'copied': len(copied),
+            'elapsed': elapsed,
+            'calls': environment.get_calls(),
+            'summary': tracer.format_summary(),
+        }
+
+
+def format_result(result: Dict[str, Any]) -> List[str]:
+    files = result['files']
+    calls = result['calls']
+    lines = [
+        f'workers={result["workers"]} files={files} folders={result["folders"]} copied={result["copied"]} '
+        f'elapsed={result["elapsed"]:.2f}s files/s={files / result["elapsed"]:.1f}',
+        f'  calls per file: {sum(calls.values()) / files:.2f} total'
+        + ''.join(f', {calls[name] / files:.2f} {name}' for name in SERVICES if calls.get(name)),
+    ]
+    return lines
+
+
+def parse_latency(value: str) -> Dict[str, float]:
+    service, _, milliseconds = value.partition('=')
+    if service not in SERVICES or not milliseconds:
+        raise argparse.ArgumentTypeError(f'expected <service>=<ms> with service one of {", ".join(SERVICES)}')
+
+    return {service: float(milliseconds) / 1000}
+
+
+def parse_inputs():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--width', type=int, default=3, help='Number of subfolders in every folder')
+    parser.add_argument('--depth', type=int, default=2, help='Number of folder levels below the source folder')
+    parser.add_argument('--files', type=int, default=10, help='Number of files in every folder')
+    parser.add_argument('--file-size', type=int, default=1024 * 1024, help='Size of every file in bytes')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8], help='Number of copy workers to compare')
+    parser.add_argument('--metadata-workers', type=int, default=8, help='Number of metadata workers')
+    parser.add_argument(
+        '--latency',
+        type=parse_latency,
+        action='append',
+        default=[],
+        help='Latency of service calls in milliseconds, for example neo4j=20 (repeatable)',
+    )
+    parser.add_argument(
+        '--minio-throughput', type=float, default=None, help='Minio copy throughput in bytes per second'
+    )
+    parser.add_argument('--summary', action='store_true', help='Print latency summary of every endpoint')
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_inputs()
+
+    latencies = {}
+    for latency in args.latency:
+        latencies.update(latency)
+
+    print(
+        f'tree: width={args.width} depth={args.depth} files per folder={args.files} '
+        f'file size={format_size(args.file_size)} latencies={latencies}'
+    )
+    for workers in args.workers:
+        result = run(
+            args.width,
+            args.depth,
+            args.files,
+            args.file_size,
+            workers,
+            args.metadata_workers,
+            latencies,
+            args.minio_throughput,
+        )
+        for line in format_result(result):
+            print(line)
+        if args.summary:
+            for line in result['summary']:
+                print(f'  {line}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+
+"""Compare one lock per node with hierarchical locks for concurrent jobs against the reference lock server.
+
+Every job locks one folder of a synthetic tree with everything below it, for read or for write. Jobs pick folders at
+random, so some of them overlap and are rejected by the lock server. While a job holds its locks every node of its
+subtree is marked, a node marked for write by two jobs or for read and write at the same time is a violation. The
+reference server can also run on its own for manual testing of the pipelines:
+
+    python benchmarks/bench_locks.py --jobs 32 --width 3 --depth 3 --files 20 --latency 5
+    python benchmarks/bench_locks.py --serve 5063
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import threading
+import time
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+PIPELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, PIPELINE_DIR)
+sys.path.insert(0, os.path.join(PIPELINE_DIR, 'scripts'))
+
+# placeholder settings, lock service url is replaced with the reference server one before every run
+from benchmarks.settings import set_placeholder_settings  # noqa: E402
+
+set_placeholder_settings()
+
+from benchmarks.fakes import FakeLockService  # noqa: E402
+from config import ConfigClass  # noqa: E402
+from locks import get_hierarchical_keys  # noqa: E402
+from locks import LockSet  # noqa: E402
+
+BUCKET = 'core-bench'
+MODES = ('node', 'hierarchical')
+
+
+def create_tree(width: int, depth: int, files: int) -> Dict[str, List[str]]:
+    """Return paths of every node below each folder of the synthetic tree, the folder itself included."""
+
+    subtrees: Dict[str, List[str]] = {}
+
+    def add_folder(path: str, level: int) -> List[str]:
+        nodes = [path] + [f'{path}/file-{number}.dat' for number in range(files)]
+        if level < depth:
+            for number in range(width):
+                nodes.extend(add_folder(f'{path}/folder-{number}', level + 1))
+        subtrees[path] = nodes
+        return nodes
+
+    for number in range(width):
+        add_folder(f'{BUCKET}/admin/folder-{number}', 1)
+
+    return subtrees
+
+
+class Checker:
+    """Mark nodes held by running jobs and count conflicting holders."""
+
+    def __init__(self) -> None:
+        self.readers: Dict[str, int] = {}
+        self.writers: Dict[str, int] = {}
+        self.violations = 0
+        self._lock = threading.Lock()
+
+    def enter(self, nodes: List[str], write: bool) -> None:
+        with self._lock:
+            for node in nodes:
+                if self.writers.get(node) or (write and self.readers.get(node)):
+                    self.violations += 1
+                holders = self.writers if write else self.readers
+                holders[node] = holders.get(node, 0) + 1
+
+    def exit(self, nodes: List[str], write: bool) -> None:
+        with self._lock:
+            holders = self.writers if write else self.readers
+            for node in nodes:
+                holders[node] -= 1
+
+
+def run(
+    mode: str,
+    jobs: int = 16,
+    width: int = 3,
+    depth: int = 2,
+    files: int = 10,
+    write_ratio: float = 0.5,
+    hold_time: float = 0.01,
+    latency: float = 0.0,
+    lock_workers: int = 16,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Run concurrent jobs against the reference lock server and return counts of the run."""
+
+    subtrees = create_tree(width, depth, files)
+    randomizer = random.Random(seed)
+    plans: List[Tuple[str, bool]] = [
+        (randomizer.choice(sorted(subtrees)), randomizer.random() < write_ratio) for _ in range(jobs)
+    ]
+
+    server = FakeLockService(latency).start()
+    checker = Checker()
+    results: List[bool] = []
+    original_url = ConfigClass.DATA_OPS_UT_V2
+    ConfigClass.DATA_OPS_UT_V2 = f'{server.url}/v2/'
+
+    def job(folder: str, write: bool) -> None:
+        nodes = subtrees[folder]
+        keys = [(node, 'write' if write else 'read') for node in nodes]
+        if mode == 'hierarchical':
+            keys = get_hierarchical_keys(keys)
+
+        lock_set = LockSet(workers=lock_workers)
+        try:
+            lock_set.acquire(keys)
+        except Exception:
+            results.append(False)
+            return
+
+        try:
+            checker.enter(nodes, write)
+            time.sleep(hold_time)
+            checker.exit(nodes, write)
+        finally:
+            lock_set.release()
+        results.append(True)
+
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            threads = [threading.Thread(target=job, args=plan) for plan in plans]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+    finally:
+        elapsed = time.perf_counter() - start
+        ConfigClass.DATA_OPS_UT_V2 = original_url
+        server.stop()
+
+    return {
+        'mode': mode,
+        'jobs': jobs,
+        'nodes': sum(len(subtrees[folder]) for folder, _ in plans),
+        'acquired': sum(results),
+        'rejected': len(results) - sum(results),
+        'requests': server.locks.requests,
+        'max_locks': server.locks.max_locks,
+        'left_locks': len(server.locks),
+        'violations': checker.violations,
+        'elapsed': elapsed,
+    }
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    return (
+        f'{result["mode"]}: jobs={result["jobs"]} acquired={result["acquired"]} rejected={result["rejected"]} '
+        f'lock requests={result["requests"]} ({result["requests"] / result["jobs"]:.1f} per job) '
+        f'max locks={result["max_locks"]} violations={result["violations"]} '
+        f'elapsed={result["elapsed"]:.2f}s jobs/s={result["jobs"] / result["elapsed"]:.1f}'
+    )
+
+
+def serve(port: int, latency: float) -> None:
+    server = FakeLockService(latency).start(port)
+    print(f'Reference lock server is listening on {server.url}/v2/resource/lock')
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+def parse_inputs():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=16, help='Number of concurrent jobs')
+    parser.add_argument('--width', type=int, default=3, help='Number of subfolders in every folder')
+    parser.add_argument('--depth', type=int, default=2, help='Number of folder levels')
+    parser.add_argument('--files', type=int, default=10, help='Number of files in every folder')
+    parser.add_argument('--write-ratio', type=float, default=0.5, help='Share of jobs locking for write')
+    parser.add_argument('--hold-time', type=float, default=10, help='Milliseconds every job holds its locks')
+    parser.add_argument('--latency', type=float, default=0, help='Latency of lock requests in milliseconds')
+    parser.add_argument('--lock-workers', type=int, default=16, help='Number of concurrent lock requests of a job')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random folder choice')
+    parser.add_argument('--serve', type=int, metavar='PORT', help='Only run the reference lock server on the port')
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_inputs()
+
+    if args.serve is not None:
+        serve(args.serve, args.latency / 1000)
+        return
+
+    for mode in MODES:
+        result = run(
+            mode,
+            args.jobs,
+            args.width,
+            args.depth,
+            args.files,
+            args.write_ratio,
+            args.hold_time / 1000,
+            args.latency / 1000,
+            args.lock_workers,
+            args.seed,
+        )
+        print(format_result(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,456 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from datetime import timezone
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Pattern
+from typing import Tuple
+
+Handler = Callable[..., Tuple[int, Any]]
+
+
+class FakeService:
+    """In-process http service answering json requests after the injected latency.
+
+    Routes are matched by method and regular expression of the path, named groups are passed to the handler together
+    with the json body and query string.
+    """
+
+    name = 'service'
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls = 0
+        self.routes: List[Tuple[str, Pattern, Handler]] = []
+
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def route(self, method: str, pattern: str, handler: Handler) -> None:
+        self.routes.append((method, re.compile(f'^{pattern}$'), handler))
+
+    def dispatch(self, method: str, path: str, body: Any) -> Tuple[int, Any]:
+        with self._lock:
+            self.calls += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        path, _, query = path.partition('?')
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if route_method == method and match:
+                return handler(body=body, query=query, **match.groupdict())
+
+        return 404, {'error': f'{method} {path} is not found'}
+
+    def start(self, port: int = 0) -> 'FakeService':
+        service = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            # keep-alive connections, same as the real services behind the pooled sessions
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def handle_request(self) -> None:
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+
+                status, result = service.dispatch(self.command, self.path, body)
+
+                payload = json.dumps(result).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_DELETE = handle_request
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+        class Server(ThreadingHTTPServer):
+            # many jobs with concurrent requests connect at the same time
+            request_queue_size = 1024
+
+        self._server = Server(('127.0.0.1', port), RequestHandler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name=f'fake-{self.name}', daemon=True)
+        self._thread.start()
+
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def get_time() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+class FakeNeo4j(FakeService):
+    """Node and relation store behind the subset of neo4j service api used by the pipelines."""
+
+    name = 'neo4j'
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__(latency)
+
+        self.nodes: Dict[int, Dict[str, Any]] = {}
+        self.geids: Dict[str, int] = {}
+        self.children: Dict[int, List[int]] = {}
+        self._ids = 0
+        self._store_lock = threading.Lock()
+
+        self.route('GET', r'/v1/neo4j/nodes/geid/(?P<geid>[^/]+)', self.get_node_by_geid)
+        self.route('POST', r'/v1/neo4j/nodes/(?P<label>[^/]+)/query', self.query_nodes)
+        self.route('PUT', r'/v1/neo4j/nodes/(?P<label>[^/]+)/node/(?P<node_id>\d+)', self.update_node)
+        self.route('POST', r'/v1/neo4j/nodes/(?P<label>[^/]+)', self.create_node)
+        self.route('POST', r'/v1/neo4j/relations/own', self.create_relation)
+        self.route('POST', r'/v1/neo4j/relations/query', self.query_relations)
+        self.route('POST', r'/v2/neo4j/nodes/query', self.query_nodes_v2)
+
+    def add_node(
+        self, label: str, properties: Dict[str, Any], parent: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        properties = dict(properties)
+        extra_labels = properties.pop('extra_labels', None) or []
+
+        with self._store_lock:
+            self._ids += 1
+            now = get_time()
+            node = {
+                'archived': False,
+                'time_created': now,
+                'time_lastmodified': now,
+                **properties,
+                'id': self._ids,
+                'labels': [label] + extra_labels,
+            }
+            self.nodes[node['id']] = node
+            self.geids[node['global_entity_id']] = node['id']
+            if parent is not None:
+                self.children.setdefault(parent['id'], []).append(node['id'])
+
+        return node
+
+    def matches(self, node: Dict[str, Any], query: Dict[str, Any]) -> bool:
+        for key, value in query.items():
+            if key == 'labels':
+                if not all(label in node['labels'] for label in value):
+                    return False
+            elif node.get(key) != value:
+                return False
+        return True
+
+    def find(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with self._store_lock:
+            return [node for node in self.nodes.values() if self.matches(node, query)]
+
+    def get_node_by_geid(self, geid: str, **kwargs) -> Tuple[int, Any]:
+        node_id = self.geids.get(geid)
+        return 200, [self.nodes[node_id]] if node_id is not None else []
+
+    def query_nodes(self, label: str, body: Dict[str, Any], **kwargs) -> Tuple[int, Any]:
+        return 200, self.find({'labels': [label], **body})
+
+    def query_nodes_v2(self, body: Dict[str, Any], **kwargs) -> Tuple[int, Any]:
+        result = self.find(body['query'])
+        return 200, {'result': result[: body.get('page_size', len(result))]}
+
+    def update_node(self, label: str, node_id: str, body: Dict[str, Any], **kwargs) -> Tuple[int, Any]:
+        with self._store_lock:
+            node = self.nodes[int(node_id)]
+            node.update(body)
+        return 200, [node]
+
+    def create_node(self, label: str, body: Dict[str, Any], **kwargs) -> Tuple[int, Any]:
+        return 200, [self.add_node(label, body)]
+
+    def create_relation(self, body: Dict[str, Any], **kwargs) -> Tuple[int, Any]:
+        with self._store_lock:
+            self.children.setdefault(body['start_id'], []).append(body['end_id'])
+        return 200, {}
+
+    def query_relations(self, body: Dict[str, Any], **kwargs) -> Tuple[int, Any]:
+        parent_id = self.geids.get(body['start_params']['global_entity_id'])
+        with self._store_lock:
+            children = [self.nodes[child_id] for child_id in self.children.get(parent_id, [])]
+        return 200, [{'end_node': child} for child in children]
+
+
+class FakeUtility(FakeService):
+    name = 'utility'
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__(latency)
+
+        self.route('GET', r'/v1/utility/id', lambda **kwargs: (200, {'result': f'{uuid.uuid4()}-{int(time.time())}'}))
+
+
+# node locks cover only the key, subtree locks also every key below it and intent locks are taken above subtrees
+LOCK_MODES = {
+    'read': 'S',
+    'write': 'X',
+    'subtree_read': 'S',
+    'subtree_write': 'X',
+    'intent_read': 'IS',
+    'intent_write': 'IX',
+}
+SUBTREE_OPERATIONS = ('subtree_read', 'subtree_write')
+# lock modes which can be held on the same key at the same time
+COMPATIBLE_MODES = {
+    'IS': {'IS', 'IX', 'S'},
+    'IX': {'IS', 'IX'},
+    'S': {'IS', 'S'},
+    'X': set(),
+}
+
+
+class PrefixLockTable:
+    """Reference implementation of resource locks with conflicts checked by key prefix.
+
+    Read and write locks of single nodes only cover their key, as in the lock service. Subtree locks also cover every
+    key below them, so they conflict with locks of the descendants and node locks conflict with subtree locks of the
+    ancestors. Intent locks on ancestors of a subtree keep other jobs from locking an ancestor subtree.
+    """
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.max_locks = 0
+        self._held: Dict[str, Dict[str, int]] = {}
+        # operations held on any key below the key
+        self._below: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(sum(operations.values()) for operations in self._held.values())
+
+    @staticmethod
+    def get_parent_keys(key: str) -> List[str]:
+        parts = key.split('/')
+        return ['/'.join(parts[:depth]) for depth in range(1, len(parts))]
+
+    def get_conflict(self, key: str, operation: str) -> Optional[str]:
+        """Return key of the lock conflicting with the operation or None."""
+
+        compatible = COMPATIBLE_MODES[LOCK_MODES[operation]]
+
+        def conflicts(operations: Dict[str, int], subtree_only: bool = False) -> bool:
+            return any(
+                LOCK_MODES[held] not in compatible
+                for held in operations
+                if not subtree_only or held in SUBTREE_OPERATIONS
+            )
+
+        if conflicts(self._held.get(key, {})):
+            return key
+
+        for parent in self.get_parent_keys(key):
+            if conflicts(self._held.get(parent, {}), subtree_only=True):
+                return parent
+
+        if operation in SUBTREE_OPERATIONS and conflicts(self._below.get(key, {})):
+            return f'{key}/*'
+
+        return None
+
+    def _count(self, locks: Dict[str, Dict[str, int]], key: str, operation: str, delta: int) -> None:
+        operations = locks.setdefault(key, {})
+        operations[operation] = operations.get(operation, 0) + delta
+        if not operations[operation]:
+            del operations[operation]
+            if not operations:
+                del locks[key]
+
+    def lock(self, resource_key: str, operation: str) -> Dict[str, Any]:
+        with self._lock:
+            self.requests += 1
+            conflict = self.get_conflict(resource_key, operation)
+            if conflict is not None:
+                raise Exception(f'resource {resource_key} already in used by {conflict}')
+
+            self._count(self._held, resource_key, operation, 1)
+            for parent in self.get_parent_keys(resource_key):
+                self._count(self._below, parent, operation, 1)
+            self.max_locks = max(self.max_locks, sum(sum(held.values()) for held in self._held.values()))
+
+        return {}
+
+    def unlock(self, resource_key: str, operation: str) -> Dict[str, Any]:
+        with self._lock:
+            self.requests += 1
+            if operation not in self._held.get(resource_key, {}):
+                raise Exception(f'resource {resource_key} is not locked for {operation}')
+
+            self._count(self._held, resource_key, operation, -1)
+            for parent in self.get_parent_keys(resource_key):
+                self._count(self._below, parent, operation, -1)
+
+        return {}
+
+
+class FakeLockService(FakeService):
+    """Resource lock api of data ops backed by the prefix lock table."""
+
+    name = 'lock'
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__(latency)
+
+        self.locks = PrefixLockTable()
+
+        self.route('POST', r'/v2/resource/lock', self.lock)
+        self.route('DELETE', r'/v2/resource/lock', self.unlock)
+
+    def lock(self, body: Dict[str, Any], **kwargs) -> Tuple[int, Any]:
+        try:
+            return 200, self.locks.lock(body['resource_key'], body['operation'])
+        except Exception as e:
+            return 409, {'error': str(e)}
+
+    def unlock(self, body: Dict[str, Any], **kwargs) -> Tuple[int, Any]:
+        try:
+            return 200, self.locks.unlock(body['resource_key'], body['operation'])
+        except Exception as e:
+            return 400, {'error': str(e)}
+
+
+class FakeDataOps(FakeLockService):
+    """Resource locks, archive previews, job status and pipeline messages."""
+
+    name = 'data-ops'
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__(latency)
+
+        self.route('GET', r'/v1/archive', lambda **kwargs: (404, {}))
+        self.route('PUT', r'/v1/tasks', lambda **kwargs: (200, {}))
+        self.route('POST', r'/v1/files/actions/message', lambda **kwargs: (200, {}))
+
+
+class FakeProvenance(FakeService):
+    """Lineage, audit logs and search index."""
+
+    name = 'provenance'
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__(latency)
+
+        self.route('POST', r'/v1/lineage', lambda **kwargs: (200, {}))
+        self.route('POST', r'/v1/audit-logs', lambda **kwargs: (200, {'code': 200}))
+        self.route('POST', r'/v1/entity/file', lambda **kwargs: (200, {'code': 200}))
+        self.route('PUT', r'/v1/entity/file', lambda **kwargs: (200, {'code': 200}))
+
+
+class FakeCataloguing(FakeService):
+    name = 'cataloguing'
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__(latency)
+
+        self.route(
+            'POST',
+            r'/v2/filedata',
+            lambda **kwargs: (200, {'result': {'mutatedEntities': {'CREATE': [{'guid': str(uuid.uuid4())}]}}}),
+        )
+
+
+class FakeEntityInfo(FakeService):
+    name = 'entityinfo'
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__(latency)
+
+        self.route('GET', r'/v1/manifest/(?P<manifest_id>\w+)', lambda **kwargs: (404, {}))
+
+
+class FakeObjectResult:
+    def __init__(self, size: int = 0, version_id: Optional[str] = None) -> None:
+        self.size = size
+        self.etag = 'etag'
+        self.version_id = version_id
+
+
+class FakeMinio:
+    """Object sizes by bucket and name, every request waits for the latency and copy also for the transfer time."""
+
+    def __init__(self, latency: float = 0.0, throughput: Optional[float] = None) -> None:
+        self.latency = latency
+        self.throughput = throughput
+        self.calls = 0
+        self.objects: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def request(self, size: int = 0) -> None:
+        with self._lock:
+            self.calls += 1
+
+        delay = self.latency
+        if self.throughput:
+            delay += size / self.throughput
+        if delay:
+            time.sleep(delay)
+
+    def stat_object(self, bucket: str, obj: str) -> FakeObjectResult:
+        self.request()
+        return FakeObjectResult(self.objects[(bucket, obj)])
+
+    def copy(self, bucket: str, obj: str, source_bucket: str, source_obj: str) -> FakeObjectResult:
+        size = self.objects[(source_bucket, source_obj)]
+        self.request(size)
+        with self._lock:
+            self.objects[(bucket, obj)] = size
+        return FakeObjectResult(size, str(uuid.uuid4()))
+
+
+class FakeMinioClient:
+    """Replacement of Minio_Client_ which keeps objects in FakeMinio."""
+
+    def __init__(self, client: FakeMinio) -> None:
+        self.client = client
+
+    def copy_object(self, bucket, obj, source_bucket, source_obj):
+        return self.client.copy(bucket, obj, source_bucket, source_obj)
+
+    def multipart_copy_object(self, bucket, obj, source_bucket, source_obj, workers=4):
+        return self.client.copy(bucket, obj, source_bucket, source_obj)
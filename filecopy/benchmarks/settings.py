@@ -0,0 +1,56 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+"""Placeholder settings needed to import the pipeline scripts in benchmarks."""
+
+import os
+
+
+def set_placeholder_settings() -> None:
+    """Set environment variables read by the pipeline config, variables which are already set are kept."""
+
+    for name in (
+        'MINIO_OPENID_CLIENT',
+        'MINIO_TEST_PASS',
+        'KEYCLOAK_MINIO_SECRET',
+        'KEYCLOAK_ENDPOINT',
+        'RDS_HOST',
+        'RDS_PWD',
+        'RDS_DBNAME',
+        'RDS_USER',
+        'RDS_SCHEMA_DEFAULT',
+    ):
+        os.environ.setdefault(name, 'benchmark')
+    for name, value in (
+        ('MINIO_ENDPOINT', 'minio.benchmark:9000'),
+        ('MINIO_HTTPS', 'False'),
+        ('GR_ZONE_LABEL', 'Greenroom'),
+        ('CORE_ZONE_LABEL', 'Core'),
+    ):
+        os.environ.setdefault(name, value)
+    for name in (
+        'NEO4J_SERVICE',
+        'ENTITYINFO_SERVICE',
+        'UTILITY_SERVICE',
+        'PROVENANCE_SERVICE',
+        'DATA_OPS_UTIL',
+        'CATALOGUING_SERVICE',
+    ):
+        os.environ.setdefault(name, 'http://127.0.0.1')
@@ -19,21 +19,30 @@
 # 
 
 import argparse
-import time
+import json
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
 from typing import Any
 from typing import Dict
-
-import requests
+from typing import List
+from typing import Optional
+from typing import Tuple
 
 from config import ConfigClass
+from minio_client import MAX_COPY_OBJECT_SIZE
 from minio_client import Minio_Client_
 from models import append_suffix_to_filepath
 from models import get_timestamp
+from models import Node
 from neo4j_helper import Neo4jPathCheck
 from services.approval.client import ApprovalServiceClient
+from services.approval.client import CopyStatusUpdater
+from services.approval.models import ApprovalEntity
 from services.approval.models import CopyStatus
+from services.approval.models import EntityType
+from tracing import tracer
 from utils import get_resource_by_geid
 from utils import get_session_id
 from utils import lock_resource
@@ -42,54 +51,45 @@ from utils import unlock_resource
 from utils import update_job
 
 
-def main():
-    environment = args.get('environment', 'test')
-    logger_info('environment: ' + str(args.get('environment')))
-    logger_info('config set: ' + environment)
-    project_code = args['project_code']
-    output_path = args['output_path']
-    output_bucket = f'core-{project_code}'
-    input_path = args['input_path']
-    input_bucket = f'gr-{project_code}'
-    operator = args['operator']
-    job_id = args['job_id']
-    session_id = get_session_id(job_id)
-    request_id = args['request_id']
-    minio_token = {
-        'at': args['access_token'],
-        'rt': args['refresh_token'],
-    }
-    copy_start_timestamp = get_timestamp()
+class FileCopier:
+    """Copy files from greenroom to core within one job.
 
-    logger_info(f'Running file-copy with arguments: {args}')
-    logger_info(f'Config environment: {ConfigClass.env}')
-    logger_info(f'Using output bucket: {output_bucket}')
-    logger_info(f'Using input bucket: {input_bucket}')
-    logger_info(f'Starting to copy file: {input_path}')
+    Minio client, approval request and approval entities are set up once and shared by all files of the job.
+    """
 
-    source_check = Neo4jPathCheck('Greenroom')
-    input_node = source_check.get_file(project_code, f'{input_bucket}/{input_path}')
-    if not input_node:
-        raise ValueError(f'Input file "{input_path}" is not found in the database')
+    def __init__(self, project_code: str, operator: str, request_id: Optional[str], minio_token: Dict[str, Any]):
+        self.project_code = project_code
+        self.operator = operator
+        self.request_id = request_id
+        self.input_bucket = f'gr-{project_code}'
+        self.output_bucket = f'core-{project_code}'
+        self.copy_start_timestamp = get_timestamp()
 
-    destination_check = Neo4jPathCheck(ConfigClass.CORE_ZONE_LABEL)
-    destination_folder = None
+        self.source_check = Neo4jPathCheck('Greenroom')
+        # nodes of approved files fetched by get_approved_input_paths() by their path
+        self.input_nodes: Dict[str, Node] = {}
+        self.destination_check = Neo4jPathCheck(ConfigClass.CORE_ZONE_LABEL)
 
-    approval_service_client = None
-    approval_entity = None
+        # one client for all files, so the token exchange is done only once
+        self.mc = Minio_Client_(minio_token['at'], minio_token['rt'])
+        logger_info("========Minio_Client Initiated========")
 
-    if request_id:
-        approval_service_client = ApprovalServiceClient()
-        approval_request = approval_service_client.get_approval_request(request_id)
-        approval_entities = approval_service_client.get_approval_entities(request_id)
-        approved_approval_entities = approval_entities.get_approved()
+        self.approval_service_client = None
+        self.copy_status_updater: Optional[CopyStatusUpdater] = None
+        self.approval_request = None
+        self.approval_entities = None
+        self.approved_approval_entities = None
+        self.approval_request_destination = None
 
-        try:
-            approval_entity = approved_approval_entities[input_node.geid]
-        except KeyError:
-            raise ValueError(
-                f'Input file "{input_path}" is not listed in approved entities for the request "{request_id}"'
-            )
+        if request_id:
+            self.load_approval_request(request_id)
+
+    def load_approval_request(self, request_id: str) -> None:
+        self.approval_service_client = ApprovalServiceClient()
+        approval_request = self.approval_service_client.get_approval_request(request_id)
+        # folders are enough to build the path of the approved file
+        self.approval_entities = self.approval_service_client.get_approval_entities(request_id, EntityType.FOLDER)
+        self.approved_approval_entities = self.approval_service_client.get_approved_entities(request_id)
 
         try:
             approval_request_source = get_resource_by_geid(approval_request.source_geid)
@@ -100,11 +100,64 @@ def main():
         try:
             approval_request_destination = get_resource_by_geid(approval_request.destination_geid)
             assert approval_request_destination.is_archived is False
-            approval_request_destination_path = approval_request_destination['display_path']
         except Exception:
             raise ValueError(f'Destination folder from approval request "{approval_request}" does no longer exist')
 
-        approval_entity_path = approval_entities.get_path_until_top_parent(approval_entity)
+        self.approval_request = approval_request
+        self.approval_request_destination = approval_request_destination
+
+    def get_approved_input_paths(self, workers: int = 8) -> List[str]:
+        """Return greenroom paths of all approved files which are not copied yet.
+
+        Nodes of the files are fetched concurrently and kept, so copy_file() does not look them up again.
+        """
+
+        approval_entities = list(self.approved_approval_entities.values())
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(approval_entities)))) as executor:
+            input_nodes = list(executor.map(lambda entity: get_resource_by_geid(entity.entity_geid), approval_entities))
+
+        input_paths = []
+        for input_node in input_nodes:
+            input_path = input_node['display_path']
+            # the same conditions as in the source check, other nodes are looked up and rejected by copy_file()
+            if self.source_check.zone in input_node['labels'] and not input_node.is_archived:
+                self.input_nodes[input_path] = input_node
+            input_paths.append(input_path)
+
+        return input_paths
+
+    def get_input_node(self, input_path: str) -> Node:
+        input_node = self.input_nodes.pop(input_path, None)
+        if input_node is None:
+            input_node = self.source_check.get_file(self.project_code, f'{self.input_bucket}/{input_path}')
+
+        if not input_node:
+            raise ValueError(f'Input file "{input_path}" is not found in the database')
+
+        return input_node
+
+    def update_copy_status(self, approval_entity: ApprovalEntity) -> None:
+        if self.copy_status_updater is not None:
+            self.copy_status_updater.update_copy_status(approval_entity, CopyStatus.COPIED)
+            return
+
+        self.approval_service_client.update_copy_status(approval_entity, CopyStatus.COPIED)
+
+    def get_approval_entity(self, input_node: Node, input_path: str) -> ApprovalEntity:
+        try:
+            return self.approved_approval_entities[input_node.geid]
+        except KeyError:
+            raise ValueError(
+                f'Input file "{input_path}" is not listed in approved entities for the request "{self.request_id}"'
+            )
+
+    def create_approved_output_path(self, approval_entity: ApprovalEntity) -> Tuple[str, Node]:
+        """Return output path of the approved file and destination folder, missing folders of the path are created."""
+
+        approval_request_destination = self.approval_request_destination
+        approval_request_destination_path = approval_request_destination['display_path']
+
+        approval_entity_path = self.approval_entities.get_path_until_top_parent(approval_entity)
 
         output_path_parts = [approval_request_destination_path]
         if approval_entity_path:
@@ -113,64 +166,164 @@ def main():
 
         output_path = '/'.join(output_path_parts)
 
-        output_folder = str(Path(f'{output_bucket}/{output_path}').parent)
+        output_folder = str(Path(f'{self.output_bucket}/{output_path}').parent)
         lock_resource(output_folder, 'write')
         try:
-            destination_folder = destination_check.create_path(
-                project_code, approval_entity_path, approval_request_destination, operator
+            destination_folder = self.destination_check.create_path(
+                self.project_code, approval_entity_path, approval_request_destination, self.operator
             )
         finally:
             unlock_resource(output_folder, 'write')
 
-    destination_filepath = f'{output_bucket}/{output_path}'
+        return output_path, destination_folder
 
-    if not destination_folder:
-        destination_folder = destination_check.get_folder(project_code, str(Path(output_path).parent))
+    def copy_file(self, input_path: str, output_path: Optional[str] = None) -> Dict[str, Any]:
+        """Copy one file, the output path is taken from the approval request when request id is set."""
 
-    if not destination_folder:
-        raise ValueError('Destination folder does no longer exist')
+        input_bucket = self.input_bucket
+        output_bucket = self.output_bucket
+        project_code = self.project_code
 
-    if destination_folder.is_archived:
-        raise ValueError('Destination folder already in trash bin')
+        logger_info(f'Starting to copy file: {input_path}')
 
-    is_file_exists = destination_check.is_file_exists(project_code, destination_filepath)
+        input_node = self.get_input_node(input_path)
 
-    if is_file_exists:
-        logger_info(f'File {output_path} already exists at destination')
-        output_path = append_suffix_to_filepath(output_path, copy_start_timestamp)
-        logger_info(f'Using new filename {output_path}')
+        destination_folder = None
+        approval_entity = None
 
-    # lock the source as read lock, destination as write
-    lock_resource("%s/%s" % (input_bucket, input_path), "read")
-    lock_resource("%s/%s" % (output_bucket, output_path), "write")
+        if self.request_id:
+            approval_entity = self.get_approval_entity(input_node, input_path)
+            output_path, destination_folder = self.create_approved_output_path(approval_entity)
 
-    try:
-        # copy minio object
-        result = copy_object_single_file(output_bucket, output_path, input_bucket, input_path, minio_token)
-        if is_file_exists or request_id:
-            result['output_path'] = output_path
-    finally:
-        # unlock it after upload
-        unlock_resource("%s/%s" % (input_bucket, input_path), "read")
-        unlock_resource("%s/%s" % (output_bucket, output_path), "write")
+        if output_path is None:
+            raise ValueError(f'Output path is not set for input file "{input_path}"')
+
+        destination_check = self.destination_check
+        destination_filepath = f'{output_bucket}/{output_path}'
+
+        if not destination_folder:
+            destination_folder = destination_check.get_folder(project_code, str(Path(output_path).parent))
+
+        if not destination_folder:
+            raise ValueError('Destination folder does no longer exist')
 
-    if approval_service_client and approval_entity:
-        approval_service_client.update_copy_status(approval_entity, CopyStatus.COPIED)
+        if destination_folder.is_archived:
+            raise ValueError('Destination folder already in trash bin')
 
-    update_job(session_id, job_id, 'RUNNING', result)
+        is_file_exists = destination_check.is_file_exists(project_code, destination_filepath)
 
-    logger_info(f'Successfully copied file from {input_bucket}/{input_path} to {output_bucket}/{output_path}')
+        if is_file_exists:
+            logger_info(f'File {output_path} already exists at destination')
+            output_path = append_suffix_to_filepath(output_path, self.copy_start_timestamp)
+            logger_info(f'Using new filename {output_path}')
 
+        # lock the source as read lock, destination as write
+        lock_resource("%s/%s" % (input_bucket, input_path), "read")
+        lock_resource("%s/%s" % (output_bucket, output_path), "write")
 
-def debug_message_sender(message: str):
-    url = ConfigClass.DATA_OPS_UT_V1 + "files/actions/message"
-    response = requests.post(url, json={
-        "message": message,
-        "channel": "pipelinewatch"
-    })
-    if response.status_code != 200:
-        print("code: " + str(response.status_code) + ": " + response.text)
-    return
+        try:
+            # copy minio object
+            result = copy_object_single_file(output_bucket, output_path, input_bucket, input_path, self.mc)
+            if is_file_exists or self.request_id:
+                result['output_path'] = output_path
+        finally:
+            # unlock it after upload
+            unlock_resource("%s/%s" % (input_bucket, input_path), "read")
+            unlock_resource("%s/%s" % (output_bucket, output_path), "write")
+
+        if self.approval_service_client and approval_entity:
+            self.update_copy_status(approval_entity)
+
+        logger_info(f'Successfully copied file from {input_bucket}/{input_path} to {output_bucket}/{output_path}')
+
+        return result
+
+    def copy_files(self, files: List[Tuple[str, Optional[str]]]) -> List[Dict[str, Any]]:
+        """Copy all files and return the result of every file, failed files do not stop the others."""
+
+        results = []
+
+        copy_status_context = nullcontext()
+        if self.approval_service_client is not None:
+            copy_status_context = self.copy_status_updater = CopyStatusUpdater(self.approval_service_client)
+
+        try:
+            with copy_status_context:
+                for input_path, output_path in files:
+                    try:
+                        result = self.copy_file(input_path, output_path)
+                    except Exception as e:
+                        logger_info(f'[Copy Failed] {input_path}: {e}')
+                        results.append({'input_path': input_path, 'status': 'FAILED', 'error': str(e)})
+                        continue
+
+                    results.append(
+                        {
+                            'input_path': input_path,
+                            'output_path': result.get('output_path', output_path),
+                            'status': 'SUCCEED',
+                            'versioning': result['versioning'],
+                        }
+                    )
+        finally:
+            self.copy_status_updater = None
+
+        return results
+
+
+def read_manifest(path: str) -> List[Tuple[str, Optional[str]]]:
+    """Return (input path, output path) pairs from json manifest file.
+
+    The manifest is a list of objects with input_path and output_path, output path can be omitted when files are
+    copied for approval request.
+    """
+
+    with open(path) as manifest_file:
+        manifest = json.load(manifest_file)
+
+    return [(item['input_path'], item.get('output_path')) for item in manifest]
+
+
+def main():
+    environment = args.get('environment', 'test')
+    logger_info('environment: ' + str(args.get('environment')))
+    logger_info('config set: ' + environment)
+    project_code = args['project_code']
+    operator = args['operator']
+    job_id = args['job_id']
+    session_id = get_session_id(job_id)
+    request_id = args['request_id']
+    minio_token = {
+        'at': args['access_token'],
+        'rt': args['refresh_token'],
+    }
+
+    logger_info(f'Running file-copy with arguments: {args}')
+    logger_info(f'Config environment: {ConfigClass.env}')
+    logger_info(f'Using output bucket: core-{project_code}')
+    logger_info(f'Using input bucket: gr-{project_code}')
+
+    copier = FileCopier(project_code, operator, request_id, minio_token)
+
+    if args['input_path']:
+        result = copier.copy_file(args['input_path'], args['output_path'])
+        update_job(session_id, job_id, 'RUNNING', result)
+        return
+
+    if args['manifest']:
+        files = read_manifest(args['manifest'])
+    else:
+        files = [(input_path, None) for input_path in copier.get_approved_input_paths()]
+
+    logger_info(f'Copying {len(files)} files')
+    results = copier.copy_files(files)
+    update_job(session_id, job_id, 'RUNNING', {'files': results})
+
+    failed = [result for result in results if result['status'] == 'FAILED']
+    if failed:
+        raise Exception(f'{len(failed)} of {len(results)} files failed to copy')
+
+    logger_info(f'Successfully copied {len(results)} files')
 
 
 def parse_inputs():
@@ -179,9 +332,11 @@ def parse_inputs():
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
     parser.add_argument('-i', '--input-path', help='Sepecify input file',
-                        metavar='Relative path, Object Name', required=True)
+                        metavar='Relative path, Object Name')
     parser.add_argument('-o', '--output-path', help='Sepecify output file',
-                        metavar='Relative path, Object Name', required=True)
+                        metavar='Relative path, Object Name')
+    parser.add_argument('-m', '--manifest',
+                        help='Json file with the list of input and output paths to copy within one job')
     parser.add_argument('-env', '--environment',
                         help='Environment', required=True)
     parser.add_argument('-p', '--project-code',
@@ -191,27 +346,33 @@ def parse_inputs():
     parser.add_argument('-j', '--job-id',
                         help='Job geid', required=True)
     parser.add_argument('-rid', '--request-id', help='Approval request id')
+    parser.add_argument('-td', '--trace-dir', help='Directory for the trace of service calls', default='.')
     parser.add_argument('-at', '--access-token',
                         help='access key', required=True)
     parser.add_argument('-rt', '--refresh-token',
                         help='refresh key', required=True)
 
     arguments = vars(parser.parse_args())
+
+    # without input path or manifest all approved files of the request are copied
+    if not arguments['input_path'] and not arguments['manifest'] and not arguments['request_id']:
+        parser.error('one of --input-path, --manifest or --request-id is required')
+    if arguments['input_path'] and not arguments['output_path'] and not arguments['request_id']:
+        parser.error('--output-path is required with --input-path')
+
     return arguments
 
 
 def copy_object_single_file(
-    bucket, object_name: str, source_bucket, source_object_name: str, auth_token: Dict[str, Any]
+    bucket, object_name: str, source_bucket, source_object_name: str, mc: Minio_Client_
 ) -> Dict[str, Any]:
     logger_info("[Copying source] {}::{}".format(source_bucket, source_object_name))
     logger_info("[Copying destination] {}::{}".format(bucket, object_name))
     try:
         # get size
-        mc = Minio_Client_(auth_token["at"], auth_token["rt"])
-        logger_info("========Minio_Client Initiated========")
         file_size_gb = mc.client.stat_object(source_bucket, source_object_name).size
         versioning = None
-        if file_size_gb < 5e+9:
+        if file_size_gb < MAX_COPY_OBJECT_SIZE:
             logger_info("File size less than 5GiB")
             # move minio file objects
             # copy an object from a bucket to another.
@@ -219,12 +380,10 @@ def copy_object_single_file(
             versioning = result.version_id
         else:
             logger_info("File size greater than 5GiB")
-            temp_path = ConfigClass.TEMP_DIR + str(time.time())
-            file_get = mc.client.fget_object(source_bucket, source_object_name, temp_path)
-            logger_info("File fetched to local disk: {}".format(temp_path))
-            result = mc.fput_object(bucket, object_name, temp_path)
+            # object is copied part by part on the minio side without passing through the container
+            result = mc.multipart_copy_object(bucket, object_name, source_bucket, source_object_name)
             versioning = result.version_id
-            logger_info("File uploaded : {}".format(object_name))
+            logger_info("File copied with multipart upload : {}".format(object_name))
         logger_info("Minio Object Copied")
         return {
             "versioning": versioning
@@ -237,9 +396,13 @@ def copy_object_single_file(
 if __name__ == "__main__":
     try:
         args = parse_inputs()
+        tracer.open(args['trace_dir'], f'file-copy-{args["job_id"]}')
         main()
     except Exception as e:
         logger_info("[Copy Failed] {}".format(str(e)))
         for info in traceback.format_stack():
             logger_info(info)
         raise
+    finally:
+        for line in tracer.close():
+            logger_info(line)
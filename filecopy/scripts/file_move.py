@@ -23,11 +23,10 @@ import os
 import re
 import traceback
 
-import requests
-
 from config import ConfigClass
 from minio_client import Minio_Client_
 from utils import lock_resource
+from utils import logger_info
 from utils import unlock_resource
 
 
@@ -59,22 +58,6 @@ def parse_inputs():
     return arguments
 
 
-def debug_message_sender(message: str):
-    url = ConfigClass.DATA_OPS_UT_V1 + "files/actions/message"
-    response = requests.post(url, json={
-        "message": message,
-        "channel": "pipelinewatch"
-    })
-    if response.status_code != 200:
-        print("code: " + str(response.status_code) + ": " + response.text)
-    return
-
-
-def logger_info(message: str):
-    debug_message_sender(message)
-    print(message)
-
-
 def delete_object_single_file(source_bucket, source_object_name: str, auth_token: dict, version=None):
     logger_info("[Deleting source] {}::{}".format(source_bucket, source_object_name))
     try:
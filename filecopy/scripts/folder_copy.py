@@ -20,39 +20,63 @@
 
 import argparse
 import os
+import time
 import traceback
+from contextlib import nullcontext
 from pathlib import Path
 from typing import Any
 from typing import Dict
-from typing import List
 from typing import Optional
-from typing import Tuple
-
-import requests
 
 from config import ConfigClass
+from geid import get_geid_allocator
+from http_client import http
+from journal import CopyJournal
+from journal import JournalEntry
+from journal import JournalStatus
+from locks import get_hierarchical_keys
+from locks import LockSet
 from minio_client import Minio_Client_
 from models import append_suffix_to_filepath
 from models import get_timestamp
 from models import Node
 from models import NodeList
 from models import ResourceType
-from neo4j_helper import create_file_node
+from neo4j_helper import copy_file_object
 from neo4j_helper import create_folder_node
+from neo4j_helper import create_node_with_parent
+from neo4j_helper import file_node_attribute
 from neo4j_helper import get_children_nodes
 from neo4j_helper import Neo4jPathCheck
+from neo4j_helper import Neo4jPathIndex
+from plan import CATALOGUING
+from plan import DATA
+from plan import DATA_OPS
+from plan import LOCK
+from plan import METADATA
+from plan import NEO4J
+from plan import PlanReport
+from plan import PREPARE
+from plan import PROVENANCE
+from plan import UTILITY
+from plan import WALK
+from progress import ProgressReporter
 from services.approval.client import ApprovalServiceClient
+from services.approval.client import CopyStatusUpdater
 from services.approval.models import ApprovedApprovalEntities
 from services.approval.models import CopyStatus
+from services.approval.models import EntityType
+from tracing import tracer
+from tree import TreeSnapshot
 from utils import get_resource_by_geid
 from utils import get_session_id
 from utils import http_query_node
 from utils import http_update_node
-from utils import lock_resource
 from utils import logger_info
 from utils import MetaDataFactory
-from utils import unlock_resource
 from utils import update_job
+from workers import BoundedExecutor
+from workers import MetadataOffload
 
 PROCESS_PIPELINE = "data_transfer_folder"
 PIPELINE_DESC = '''
@@ -105,6 +129,12 @@ class CopyObjects:
         destination_check: Optional[Neo4jPathCheck] = None,
         approved_entities: Optional[ApprovedApprovalEntities] = None,
         approval_service_client: Optional[ApprovalServiceClient] = None,
+        executor: Optional[BoundedExecutor] = None,
+        tree: Optional[TreeSnapshot] = None,
+        metadata_offload: Optional[MetadataOffload] = None,
+        journal: Optional[CopyJournal] = None,
+        progress: Optional[ProgressReporter] = None,
+        copy_status_updater: Optional[CopyStatusUpdater] = None,
     ):
         self.mc = minio_client
         self.metadata_factory = metadata_factory
@@ -120,6 +150,20 @@ class CopyObjects:
         self.approved_entities = approved_entities
         self.approval_service_client = approval_service_client
 
+        if executor is None:
+            executor = BoundedExecutor()
+        self.executor = executor
+
+        self.tree = tree
+
+        if metadata_offload is None:
+            metadata_offload = MetadataOffload()
+        self.metadata_offload = metadata_offload
+
+        self.journal = journal
+        self.progress = progress
+        self.copy_status_updater = copy_status_updater
+
         self.project = self.metadata_factory.project
         self.oper = self.metadata_factory.oper
 
@@ -156,6 +200,17 @@ class CopyObjects:
         update_json = {"system_tags": ["copied-to-core"], "guid": guid, "version_id": new_node_version_id}
         http_update_node("File", node.get("id"), update_json)
 
+    def create_folder_metadata(self, node: Node, new_node: Node) -> None:
+        # update old node to have system tag
+        # TODO remove this? since we add it above
+        update_json = {"system_tags": ["copied-to-core"]}
+        http_update_node(ResourceType.FOLDER, node.get("id"), update_json)
+
+        # metadata creation
+        self.metadata_factory.create_es_search_index(new_node, node, ResourceType.FOLDER, "")
+
+        self.record_node(node, new_node, JournalStatus.DONE)
+
     def is_node_approved(self, node: Node) -> bool:
         """Check if node geid is in a list of approved entities.
 
@@ -178,51 +233,144 @@ class CopyObjects:
 
         approval_entity = self.approved_entities[node.geid]
 
+        if self.copy_status_updater is not None:
+            self.copy_status_updater.update_copy_status(approval_entity, copy_status)
+            return
+
         self.approval_service_client.update_copy_status(approval_entity, copy_status)
 
+    def record_node(
+        self, node: Node, new_node: Node, status: JournalStatus, new_node_version_id: Optional[str] = None
+    ) -> None:
+        """Record copy progress of the node in the journal if it is used."""
+
+        if self.journal is None:
+            return
+
+        self.journal.record(node.geid, status, new_node.geid, new_node.name, new_node_version_id)
+
+    def resume_file_node(self, node: Node) -> bool:
+        """Continue copy of the file started by previous run of the job.
+
+        Return False if the file is not recorded in the journal and should be copied from the beginning.
+        """
+
+        if self.journal is None:
+            return False
+
+        entry = self.journal.get(node.geid)
+        if entry is None:
+            return False
+
+        if entry.status != JournalStatus.DONE:
+            self.executor.submit(self.finish_started_file_node, node, entry)
+            return True
+
+        # copy status could be still buffered when previous run stopped, the update is idempotent
+        self.update_approval_entity_copy_status_for_node(node, CopyStatus.COPIED)
+
+        if self.progress is not None:
+            self.progress.add_file(node.get('file_size'), resumed=True)
+
+        return True
+
+    def finish_started_file_node(self, node: Node, entry: JournalEntry) -> None:
+        """Redo the steps of the file copy which were not finished by previous run of the job."""
+
+        new_node = get_resource_by_geid(entry.destination_geid)
+
+        if entry.status == JournalStatus.CREATED:
+            self.copy_file_object(node, new_node)
+        else:
+            # object was copied by previous run
+            self.metadata_offload.submit(self.finish_file_node, node, new_node, entry.version_id, resumed=True)
+
+    def get_children_nodes(self, node: Node) -> NodeList:
+        """Return children of folder node from the tree snapshot or fetch them if node is not in the snapshot."""
+
+        if self.tree is not None and node in self.tree:
+            return self.tree.get_children(node)
+
+        return NodeList(get_children_nodes(node.geid))
+
+    def get_file_node_attribute(self, node: Node, current_root_path: str, parent_node: Node) -> Dict[str, Any]:
+        """Return properties of the destination file node for source file node."""
+
+        # TODO simplify here
+        minio_path = node.get('location').split("//")[-1]
+        _, bucket, old_path = tuple(minio_path.split("/", 2))
+
+        destination_filename = self.duplicated_files.get(old_path, node.name)
+
+        # file will need extra step to get all attribute
+        # the format of attribute is {"attr_<field>": "value"}
+        attr = {x: node[x] for x in node if "attr" in x}
+        tags = node.get("tags")
+        extra = {
+            "system_tags": ["copied-to-core"],
+            "parent_folder_geid": parent_node.get("global_entity_id"),
+        }
+
+        return file_node_attribute(
+            self.project.get("code"),
+            node,
+            self.oper,
+            current_root_path,
+            tags=tags,
+            attribute=attr,
+            new_name=destination_filename,
+            extra_fields=extra,
+        )
+
+    def finish_file_node(self, node: Node, new_node: Node, new_node_version_id: str, resumed: bool = False) -> None:
+        """Create all metadata for copied file and mark it as copied in approval request.
+
+        Resumed file is the one with the object copied by previous run of the job.
+        """
+
+        self.create_file_metadata(node, new_node, new_node_version_id)
+
+        self.update_approval_entity_copy_status_for_node(node, CopyStatus.COPIED)
+
+        self.record_node(node, new_node, JournalStatus.DONE, new_node_version_id)
+
+        if self.progress is not None:
+            self.progress.add_file(node.get('file_size'), resumed)
+
+    def copy_file_object(self, node: Node, new_node: Node) -> None:
+        """Copy minio object for already created file node and queue creation of related metadata."""
+
+        version_id = copy_file_object(node, new_node.get("location"), self.mc)
+        self.record_node(node, new_node, JournalStatus.COPIED, version_id)
+
+        self.metadata_offload.submit(self.finish_file_node, node, new_node, version_id)
+
+    def copy_file_node(self, node: Node, current_root_path: str, parent_node: Node) -> None:
+        """Copy one file node with minio object and create all related metadata."""
+
+        # create the copied node
+        file_attribute = self.get_file_node_attribute(node, current_root_path, parent_node)
+        new_node, _ = create_node_with_parent("File", file_attribute, parent_node.get('id'))
+        self.record_node(node, new_node, JournalStatus.CREATED)
+        self.destination_check.add_node(new_node)
+
+        self.copy_file_object(node, new_node)
+
     def copy_one_node(self, node: Node, current_root_path: str, parent_node: Node) -> None:
         # update here if the folder/file is archived then skip
         if node.get("archived", False):
             return
 
-        node_geid = node.geid
-
         if node.is_file:
             if not self.is_node_approved(node):
                 return
 
-            # TODO simplify here
-            minio_path = node.get('location').split("//")[-1]
-            _, bucket, old_path = tuple(minio_path.split("/", 2))
-
-            destination_filename = self.duplicated_files.get(old_path, node.name)
-
-            # file will need extra step to get all attribute
-            # the format of attribute is {"attr_<field>": "value"}
-            attr = {x: node[x] for x in node if "attr" in x}
-            tags = node.get("tags")
-            extra = {
-                "system_tags": ["copied-to-core"],
-                "parent_folder_geid": parent_node.get("global_entity_id"),
-            }
-
-            # create the copied node
-            new_node, _, version_id = create_file_node(
-                self.project.get("code"),
-                node,
-                self.oper,
-                parent_node.get('id'),
-                current_root_path,
-                self.mc,
-                tags=tags,
-                attribute=attr,
-                new_name=destination_filename,
-                extra_fields=extra,
-            )
-
-            self.create_file_metadata(node, new_node, version_id)
+            if self.resume_file_node(node):
+                return
 
-            self.update_approval_entity_copy_status_for_node(node, CopyStatus.COPIED)
+            # files are copied by the executor workers, folders are always created in the walking thread
+            # so the parent folder node exists before any of its children are submitted
+            self.executor.submit(self.copy_file_node, node, current_root_path, parent_node)
 
         # else it is folder will trigger the recursive
         elif node.is_folder:
@@ -232,6 +380,11 @@ class CopyObjects:
             existing_folder = self.destination_check.get_folder(project_code, folder_path)
             if existing_folder:
                 new_node = existing_folder
+
+                # folder was created by previous run of the job which stopped before its metadata was finished
+                entry = self.journal.get(node.geid) if self.journal is not None else None
+                if entry is not None and entry.status != JournalStatus.DONE:
+                    self.metadata_offload.submit(self.create_folder_metadata, node, Node(new_node))
             else:
                 # first create the folder
                 tags = node.get("tags")
@@ -249,84 +402,177 @@ class CopyObjects:
                     tags=tags,
                     extra_fields=extra,
                 )
+                self.record_node(node, new_node, JournalStatus.CREATED)
+                self.destination_check.add_node(new_node)
 
-                # update old node to have system tag
-                # TODO remove this? since we add it above
-                update_json = {"system_tags": ["copied-to-core"]}
-                http_update_node(ResourceType.FOLDER, node.get("id"), update_json)
-
-                # metadata creation
-                self.metadata_factory.create_es_search_index(new_node, node, ResourceType.FOLDER, "")
+                # search index creation changes node fields, so the offloaded task gets a copy of the new folder node
+                self.metadata_offload.submit(self.create_folder_metadata, node, Node(new_node))
 
             # seconds recursively go throught the folder/subfolder by same proccess
-            children_nodes = get_children_nodes(node_geid)
-            children_nodes = NodeList(children_nodes)
-            self.recursive_copy(children_nodes, folder_path, new_node)
+            self.recursive_copy(self.get_children_nodes(node), folder_path, new_node)
 
         return
 
 
 def recursive_lock(
-    locked_nodes: List[Tuple[str, str]],
+    lock_set: LockSet,
     project_code: str,
-    nodes: NodeList,
-    destination_path: str,
+    tree: TreeSnapshot,
     approved_entities: Optional[ApprovedApprovalEntities],
+    destination_check: Optional[Neo4jPathCheck] = None,
+    journal: Optional[CopyJournal] = None,
+    hierarchical: bool = False,
 ) -> DuplicatedFileNames:
-    """The function will recursively lock the node tree."""
+    """The function will lock every node of the tree snapshot, or only the subtrees in hierarchical mode."""
 
-    # locked_nodes here is for crash recovery, if something trigger the exception
+    # lock_set here is for crash recovery, if something trigger the exception
     # we will unlock the locked node only. NOT the whole tree. The example
     # case will be copy the same node, if we unlock the whole tree in exception
     # then it will affect the processing one.
 
     duplicated_files = DuplicatedFileNames()
-    destination_check = Neo4jPathCheck(ConfigClass.CORE_ZONE_LABEL)
+    if destination_check is None:
+        destination_check = Neo4jPathCheck(ConfigClass.CORE_ZONE_LABEL)
+    keys = []
+
+    # archived nodes are skipped by the walk together with their subtree
+    for node in tree.walk():
+        # conner case here, we DONT lock the name folder
+        # for the copy we will lock the both source as read operation,
+        # and the target will be write operation
+        if node['display_path'] == node['uploader']:
+            continue
 
-    # TODO lock
+        if node.is_file:
+            if approved_entities and node.geid not in approved_entities:
+                continue
 
-    def recur_walker(current_nodes: NodeList, current_destination_path: str) -> None:
-        """Recursively trace down the node tree and run the lock function on folders."""
+        source_key = f'gr-{project_code}/{node["display_path"]}'
+        keys.append((source_key, "read"))
 
-        for node in current_nodes:
-            # update here if the folder/file is archived then skip
-            if node.get("archived", False):
-                continue
+        output_bucket = f'core-{project_code}/{tree.get_destination_path(node)}'
+
+        entry = journal.get(node.geid) if journal is not None else None
+        if entry is not None:
+            # node was copied by previous run of the job, it keeps the name it got at destination
+            node['name'] = entry.destination_name
+        elif node.is_file:
+            destination_filepath = f'{output_bucket}/{node.name}'
+            if destination_check.is_file_exists(project_code, destination_filepath):
+                logger_info(f'File {destination_filepath} already exists at destination')
+                node['name'] = duplicated_files.add(node['display_path'])
+                logger_info(f'Using new filename {node.name}')
 
-            # conner case here, we DONT lock the name folder
-            # for the copy we will lock the both source as read operation,
-            # and the target will be write operation
-            if node['display_path'] != node['uploader']:
-                if node.is_file:
-                    if approved_entities and node.geid not in approved_entities:
-                        continue
+        target_key = f'{output_bucket}/{node.name}'
+        keys.append((target_key, "write"))
 
-                source_key = f'gr-{project_code}/{node["display_path"]}'
-                lock_resource(source_key, "read")
-                locked_nodes.append((source_key, "read"))
+    if hierarchical:
+        keys = get_hierarchical_keys(keys)
 
-                output_bucket = f'core-{project_code}/{current_destination_path}'
+    # all keys are locked at once, nothing stays locked if any of them is already in use
+    lock_set.acquire(keys)
 
-                if node.is_file:
-                    destination_filepath = f'{output_bucket}/{node.name}'
-                    if destination_check.is_file_exists(project_code, destination_filepath):
-                        logger_info(f'File {destination_filepath} already exists at destination')
-                        node['name'] = duplicated_files.add(node['display_path'])
-                        logger_info(f'Using new filename {node.name}')
+    return duplicated_files
 
-                target_key = f'{output_bucket}/{node.name}'
-                lock_resource(target_key, "write")
-                locked_nodes.append((target_key, "write"))
 
-            # open the next recursive loop if it is folder
-            if node.is_folder:
-                next_root = f'{current_destination_path}/{node.name}'
-                children_nodes = NodeList(get_children_nodes(node.geid))
-                recur_walker(children_nodes, next_root)
+def plan_copy(
+    project_code: str,
+    tree: TreeSnapshot,
+    approved_entities: Optional[ApprovedApprovalEntities],
+    destination_check: Neo4jPathCheck,
+) -> PlanReport:
+    """Count the work copy of the tree snapshot would do, nothing is locked or created."""
 
-    recur_walker(nodes, destination_path)
+    report = PlanReport('folder copy')
+    # fetch of the tree snapshot
+    report.add_calls(PREPARE, NEO4J, len(tree.children))
 
-    return duplicated_files
+    for node in tree.walk():
+        if node.is_file and approved_entities and node.geid not in approved_entities:
+            continue
+
+        if node['display_path'] != node['uploader']:
+            # read and write lock, both released at the end
+            report.add_calls(LOCK, DATA_OPS, 4)
+
+        if node.is_file:
+            report.add_file(node)
+
+            destination_filepath = f'core-{project_code}/{tree.get_destination_path(node)}/{node.name}'
+            if destination_check.is_file_exists(project_code, destination_filepath):
+                report.collisions.append(destination_filepath)
+
+            # node with relation and geid
+            report.add_calls(DATA, NEO4J, 2)
+            report.add_calls(DATA, UTILITY)
+            report.add_object_copy(DATA, node)
+
+            # zip preview, atlas entity, lineage, search index, audit log and system tag of the source node
+            report.add_calls(METADATA, DATA_OPS)
+            report.add_calls(METADATA, CATALOGUING)
+            report.add_calls(METADATA, PROVENANCE, 3)
+            report.add_calls(METADATA, NEO4J)
+        elif node.is_folder:
+            report.add_folder()
+
+            # destination folder lookup, then node with relation and geid
+            report.add_calls(PREPARE, NEO4J, 2)
+            report.add_calls(WALK, NEO4J, 2)
+            report.add_calls(WALK, UTILITY)
+
+            # system tag of the source node and search index
+            report.add_calls(METADATA, NEO4J)
+            report.add_calls(METADATA, PROVENANCE)
+
+    return report
+
+
+def plan_execute(
+    dest_geid: str,
+    source_geid: str,
+    project_code: str,
+    request_id: Optional[str],
+) -> PlanReport:
+    """Walk the source tree and return the plan of the copy without modifying anything."""
+
+    approved_entities = None
+    if request_id:
+        approval_service_client = ApprovalServiceClient()
+        # only folders are needed to find the top parent, approved files are filtered by the database
+        approval_folders = approval_service_client.get_approval_entities(request_id, EntityType.FOLDER)
+        source_geid = approval_folders.get_top_parent_geid(source_geid)
+        approved_entities = approval_service_client.get_approved_entities(request_id)
+
+    source_node = get_resource_by_geid(source_geid)
+    dest_node = get_resource_by_geid(dest_geid)
+
+    started = time.monotonic()
+    tree = TreeSnapshot.fetch([source_node], dest_node.get('display_path'))
+    elapsed = time.monotonic() - started
+
+    destination_check = Neo4jPathIndex(ConfigClass.CORE_ZONE_LABEL)
+    report = plan_copy(project_code, tree, approved_entities, destination_check)
+    report.measure(NEO4J, elapsed, len(tree.children))
+
+    return report
+
+
+def create_progress_reporter(
+    tree: TreeSnapshot,
+    approved_entities: Optional[ApprovedApprovalEntities],
+    session_id: str,
+    job_id: str,
+) -> ProgressReporter:
+    """Create reporter of the job progress with totals counted from the tree snapshot."""
+
+    files = [
+        node for node in tree.walk() if node.is_file and (not approved_entities or node.geid in approved_entities)
+    ]
+
+    def report(progress: int, status: Dict[str, Any]) -> None:
+        update_job(session_id, job_id, 'RUNNING', add_payload=status, progress=progress)
+
+    return ProgressReporter(report, len(files), sum(node.get('file_size') or 0 for node in files))
 
 
 def copy_execute(
@@ -336,15 +582,25 @@ def copy_execute(
     operator: str,
     request_id: Optional[str],
     auth_token: Dict[str, Any],
+    workers: int = 1,
+    metadata_workers: int = 1,
+    journal: Optional[CopyJournal] = None,
+    session_id: Optional[str] = None,
+    job_id: Optional[str] = None,
+    hierarchical_locks: bool = False,
 ) -> None:
+    # every copy and metadata worker may hold a connection to the same service at a time
+    http.configure(pool_size=workers + metadata_workers)
+
     approval_service_client = None
     approved_entities = None
 
     if request_id:
         approval_service_client = ApprovalServiceClient()
-        request_approval_entities = approval_service_client.get_approval_entities(request_id)
-        source_geid = request_approval_entities.get_top_parent_geid(source_geid)
-        approved_entities = request_approval_entities.get_approved()
+        # only folders are needed to find the top parent, approved files are filtered by the database
+        approval_folders = approval_service_client.get_approval_entities(request_id, EntityType.FOLDER)
+        source_geid = approval_folders.get_top_parent_geid(source_geid)
+        approved_entities = approval_service_client.get_approved_entities(request_id)
 
     source_node = get_resource_by_geid(source_geid)
     dest_node = get_resource_by_geid(dest_geid)
@@ -362,13 +618,25 @@ def copy_execute(
     print(" - project node:", project_info)
     print("======")
 
-    locked_nodes = []
+    lock_set = LockSet()
     try:
-        source_nodes = NodeList([source_node])
         destination_path = dest_node.get('display_path')
 
+        # walk the source tree only once, both lock and copy phases are using the same snapshot
+        tree = TreeSnapshot.fetch([source_node], destination_path)
+        logger_info(f'Fetched source tree with {len(tree)} nodes')
+
+        # start allocating geids for the new nodes while locks are being taken
+        get_geid_allocator().prefill(len(tree))
+
+        # destination folders are listed once and shared by the lock and copy phases
+        destination_check = Neo4jPathIndex(ConfigClass.CORE_ZONE_LABEL)
+
+        if journal is not None and len(journal):
+            logger_info(f'Resuming copy, {len(journal)} nodes are recorded in journal {journal.path}')
+
         duplicated_files = recursive_lock(
-            locked_nodes, project_info.get('code'), source_nodes, destination_path, approved_entities
+            lock_set, project_info.get('code'), tree, approved_entities, destination_check, journal, hierarchical_locks
         )
 
         # initialize the minio outside to keep one instance of credential
@@ -380,20 +648,39 @@ def copy_execute(
             project_info, operator, target_zone, PROCESS_PIPELINE, PIPELINE_DESC, OPERATION_TYPE
         )
 
-        copy_object = CopyObjects(
-            mc,
-            metadata_factory,
-            duplicated_files,
-            Neo4jPathCheck(target_zone),
-            approved_entities,
-            approval_service_client,
-        )
-        copy_object.recursive_copy(source_nodes, destination_path, Node(dest_node))
+        progress = None
+        if job_id is not None:
+            progress = create_progress_reporter(tree, approved_entities, session_id, job_id)
+        progress_context = progress if progress is not None else nullcontext()
+
+        copy_status_updater = None
+        if approval_service_client is not None:
+            copy_status_updater = CopyStatusUpdater(approval_service_client)
+        copy_status_context = copy_status_updater if copy_status_updater is not None else nullcontext()
+
+        # the data plane executor is finished first, then the job waits until the metadata offload is finished and
+        # the buffered copy statuses are written
+        with progress_context, copy_status_context:
+            with MetadataOffload(metadata_workers) as metadata_offload, BoundedExecutor(workers) as executor:
+                copy_object = CopyObjects(
+                    mc,
+                    metadata_factory,
+                    duplicated_files,
+                    destination_check,
+                    approved_entities,
+                    approval_service_client,
+                    executor,
+                    tree,
+                    metadata_offload,
+                    journal,
+                    progress,
+                    copy_status_updater,
+                )
+                copy_object.recursive_copy(tree.nodes, destination_path, Node(dest_node))
     finally:
         # here we unlock the locked nodes ONLY
         print("Start to unlock the nodes")
-        for resource_key, operation in locked_nodes:
-            unlock_resource(resource_key, operation)
+        lock_set.release()
 
 
 def copy_zippreview(old_geid, new_geid):
@@ -401,7 +688,7 @@ def copy_zippreview(old_geid, new_geid):
     get_params = {
         "file_geid": old_geid
     }
-    response_get = requests.get(url=url, params=get_params)
+    response_get = http.get(url=url, params=get_params)
     if response_get.status_code == 404:
         return
     if response_get.status_code != 200:
@@ -412,7 +699,7 @@ def copy_zippreview(old_geid, new_geid):
         "file_geid": new_geid,
         "archive_preview": archive_preview
     }
-    post_response = requests.post(url=url, json=post_json)
+    post_response = http.post(url=url, json=post_json)
     if post_response.status_code != 200:
         raise Exception(post_response.text)
 
@@ -435,6 +722,27 @@ def parse_inputs():
     parser.add_argument('-j', '--job-id',
                         help='Job geid', required=True)
     parser.add_argument('-rid', '--request-id', help='Approval request id')
+    parser.add_argument('-w', '--workers', help='Number of files copied in parallel', type=int, default=1)
+    parser.add_argument(
+        '-mw',
+        '--metadata-workers',
+        help='Number of workers creating metadata in background, has effect only when greater than 1',
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        '-hl',
+        '--hierarchical-locks',
+        help='Lock subtrees with intent locks on their ancestors instead of every node',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--plan', help='Only report the work and estimated time of the copy, nothing is modified', action='store_true'
+    )
+    parser.add_argument(
+        '-jd', '--journal-dir', help='Directory for the journal used to resume the job after failure', default='.'
+    )
+    parser.add_argument('-td', '--trace-dir', help='Directory for the trace of service calls', default='.')
     parser.add_argument('-at', '--access-token',
                         help='access key', required=True)
     parser.add_argument('-rt', '--refresh-token',
@@ -458,6 +766,9 @@ def main():
         input_geid = args['input']
         operator = args['operator']
         request_id = args['request_id']
+        workers = args['workers']
+        metadata_workers = args['metadata_workers']
+        hierarchical_locks = args['hierarchical_locks']
         minio_token = {
             'at': args['access_token'],
             'rt': args['refresh_token'],
@@ -468,7 +779,28 @@ def main():
         logger_info(f'Using output geid: {output_geid}')
         logger_info(f'Using input geid: {input_geid}')
 
-        copy_execute(output_geid, input_geid, project_code, operator, request_id, minio_token)
+        if args['plan']:
+            report = plan_execute(output_geid, input_geid, project_code, request_id)
+            for line in report.format():
+                logger_info(line)
+            return
+
+        # rerun of the same job continues from the nodes recorded in its journal
+        with CopyJournal(os.path.join(args['journal_dir'], f'folder-copy-{job_id}.sqlite')) as journal:
+            copy_execute(
+                output_geid,
+                input_geid,
+                project_code,
+                operator,
+                request_id,
+                minio_token,
+                workers,
+                metadata_workers,
+                journal,
+                session_id,
+                job_id,
+                hierarchical_locks,
+            )
 
         update_job(session_id, job_id, 'SUCCEED')
 
@@ -482,9 +814,13 @@ def main():
 if __name__ == "__main__":
     try:
         args = parse_inputs()
+        tracer.open(args['trace_dir'], f'folder-copy-{args["job_id"]}')
         main()
     except Exception as e:
         logger_info("[Copy Failed] {}".format(str(e)))
         for info in traceback.format_stack():
             logger_info(info)
         raise
+    finally:
+        for line in tracer.close():
+            logger_info(line)
@@ -20,26 +20,50 @@
 
 import argparse
 import os
+import time
 import traceback
+from typing import List
+from typing import Optional
 
 from config import ConfigClass
+from geid import get_geid_allocator
+from http_client import http
+from locks import get_hierarchical_keys
+from locks import LockSet
+from minio_client import MAX_REMOVE_OBJECTS
 from minio_client import Minio_Client_
+from minio_client import ObjectRemover
 from models import append_suffix_to_filepath
 from models import get_timestamp
 from models import Node
+from models import NodeList
 from models import ResourceType
 from neo4j_helper import archived_file_node
 from neo4j_helper import create_folder_node
 from neo4j_helper import get_children_nodes
+from plan import CATALOGUING
+from plan import DATA
+from plan import DATA_OPS
+from plan import LOCK
+from plan import METADATA
+from plan import MINIO
+from plan import NEO4J
+from plan import PlanReport
+from plan import PREPARE
+from plan import PROVENANCE
+from plan import UTILITY
+from plan import WALK
+from tracing import tracer
+from tree import TreeSnapshot
 from utils import get_resource_by_geid
 from utils import get_session_id
 from utils import http_query_node
 from utils import http_update_node
-from utils import lock_resource
 from utils import logger_info
 from utils import MetaDataFactory
-from utils import unlock_resource
 from utils import update_job
+from workers import BoundedExecutor
+from workers import MetadataOffload
 
 PROCESS_PIPELINE = "data_delete_folder"
 PIPELINE_DESC = '''
@@ -49,18 +73,127 @@ OPERATION_TYPE = "data_delete"
 
 
 class DeleteObjects:
-    def __init__(self, minio_client, metadata_factory):
+    def __init__(
+        self,
+        minio_client,
+        metadata_factory,
+        tree: Optional[TreeSnapshot] = None,
+        executor: Optional[BoundedExecutor] = None,
+        metadata_offload: Optional[MetadataOffload] = None,
+        object_remover: Optional[ObjectRemover] = None,
+    ):
         self.mc = minio_client
         self.metadata_factory = metadata_factory
+        self.tree = tree
+
+        # without executor files are moved one by one in the walking thread
+        if executor is None:
+            executor = BoundedExecutor()
+        self.executor = executor
+
+        if metadata_offload is None:
+            metadata_offload = MetadataOffload()
+        self.metadata_offload = metadata_offload
+
+        # without object remover every object is removed with its own request
+        self.object_remover = object_remover
+
+        # source folders in post-order (children first), archived by archive_folder_nodes() when all files are moved
+        self.deleted_folders: List[Node] = []
 
         self.project = self.metadata_factory.project
         self.oper = self.metadata_factory.oper
         self.zone_label = self.metadata_factory.zone_label
 
+    def get_children_nodes(self, node: Node) -> NodeList:
+        """Return children of folder node from the tree snapshot or fetch them if node is not in the snapshot."""
+
+        if self.tree is not None and node in self.tree:
+            return self.tree.get_children(node)
+
+        return NodeList(get_children_nodes(node.geid))
+
+    def delete_file_node(self, ff_object, current_root_path, parent_node, new_name=None) -> None:
+        """Create trash node of the file and queue removal of its object, metadata is updated in background."""
+
+        # file will need extra step to get all attribute
+        # the format of attribute is {"attr_<field>": "value"}
+        attr = {x: ff_object[x] for x in ff_object if "attr" in x}
+        # TODO move the other place
+        extra_fields = {
+            "archived": True,
+            "in_trashbin": True,
+            "list_priority": parent_node.get("list_priority", 10),
+        }
+        tags = ff_object.get("tags")
+        # create the copied node
+        new_node, _ = archived_file_node(
+            self.project.get("code"),
+            ff_object,
+            self.oper,
+            parent_node.get('id'),
+            current_root_path,
+            self.mc,
+            tags=tags,
+            attribute=attr,
+            new_name=new_name,
+            extra_labels=[ResourceType.TRASH_FILE, self.metadata_factory.zone_label],
+            extra_fields=extra_fields,
+            object_remover=self.object_remover,
+        )
+
+        self.metadata_offload.submit(self.finish_file_node, ff_object, new_node)
+
+    def finish_file_node(self, ff_object, new_node) -> None:
+        """Create metadata of the trash file node and mark the source node as archived."""
+
+        source_geid = ff_object.get("global_entity_id")
+        target_geid = new_node.get("global_entity_id")
+
+        # create the new node in atlas for lineage linking
+        guid = self.metadata_factory.create_catalog_entity(new_node)
+
+        # create the lineage link between greenroom -> relation -> core
+        self.metadata_factory.create_lineage_v3(source_geid, target_geid)
+
+        # deprecate old node in es
+        self.metadata_factory.deprecate_index_in_es(ff_object.get("global_entity_id"))
+
+        # create the file stream/operational logs index in elastic search
+        res_update_audit_logs = self.metadata_factory.update_file_operation_logs(
+            os.path.join(self.zone_label, ff_object.get("display_path", "")),
+            os.path.join(self.zone_label, new_node.get("display_path", ""))
+        )
+        logger_info('res_update_audit_logs: ' + str(res_update_audit_logs.status_code))
+
+        # update the old node to archived
+        update_json = {'archived': True}
+        http_update_node("File", ff_object.get("id"), update_json)
+
+    def archive_folder_nodes(self) -> None:
+        """Archive deleted source folders deepest first, should be called after the executor and offload are joined.
+
+        The walk of the job rerun skips archived folders with their subtree, so the folder is archived only when all
+        of its children were moved to trash.
+        """
+
+        deleted_folders, self.deleted_folders = self.deleted_folders, []
+        for ff_object in deleted_folders:
+            self.finish_folder_node(ff_object)
+
+    def finish_folder_node(self, ff_object) -> None:
+        """Deprecate the source folder in search index and mark it as archived."""
+
+        # deprecate old node in es
+        self.metadata_factory.deprecate_index_in_es(ff_object.get("global_entity_id"))
+
+        # update the old node to archived
+        update_json = {'archived': True}
+        http_update_node("Folder", ff_object.get("id"), update_json)
+
     def recursive_delete(self, currenct_nodes, current_root_path, parent_node: Node, new_name=None):
         # copy the files under the project neo4j node to dataset node
         for ff_object in currenct_nodes:
-            ff_geid = ff_object.get("global_entity_id")
             # TODO update here
 
             # update here if the folder/file is archieved then skip
@@ -70,59 +203,9 @@ class DeleteObjects:
             print(ff_object)
 
             # recursive logic below
+            # files are moved by the executor workers, folders are always created in the walking thread
             if 'File' in ff_object.get("labels"):
-                # TODO simplify here
-                minio_path = ff_object.get('location').split("//")[-1]
-                _, bucket, old_path = tuple(minio_path.split("/", 2))
-
-                # file will need extra step to get all attribute
-                # the format of attribute is {"attr_<field>": "value"}
-                attr = {x: ff_object[x] for x in ff_object if "attr" in x}
-                # TODO move the other place
-                extra_fields = {
-                    "archived": True,
-                    "in_trashbin": True,
-                    "list_priority": parent_node.get("list_priority", 10),
-                }
-                tags = ff_object.get("tags")
-                # create the copied node
-                new_node, _ = archived_file_node(
-                    self.project.get("code"),
-                    ff_object,
-                    self.oper,
-                    parent_node.get('id'),
-                    current_root_path,
-                    self.mc,
-                    tags=tags,
-                    attribute=attr,
-                    new_name=new_name,
-                    extra_labels=[ResourceType.TRASH_FILE, self.metadata_factory.zone_label],
-                    extra_fields=extra_fields,
-                )
-
-                ################################## Metadata Generating ###################################
-                source_geid = ff_object.get("global_entity_id")
-                target_geid = new_node.get("global_entity_id")
-
-                # create the new node in atlas for lineage linking
-                guid = self.metadata_factory.create_catalog_entity(new_node)
-
-                # create the lineage link between greenroom -> relation -> core
-                self.metadata_factory.create_lineage_v3(source_geid, target_geid)
-
-                # deprecate old node in es
-                self.metadata_factory.deprecate_index_in_es(ff_object.get("global_entity_id"))
-
-                # create the file stream/operational logs index in elastic search
-                res_update_audit_logs = self.metadata_factory.update_file_operation_logs(
-                    os.path.join(self.zone_label, ff_object.get("display_path", "")),
-                    os.path.join(self.zone_label, new_node.get("display_path", ""))
-                )
-                logger_info('res_update_audit_logs: ' + str(res_update_audit_logs.status_code))
-
-                # update the old node to archived
-                update_json = {'archived': True}
-                http_update_node("File", ff_object.get("id"), update_json)
+                self.executor.submit(self.delete_file_node, ff_object, current_root_path, parent_node, new_name)
 
             # else it is folder will trigger the recursive
             elif 'Folder' in ff_object.get("labels"):
@@ -146,71 +229,140 @@ class DeleteObjects:
                     extra_fields=extra_fields,
                 )
 
-                # deprecate old node in es
-                self.metadata_factory.deprecate_index_in_es(ff_object.get("global_entity_id"))
-
                 # seconds recursively go throught the folder/subfolder by same proccess
                 # also if we want the folder to be renamed if new_name is not None
                 next_root = current_root_path + "/" + (new_name if new_name else ff_object.get("name"))
-                children_nodes = get_children_nodes(ff_geid)
+                children_nodes = self.get_children_nodes(Node(ff_object))
                 self.recursive_delete(children_nodes, next_root, new_node)
 
-                # update the old node to archived
-                update_json = {'archived': True}
-                http_update_node("Folder", ff_object.get("id"), update_json)
+                # children can be still queued in the executor and the metadata offload at this point
+                self.deleted_folders.append(ff_object)
 
         return
 
     #################################################################################################################
 
 
-# TODO somehow refactory here?
-def recursive_lock(code, nodes, zone):
-    """Function will recursively lock the node tree."""
+def recursive_lock(
+    lock_set: LockSet, code, tree: TreeSnapshot, zone, hierarchical: bool = False
+) -> Optional[Exception]:
+    """Function will lock every node of the tree snapshot, or only the subtrees in hierarchical mode."""
 
     bucket_prefix = "gr-" if zone == ConfigClass.GR_ZONE_LABEL else "core-"
-    # this is for crash recovery, if something trigger the exception
+    # the lock set is for crash recovery, if something trigger the exception
     # we will unlock the locked node only. NOT the whole tree. The example
     # case will be copy the same node, if we unlock the whole tree in exception
     # then it will affect the processing one.
-    locked_node, err = [], None
+    keys, err = [], None
 
-    def recur_walker(currenct_nodes):
-        """Recursively trace down the node tree and run the lock function."""
+    # the deleted nodes are skipped by the walk together with their subtree
+    for ff_object in tree.walk():
+        # conner case here, we DONT lock the name folder
+        # for the copy we will lock the both source and target
+        if ff_object.get("display_path") != ff_object.get("uploader"):
+            source_key = "{}/{}".format(bucket_prefix + code, ff_object.get("display_path"))
+            keys.append((source_key, "write"))
 
-        for ff_object in currenct_nodes:
-            # we will skip the deleted nodes
-            if ff_object.get("archived", False):
-                continue
-
-            # conner case here, we DONT lock the name folder
-            # for the copy we will lock the both source and target
-            if ff_object.get("display_path") != ff_object.get("uploader"):
-                source_key = "{}/{}".format(bucket_prefix + code, ff_object.get("display_path"))
-                lock_resource(source_key, "write")
-                locked_node.append((source_key, "write"))
-
-            # open the next recursive loop if it is folder
-            if 'Folder' in ff_object.get("labels"):
-                children_nodes = get_children_nodes(ff_object.get("global_entity_id", None))
-                recur_walker(children_nodes)
-
-        return
+    if hierarchical:
+        keys = get_hierarchical_keys(keys)
 
     # start here
     try:
-        recur_walker(nodes)
+        lock_set.acquire(keys)
     except Exception as e:
         err = e
 
-    return locked_node, err
+    return err
+
+
+def plan_delete(tree: TreeSnapshot) -> PlanReport:
+    """Count the work deletion of the tree snapshot would do, nothing is locked or moved."""
+
+    report = PlanReport('folder move to trash')
+    # fetch of the tree snapshot
+    report.add_calls(PREPARE, NEO4J, len(tree.children))
+
+    files = 0
+    for ff_object in tree.walk():
+        if ff_object.get("display_path") != ff_object.get("uploader"):
+            # write lock released at the end
+            report.add_calls(LOCK, DATA_OPS, 2)
+
+        if ff_object.is_file:
+            report.add_file(ff_object, copied=False)
+            files += 1
+
+            # trash node with relation and geid
+            report.add_calls(DATA, NEO4J, 2)
+            report.add_calls(DATA, UTILITY)
+
+            # atlas entity, lineage, search index, audit log and archived flag of the source node
+            report.add_calls(METADATA, CATALOGUING)
+            report.add_calls(METADATA, PROVENANCE, 3)
+            report.add_calls(METADATA, NEO4J)
+        elif ff_object.is_folder:
+            report.add_folder()
+
+            # trash node with relation and geid
+            report.add_calls(WALK, NEO4J, 2)
+            report.add_calls(WALK, UTILITY)
+
+            # search index and archived flag of the source node
+            report.add_calls(METADATA, NEO4J)
+            report.add_calls(METADATA, PROVENANCE)
+
+    # objects are removed with multi-object delete requests
+    report.add_calls(DATA, MINIO, -(-files // MAX_REMOVE_OBJECTS))
+
+    return report
+
+
+def plan_execute(input_geid) -> PlanReport:
+    """Walk the source tree and return the plan of the deletion without modifying anything."""
+
+    source_node = get_resource_by_geid(input_geid)
+    output_folder_name = append_suffix_to_filepath(source_node['name'], get_timestamp())
 
+    started = time.monotonic()
+    tree = TreeSnapshot.fetch([source_node], source_node.get("uploader"), root_name=output_folder_name)
+    elapsed = time.monotonic() - started
 
-def delete_execute(job_id, input_geid, project_code, operator, auth_token: dict):
+    report = plan_delete(tree)
+    report.measure(NEO4J, elapsed, len(tree.children))
+
+    return report
+
+
+def check_removed_objects(object_remover: ObjectRemover) -> None:
+    """Log result of source objects removal and raise if some of them were not removed, so the job fails."""
+
+    logger_info(f'Removed {object_remover.removed} objects')
+    if not object_remover.errors:
+        return
+
+    for bucket, obj, error in object_remover.errors:
+        logger_info(f'Unable to remove object {bucket}/{obj}: {error}')
+
+    raise Exception(f'Unable to remove {len(object_remover.errors)} objects from minio')
+
+
+def delete_execute(
+    job_id,
+    input_geid,
+    project_code,
+    operator,
+    auth_token: dict,
+    workers: int = 1,
+    metadata_workers: int = 1,
+    hierarchical_locks: bool = False,
+):
     """Entry point for the deletion logic. inside function, it will do some
     paperation(eg. fecthing necessary infomation), then calling recursive
     function recursive_copy to archive the input nodes."""
 
+    # every delete and metadata worker may hold a connection to the same service at a time
+    http.configure(pool_size=workers + metadata_workers)
+
     print("====== Delete Start")
     source_node = get_resource_by_geid(input_geid)
     print("source:", source_node)
@@ -220,11 +372,17 @@ def delete_execute(job_id, input_geid, project_code, operator, auth_token: dict)
     project_info = project_response.json()[0]
     output_folder_name = append_suffix_to_filepath(source_node['name'], get_timestamp())
 
-    locked_node = []
+    lock_set = LockSet()
     try:
         zone = ConfigClass.GR_ZONE_LABEL if  ConfigClass.GR_ZONE_LABEL in source_node.get("labels") else ConfigClass.CORE_ZONE_LABEL
+        # walk the source tree only once, both lock and delete phases are using the same snapshot
+        tree = TreeSnapshot.fetch([source_node], source_node.get("uploader"), root_name=output_folder_name)
+
+        # start allocating geids for the trash nodes while locks are being taken
+        get_geid_allocator().prefill(len(tree))
+
         # at begining lock the whole node tree
-        locked_node, err = recursive_lock(project_info.get("code"), [source_node], zone)
+        err = recursive_lock(lock_set, project_info.get("code"), tree, zone, hierarchical_locks)
         if err:
             raise err
 
@@ -236,17 +394,25 @@ def delete_execute(job_id, input_geid, project_code, operator, auth_token: dict)
             project_info, operator, zone, PROCESS_PIPELINE, PIPELINE_DESC, OPERATION_TYPE
         )
 
-        delete_object = DeleteObjects(mc, metadata_factory)
-        delete_object.recursive_delete(
-            [source_node], source_node.get("uploader"), project_info, new_name=output_folder_name
-        )
+        # the executor is finished first, then the job waits for the metadata offload and the last object batches
+        object_remover = ObjectRemover(mc.client)
+        with object_remover:
+            with MetadataOffload(metadata_workers) as metadata_offload, BoundedExecutor(workers) as executor:
+                delete_object = DeleteObjects(mc, metadata_factory, tree, executor, metadata_offload, object_remover)
+                delete_object.recursive_delete(
+                    tree.nodes, source_node.get("uploader"), project_info, new_name=output_folder_name
+                )
+
+            # not reached when any of the files failed, so the folders are walked again by the job rerun
+            delete_object.archive_folder_nodes()
+
+        check_removed_objects(object_remover)
     except Exception as e:
         raise e
     finally:
         # here we unlock the locked nodes ONLY
         print("Start to unlock the nodes")
-        for resource_key, operation in locked_node:
-            unlock_resource(resource_key, operation)
+        lock_set.release()
 
 
 def parse_inputs():
@@ -266,6 +432,24 @@ def parse_inputs():
                         help='Action operator', required=True)
     parser.add_argument('-j', '--job-id',
                         help='Job geid', required=True)
+    parser.add_argument('-w', '--workers', help='Number of files moved in parallel', type=int, default=1)
+    parser.add_argument(
+        '-mw',
+        '--metadata-workers',
+        help='Number of workers creating metadata in background, has effect only when greater than 1',
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        '-hl',
+        '--hierarchical-locks',
+        help='Lock subtrees with intent locks on their ancestors instead of every node',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--plan', help='Only report the work and estimated time of the move, nothing is modified', action='store_true'
+    )
+    parser.add_argument('-td', '--trace-dir', help='Directory for the trace of service calls', default='.')
     parser.add_argument('-at', '--access-token',
                         help='access key', required=True)
     parser.add_argument('-rt', '--refresh-token',
@@ -285,6 +469,9 @@ def main():
         input_geid = args['input_geid']
         project_code = args['project_code']
         operator = args['operator']
+        workers = args['workers']
+        metadata_workers = args['metadata_workers']
+        hierarchical_locks = args['hierarchical_locks']
         session_id = get_session_id(job_id)
 
         logger_info('environment: ' + str(args.get('environment')))
@@ -296,8 +483,16 @@ def main():
             "at": args['access_token'],
             "rt": args['refresh_token']
         }
+
+        if args['plan']:
+            for line in plan_execute(input_geid).format():
+                logger_info(line)
+            return
+
         try:
-            delete_execute(job_id, input_geid, project_code, operator, token)
+            delete_execute(
+                job_id, input_geid, project_code, operator, token, workers, metadata_workers, hierarchical_locks
+            )
             update_job(session_id, job_id, 'SUCCEED')
             logger_info(f'Successfully moved file from {input_geid} ')
 
@@ -313,6 +508,7 @@ def main():
 if __name__ == "__main__":
     try:
         args = parse_inputs()
+        tracer.open(args['trace_dir'], f'folder-move-{args["job_id"]}')
         logger_info(args)
         main()
     except Exception as e:
@@ -320,3 +516,6 @@ if __name__ == "__main__":
         for info in traceback.format_stack():
             logger_info(info)
         raise
+    finally:
+        for line in tracer.close():
+            logger_info(line)
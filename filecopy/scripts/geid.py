@@ -0,0 +1,183 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import threading
+from collections import deque
+from typing import Callable
+from typing import Deque
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from config import ConfigClass
+from http_client import http
+from workers import map_concurrently
+
+
+def fetch_geid() -> str:
+    """Fetch one new geid from the utility service."""
+
+    response = http.get(ConfigClass.COMMON_SERVICE + "utility/id")
+    if response.status_code != 200:
+        raise Exception("Error when fetching geid " + response.text)
+
+    return response.json().get("result")
+
+
+class GeidAllocator:
+    """Keep a pool of pre-allocated geids that is refilled in the background.
+
+    A refill fetches a batch of geids with concurrent requests and starts as soon as the pool drops to the low
+    watermark, so callers only wait when the pool is empty (e.g. on the first call). When the number of geids the job
+    needs is passed to prefill(), refills are sized to the remaining demand and capped at the batch size. Geids
+    fetched before a failure are kept, if refill fetches nothing the error is raised once from get() and the next
+    call starts a new refill.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 50,
+        low_watermark: Optional[int] = None,
+        workers: int = 4,
+        fetch: Callable[[], str] = fetch_geid,
+    ) -> None:
+        if low_watermark is None:
+            low_watermark = batch_size // 2
+
+        self.batch_size = batch_size
+        self.low_watermark = low_watermark
+        self.workers = workers
+        self._fetch = fetch
+
+        self._pool: Deque[str] = deque()
+        self._condition = threading.Condition()
+        self._refilling = False
+        self._error: Optional[Exception] = None
+        # number of geids the job still needs, None when it is unknown
+        self._demand: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._pool)
+
+    def _fetch_batch(self, size: int) -> Tuple[List[str], Optional[Exception]]:
+        """Fetch up to size geids and return the fetched ones with the first error if any."""
+
+        def fetch(_: int) -> Tuple[Optional[str], Optional[Exception]]:
+            try:
+                return self._fetch(), None
+            except Exception as e:
+                return None, e
+
+        geids, error = [], None
+        for geid, fetch_error in map_concurrently(fetch, range(size), self.workers):
+            if fetch_error is None:
+                geids.append(geid)
+            elif error is None:
+                error = fetch_error
+
+        return geids, error
+
+    def _refill(self, size: int) -> None:
+        geids, error = self._fetch_batch(size)
+
+        with self._condition:
+            self._pool.extend(geids)
+            # error is kept only when nothing was fetched, otherwise the next refill will retry
+            self._error = error if not geids else None
+            self._refilling = False
+            self._condition.notify_all()
+
+    def _get_refill_size(self) -> int:
+        """Return number of geids to fetch, condition lock should be held by the caller."""
+
+        if self._demand is None:
+            return self.batch_size
+
+        return max(1, min(self.batch_size, self._demand - len(self._pool)))
+
+    def _is_refill_needed(self) -> bool:
+        """Check if pool dropped to the low watermark and demand is not covered by the pool yet."""
+
+        if len(self._pool) > self.low_watermark:
+            return False
+
+        return self._demand is None or self._demand > len(self._pool)
+
+    def _start_refill(self) -> None:
+        """Start background refill if it is not running, condition lock should be held by the caller."""
+
+        if self._refilling:
+            return
+
+        self._refilling = True
+        threading.Thread(target=self._refill, args=(self._get_refill_size(),), daemon=True).start()
+
+    def prefill(self, demand: Optional[int] = None) -> None:
+        """Start fetching geids ahead of the first get() call.
+
+        Demand is the number of geids the job is expected to need, for example the number of nodes in the tree.
+        """
+
+        with self._condition:
+            self._demand = demand
+            if self._is_refill_needed():
+                self._start_refill()
+
+    def get(self) -> str:
+        """Return one pre-allocated geid."""
+
+        with self._condition:
+            while not self._pool:
+                if self._error is not None:
+                    error, self._error = self._error, None
+                    raise error
+                self._start_refill()
+                self._condition.wait()
+
+            geid = self._pool.popleft()
+            if self._demand is not None:
+                self._demand = max(0, self._demand - 1)
+
+            if self._is_refill_needed():
+                self._start_refill()
+
+        return geid
+
+
+_allocator: Optional[GeidAllocator] = None
+_allocator_lock = threading.Lock()
+
+
+def get_geid_allocator() -> GeidAllocator:
+    """Return allocator shared by all node creation functions of the process."""
+
+    global _allocator
+
+    with _allocator_lock:
+        if _allocator is None:
+            _allocator = GeidAllocator()
+
+    return _allocator
+
+
+def get_geid() -> str:
+    """Return new geid from the shared pre-allocated pool."""
+
+    return get_geid_allocator().get()
@@ -0,0 +1,105 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import sqlite3
+import threading
+from enum import Enum
+from typing import Dict
+from typing import NamedTuple
+from typing import Optional
+
+
+class JournalStatus(str, Enum):
+    # destination node is created
+    CREATED = 'created'
+    # minio object is copied, metadata is not finished yet
+    COPIED = 'copied'
+    DONE = 'done'
+
+
+class JournalEntry(NamedTuple):
+    source_geid: str
+    status: JournalStatus
+    destination_geid: str
+    destination_name: str
+    version_id: Optional[str] = None
+
+
+class CopyJournal:
+    """Crash-safe record of copy progress stored in a local SQLite database.
+
+    Every source node is recorded with the destination node created for it and the last finished step, so a rerun of
+    the same job can skip finished nodes and continue the unfinished ones. Each record is committed immediately.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS nodes ('
+            'source_geid TEXT PRIMARY KEY, '
+            'status TEXT NOT NULL, '
+            'destination_geid TEXT NOT NULL, '
+            'destination_name TEXT NOT NULL, '
+            'version_id TEXT)'
+        )
+
+        self._entries: Dict[str, JournalEntry] = {}
+        for row in self._connection.execute(
+            'SELECT source_geid, status, destination_geid, destination_name, version_id FROM nodes'
+        ):
+            entry = JournalEntry(row[0], JournalStatus(row[1]), row[2], row[3], row[4])
+            self._entries[entry.source_geid] = entry
+
+    def __enter__(self) -> 'CopyJournal':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, source_geid: str) -> Optional[JournalEntry]:
+        return self._entries.get(source_geid)
+
+    def record(
+        self,
+        source_geid: str,
+        status: JournalStatus,
+        destination_geid: str,
+        destination_name: str,
+        version_id: Optional[str] = None,
+    ) -> None:
+        entry = JournalEntry(source_geid, status, destination_geid, destination_name, version_id)
+
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO nodes (source_geid, status, destination_geid, destination_name, version_id) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (source_geid, status.value, destination_geid, destination_name, version_id),
+            )
+            self._entries[source_geid] = entry
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
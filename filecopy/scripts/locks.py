@@ -0,0 +1,158 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Tuple
+
+from utils import lock_resource
+from utils import unlock_resource
+
+LockKey = Tuple[str, str]
+
+READ = 'read'
+WRITE = 'write'
+# hierarchical locks, subtree operation locks the key with every key below it and every ancestor gets intent lock
+SUBTREE_READ = 'subtree_read'
+SUBTREE_WRITE = 'subtree_write'
+INTENT_READ = 'intent_read'
+INTENT_WRITE = 'intent_write'
+
+
+def get_parent_keys(resource_key: str) -> List[str]:
+    """Return keys of all ancestors starting from the bucket, 'core-code/a/b' has 'core-code' and 'core-code/a'."""
+
+    parts = resource_key.split('/')
+    return ['/'.join(parts[:depth]) for depth in range(1, len(parts))]
+
+
+def get_hierarchical_keys(keys: Iterable[LockKey]) -> List[LockKey]:
+    """Replace read or write lock of every node with subtree locks of the topmost keys and intent locks above them.
+
+    The number of keys depends on the number of subtrees and their depth rather than on the number of nodes. A read
+    subtree with a write key below it is locked for write as a whole.
+    """
+
+    roots: Dict[str, str] = {}
+    for resource_key, operation in sorted(keys, key=lambda key: key[0].count('/')):
+        parent = next((key for key in get_parent_keys(resource_key) if key in roots), None)
+        if parent is None:
+            if roots.get(resource_key) != WRITE:
+                roots[resource_key] = operation
+        elif operation == WRITE:
+            roots[parent] = WRITE
+
+    intents: Dict[str, str] = {}
+    for resource_key, operation in roots.items():
+        for parent in get_parent_keys(resource_key):
+            # intent write blocks everything intent read does
+            if intents.get(parent) != INTENT_WRITE:
+                intents[parent] = INTENT_WRITE if operation == WRITE else INTENT_READ
+
+    hierarchical_keys = list(intents.items())
+    for resource_key, operation in roots.items():
+        hierarchical_keys.append((resource_key, SUBTREE_WRITE if operation == WRITE else SUBTREE_READ))
+    return sorted(hierarchical_keys, key=lambda key: (key[0].count('/'), key[0]))
+
+
+class LockSet:
+    """Acquire and release many resource locks with concurrent requests to the lock service.
+
+    Lock keys are pairs of resource key and operation (for example 'read' or 'write'). Acquiring is all or nothing, if
+    any key is already in use every key locked by the same call is released before the error is raised.
+    """
+
+    def __init__(
+        self,
+        workers: int = 16,
+        lock: Callable[[str, str], Dict[str, Any]] = lock_resource,
+        unlock: Callable[[str, str], Dict[str, Any]] = unlock_resource,
+    ) -> None:
+        self.workers = workers
+        self._lock = lock
+        self._unlock = unlock
+
+        self._mutex = threading.Lock()
+        # dict keeps the locking order and makes the membership check cheap for large trees
+        self.locked: Dict[LockKey, None] = {}
+
+    def __len__(self) -> int:
+        return len(self.locked)
+
+    def __contains__(self, key: LockKey) -> bool:
+        return key in self.locked
+
+    def _run(self, function: Callable[[str, str], Any], keys: List[LockKey]) -> Tuple[List[LockKey], List[Exception]]:
+        """Call function for every key concurrently and return keys that succeeded and errors."""
+
+        succeeded, errors = [], []
+
+        def call(key: LockKey) -> None:
+            try:
+                function(*key)
+            except Exception as e:
+                errors.append(e)
+            else:
+                succeeded.append(key)
+
+        if len(keys) <= 1 or self.workers == 1:
+            for key in keys:
+                call(key)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(keys))) as executor:
+                list(executor.map(call, keys))
+
+        return succeeded, errors
+
+    def acquire(self, keys: Iterable[LockKey]) -> None:
+        """Lock all keys or none of them.
+
+        Keys that are already held by this set are skipped.
+        """
+
+        with self._mutex:
+            pending = [key for key in dict.fromkeys(keys) if key not in self.locked]
+
+        locked, errors = self._run(self._lock, pending)
+        if errors:
+            # roll back only what was locked by this call, previously held keys stay in the set
+            self._run(self._unlock, locked)
+            raise errors[0]
+
+        with self._mutex:
+            self.locked.update(dict.fromkeys(locked))
+
+    def release(self) -> None:
+        """Unlock every key held by this set.
+
+        All keys are attempted even if some of them fail, the first error is raised after that.
+        """
+
+        with self._mutex:
+            keys, self.locked = list(self.locked), {}
+
+        _, errors = self._run(self._unlock, keys)
+        if errors:
+            raise errors[0]
@@ -0,0 +1,153 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import threading
+import time
+from collections import deque
+from typing import Callable
+from typing import Deque
+from typing import List
+from typing import Optional
+
+
+class LogShipper:
+    """Send log messages from a background thread, so logging costs callers only an in-memory append.
+
+    Buffered messages are joined into one message per batch. A batch is sent when it has max_batch_size messages or
+    flush_interval seconds after its first message. When the buffer is full new messages are dropped and the number of
+    dropped messages is reported with the next batch. Messages which are still buffered are sent by flush() or close().
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str], None],
+        max_batch_size: int = 50,
+        flush_interval: float = 1.0,
+        max_buffer_size: int = 10000,
+    ) -> None:
+        self.send = send
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer_size = max_buffer_size
+
+        self._buffer: Deque[str] = deque()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._dropped = 0
+        self._sending = 0
+        self._flushing = 0
+        self._closed = False
+
+    def log(self, message: str) -> None:
+        with self._condition:
+            if self._closed:
+                return
+
+            if len(self._buffer) >= self.max_buffer_size:
+                self._dropped += 1
+                return
+
+            self._buffer.append(message)
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='log-shipper', daemon=True)
+                self._thread.start()
+            elif len(self._buffer) >= self.max_batch_size:
+                self._condition.notify_all()
+
+    def _is_batch_ready(self) -> bool:
+        return len(self._buffer) >= self.max_batch_size or self._flushing > 0 or self._closed
+
+    def _next_batch(self) -> Optional[List[str]]:
+        with self._condition:
+            while not self._buffer and not self._closed:
+                self._condition.wait()
+
+            if not self._buffer:
+                return None
+
+            deadline = time.monotonic() + self.flush_interval
+            while not self._is_batch_ready():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            size = min(len(self._buffer), self.max_batch_size)
+            batch = [self._buffer.popleft() for _ in range(size)]
+            if self._dropped:
+                batch.append(f'[{self._dropped} log messages dropped]')
+                self._dropped = 0
+
+            self._sending += 1
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            try:
+                self.send('\n'.join(batch))
+            except Exception as e:
+                print(f'Unable to send log messages: {e}')
+            finally:
+                with self._condition:
+                    self._sending -= 1
+                    self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Send all buffered messages and wait until they are delivered."""
+
+        with self._condition:
+            if self._thread is None:
+                return
+
+            self._flushing += 1
+            self._condition.notify_all()
+            try:
+                self._condition.wait_for(lambda: not self._buffer and not self._sending, timeout)
+            finally:
+                self._flushing -= 1
+
+    def close(self, timeout: Optional[float] = None) -> int:
+        """Send all buffered messages and stop the background thread, later messages are ignored.
+
+        Messages which are not sent within timeout seconds are dropped, their number is printed and returned.
+        """
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join(timeout)
+
+        with self._condition:
+            dropped = len(self._buffer) + self._dropped
+            self._buffer.clear()
+            self._dropped = 0
+
+        if dropped:
+            print(f'{dropped} log messages were not sent')
+
+        return dropped
@@ -18,19 +18,261 @@
 # permissions and limitations under the Licence.
 # 
 
+import base64
+import hashlib
+import json
+import threading
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
 import requests
 import os
 import time
 import datetime
 import jwt
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
 
 from minio import Minio
 from minio.commonconfig import Tags
+from minio.credentials import Credentials
 from minio.credentials.providers import ClientGrantsProvider
+from minio.credentials.providers import Provider
 from minio.commonconfig import REPLACE, CopySource
+from minio.datatypes import Part
+from minio.deleteobjects import DeleteObject
 from config import ConfigClass
+from tracing import trace_minio
+
+# single copy_object request is limited to 5GiB by S3 api
+MAX_COPY_OBJECT_SIZE = 5 * 1024 ** 3
+MULTIPART_COPY_PART_SIZE = 512 * 1024 ** 2
+MAX_MULTIPART_PARTS = 10000
+# multi-object delete request is limited to 1000 keys by S3 api
+MAX_REMOVE_OBJECTS = 1000
+
+
+def multipart_copy_object(
+    client: Minio,
+    bucket,
+    obj,
+    source_bucket,
+    source_obj,
+    part_size=MULTIPART_COPY_PART_SIZE,
+    workers=4,
+):
+    """Copy object inside minio with parallel UploadPartCopy requests.
+
+    Object data never leaves the minio server, so objects of any size can be copied without temporary files.
+    Multipart upload is aborted if any of the parts fails.
+    """
+
+    stat = client.stat_object(source_bucket, source_obj)
+    size = stat.size
+
+    # s3 does not allow more than 10000 parts, so part size grows for very large objects
+    part_size = max(part_size, -(-size // MAX_MULTIPART_PARTS))
+    ranges = [
+        (number, start, min(start + part_size, size) - 1)
+        for number, start in enumerate(range(0, size, part_size), start=1)
+    ]
+
+    copy_headers = {
+        "x-amz-copy-source": quote("/{}/{}".format(source_bucket, source_obj)),
+        # make sure all parts are copied from the same version of the source object
+        "x-amz-copy-source-if-match": stat.etag,
+    }
+
+    def copy_part(part_range):
+        part_number, start, end = part_range
+        headers = dict(copy_headers)
+        headers["x-amz-copy-source-range"] = "bytes={}-{}".format(start, end)
+        etag, _ = client._upload_part_copy(bucket, obj, upload_id, part_number, headers)
+        return Part(part_number, etag)
+
+    upload_id = client._create_multipart_upload(bucket, obj, {})
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(copy_part, ranges))
+
+        result = client._complete_multipart_upload(bucket, obj, upload_id, parts)
+    except Exception:
+        client._abort_multipart_upload(bucket, obj, upload_id)
+        raise
+
+    return result
+
+
+class ObjectRemover:
+    """Remove objects with multi-object delete requests of up to 1000 keys.
+
+    Objects are buffered per bucket and removed once the batch is full or on flush(). Failed removals do not stop
+    the other batches, they are collected in errors as (bucket, object, message) and should be checked after flush().
+    """
+
+    def __init__(self, client: Minio, batch_size: int = MAX_REMOVE_OBJECTS) -> None:
+        if not 0 < batch_size <= MAX_REMOVE_OBJECTS:
+            raise ValueError(f"Batch size should be between 1 and {MAX_REMOVE_OBJECTS}")
+
+        self.client = client
+        self.batch_size = batch_size
+        self.removed = 0
+        self.errors: List[Tuple[str, str, str]] = []
+
+        self._pending: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "ObjectRemover":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        # nodes of the queued objects are already in trash bin, so objects are removed even if the job fails
+        self.flush()
+
+    def add(self, bucket: str, obj: str) -> None:
+        """Queue object removal, the batch of the bucket is removed once it is full."""
+
+        with self._lock:
+            pending = self._pending.setdefault(bucket, [])
+            pending.append(obj)
+            if len(pending) < self.batch_size:
+                return
+            batch = self._pending.pop(bucket)
+
+        self._remove(bucket, batch)
+
+    def flush(self) -> None:
+        """Remove all queued objects."""
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        for bucket, batch in pending.items():
+            self._remove(bucket, batch)
+
+    def _remove(self, bucket: str, batch: List[str]) -> None:
+        errors = []
+        try:
+            # the request is sent only when the returned errors are consumed
+            for error in self.client.remove_objects(bucket, [DeleteObject(obj) for obj in batch]):
+                errors.append((bucket, error.name, f"{error.code}: {error.message}"))
+        except Exception as e:
+            errors = [(bucket, obj, str(e)) for obj in batch]
+
+        with self._lock:
+            self.removed += len(batch) - len(errors)
+            self.errors.extend(errors)
 
 
+# cached credentials are refreshed in the background this long before they expire
+CREDENTIALS_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+
+def get_token_subject(access_token: str) -> str:
+    """Return user of the access token, the hash of the token is used if it can not be decoded."""
+
+    token = access_token.replace("Bearer ", "")
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return claims["sub"]
+    except (IndexError, KeyError, TypeError, ValueError):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+
+def get_credentials_expiration(credentials: Credentials) -> Optional[datetime.datetime]:
+    # minio 7.0 keeps expiration only as a private attribute, later versions expose it, both in utc without timezone
+    return getattr(credentials, "expiration", getattr(credentials, "_expiration", None))
+
+
+class CachedCredentialsProvider(Provider):
+    """Share STS credentials of one user between all minio clients of the process.
+
+    Credentials are refreshed from a background timer before they expire, so requests of the clients do not wait
+    for the token exchange and the STS call.
+    """
+
+    def __init__(
+        self,
+        jwt_provider_func: Callable[[], Dict[str, Any]],
+        sts_endpoint: str,
+        refresh_margin: datetime.timedelta = CREDENTIALS_REFRESH_MARGIN,
+    ) -> None:
+        self.jwt_provider_func = jwt_provider_func
+        self.sts_endpoint = sts_endpoint
+        self.refresh_margin = refresh_margin
+
+        self._credentials: Optional[Credentials] = None
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    @property
+    def is_valid(self) -> bool:
+        """Check if credentials were already retrieved and are not expired."""
+
+        credentials = self._credentials
+        return credentials is not None and not credentials.is_expired()
+
+    def _refresh(self) -> Credentials:
+        credentials = ClientGrantsProvider(self.jwt_provider_func, self.sts_endpoint).retrieve()
+        self._credentials = credentials
+
+        expiration = get_credentials_expiration(credentials)
+        if expiration is not None:
+            lifetime = (expiration - datetime.datetime.utcnow()).total_seconds()
+            delay = lifetime - self.refresh_margin.total_seconds()
+            if delay <= 0:
+                # short lived credentials are refreshed in the middle of their lifetime
+                delay = lifetime / 2
+
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(max(delay, 0), self._refresh_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+
+        return credentials
+
+    def _refresh_in_background(self) -> None:
+        try:
+            with self._lock:
+                self._refresh()
+        except Exception as e:
+            # credentials are retrieved again by the next request once they expire
+            print(f"Unable to refresh minio credentials: {e}")
+
+    def retrieve(self) -> Credentials:
+        with self._lock:
+            if not self.is_valid:
+                return self._refresh()
+
+            return self._credentials
+
+
+_credentials_providers: Dict[str, CachedCredentialsProvider] = {}
+_credentials_providers_lock = threading.Lock()
+
+
+def get_cached_credentials_provider(
+    access_token: str, jwt_provider_func: Callable[[], Dict[str, Any]], sts_endpoint: str
+) -> CachedCredentialsProvider:
+    """Return credentials provider shared by all clients of the token user."""
+
+    key = f"{sts_endpoint}/{get_token_subject(access_token)}"
+    with _credentials_providers_lock:
+        provider = _credentials_providers.get(key)
+        if provider is None:
+            provider = _credentials_providers[key] = CachedCredentialsProvider(jwt_provider_func, sts_endpoint)
+        elif not provider.is_valid:
+            # tokens of the new client are more recent, so they are used for the next token exchange
+            provider.jwt_provider_func = jwt_provider_func
+
+    return provider
+
 
 class Minio_Client_():
 
@@ -40,17 +282,20 @@ class Minio_Client_():
         self.access_token = access_token
         self.refresh_token = refresh_token
         
-        # retrieve credential provide with tokens
+        # retrieve credential provide with tokens, credentials of the same user are shared between clients
         c = self.get_provider()
+        is_credentials_valid = c.is_valid
 
         self.client = Minio(
             ConfigClass.MINIO_ENDPOINT, 
             credentials=c,
             secure=ConfigClass.MINIO_HTTPS)
+        trace_minio(self.client)
 
         # add a sanity check for the token to see if the token
-        # is expired
-        self.client.list_buckets()
+        # is expired, cached credentials were already checked by previous client
+        if not is_credentials_valid:
+            self.client.list_buckets()
 
 
     # function helps to get new token/refresh the token
@@ -84,7 +329,8 @@ class Minio_Client_():
     def get_provider(self):
         minio_http = ("https://" if ConfigClass.MINIO_HTTPS else "http://") + ConfigClass.MINIO_ENDPOINT
         # print(minio_http)
-        provider = ClientGrantsProvider(
+        provider = get_cached_credentials_provider(
+            self.access_token,
             self._get_jwt,
             minio_http,
         )
@@ -99,6 +345,10 @@ class Minio_Client_():
         )
         return result
 
+    def multipart_copy_object(self, bucket, obj, source_bucket, source_obj, workers=4):
+        result = multipart_copy_object(self.client, bucket, obj, source_bucket, source_obj, workers=workers)
+        return result
+
     def fput_object(self, bucket_name, object_name, file_path):
         result = self.client.fput_object(
             bucket_name,
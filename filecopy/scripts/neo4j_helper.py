@@ -18,18 +18,22 @@
 # permissions and limitations under the Licence.
 # 
 
-import time
+import threading
+from concurrent.futures import Future
 from pathlib import Path
 from typing import Any
 from typing import Dict
+from typing import List
 from typing import Optional
 from typing import Tuple
 from typing import Union
 
-import requests
 from requests import Response
 
 from config import ConfigClass
+from geid import get_geid
+from http_client import http
+from minio_client import MAX_COPY_OBJECT_SIZE
 from models import Node
 from models import ResourceType
 from services.approval.models import ApprovalEntity
@@ -46,25 +50,25 @@ def get_children_nodes(start_geid):
     }
 
     node_query_url = ConfigClass.NEO4J_SERVICE_V1 + "relations/query"
-    response = requests.post(node_query_url, json=payload)
+    response = http.post(node_query_url, json=payload)
     ffs = [x.get("end_node") for x in response.json()]
 
     return ffs
 
 
-def create_file_node(
+def file_node_attribute(
     project,
     source_file,
     operator,
-    parent_id,
     relative_path,
-    minio_client,
     tags=None,
     attribute=None,
     new_name=None,
     extra_labels=None,
     extra_fields=None,
-) -> Tuple[Node, Response, str]:
+) -> Dict[str, Any]:
+    """Return properties of the new file node copied from source file."""
+
     if tags is None:
         tags = []
 
@@ -77,8 +81,8 @@ def create_file_node(
     if extra_fields is None:
         extra_fields = {}
 
-    # fecth the geid from common service
-    geid = requests.get(ConfigClass.COMMON_SERVICE+"utility/id").json().get("result")
+    # take the geid from the pre-allocated pool
+    geid = get_geid()
     file_name = new_name if new_name else source_file.get("name")
     # format minio object path
     fuf_path = relative_path+"/"+file_name
@@ -110,7 +114,15 @@ def create_file_node(
         file_attribute.update({"manifest_id": manifest})
         file_attribute.update(attribute)
 
-    new_file_node, new_relation = create_node_with_parent("File", file_attribute, parent_id)
+    return file_attribute
+
+
+def copy_file_object(source_file, location, minio_client) -> Optional[str]:
+    """Copy minio object of the source file to location and return version id of the new object.
+
+    Copy errors are raised, so the file is not recorded as copied and the rerun of the job copies it again.
+    """
+
     version_id = None
     # make minio copy
     try:
@@ -120,10 +132,10 @@ def create_file_node(
         target_minio_path = location.split("//")[-1]
         _, target_bucket, target_obj_path = tuple(target_minio_path.split("/", 2))
 
-        # here the minio api only accept the 5GB in copy. if >5GB we need to download
-        # to local then reupload to target
+        # here the minio api only accept the 5GB in copy. if >5GB the object
+        # is copied part by part on the minio side
         file_size_gb = minio_client.client.stat_object(src_bucket, src_obj_path).size
-        if file_size_gb < 5e+9:
+        if file_size_gb < MAX_COPY_OBJECT_SIZE:
             print("File size less than 5GiB")
             # move minio file objects
             # copy an object from a bucket to another.
@@ -131,16 +143,44 @@ def create_file_node(
             version_id = result.version_id
         else:
             print("File size greater than 5GiB")
-            temp_path = ConfigClass.TEMP_DIR + str(time.time())
-            file_get = minio_client.client.fget_object(
-                src_bucket, src_obj_path, temp_path)
-            print("File fetched to local disk: {}".format(temp_path))
-            result = minio_client.fput_object(target_bucket, target_obj_path, temp_path)
+            result = minio_client.multipart_copy_object(target_bucket, target_obj_path, src_bucket, src_obj_path)
             version_id = result.version_id
 
         print("Minio Copy %s/%s Success"%(src_bucket, src_obj_path))
     except Exception as e:
         print("error when uploading: "+str(e))
+        raise
+
+    return version_id
+
+
+def create_file_node(
+    project,
+    source_file,
+    operator,
+    parent_id,
+    relative_path,
+    minio_client,
+    tags=None,
+    attribute=None,
+    new_name=None,
+    extra_labels=None,
+    extra_fields=None,
+) -> Tuple[Node, Response, str]:
+    file_attribute = file_node_attribute(
+        project,
+        source_file,
+        operator,
+        relative_path,
+        tags=tags,
+        attribute=attribute,
+        new_name=new_name,
+        extra_labels=extra_labels,
+        extra_fields=extra_fields,
+    )
+
+    new_file_node, new_relation = create_node_with_parent("File", file_attribute, parent_id)
+    version_id = copy_file_object(source_file, file_attribute["location"], minio_client)
 
     return new_file_node, new_relation, version_id
 
@@ -160,6 +200,7 @@ def archived_file_node(
     new_name=None,
     extra_labels=None,
     extra_fields=None,
+    object_remover=None,
 ) -> Tuple[Node, Response]:
     if tags is None:
         tags = []
@@ -173,8 +214,8 @@ def archived_file_node(
     if extra_fields is None:
         extra_fields = {}
 
-    # fecth the geid from common service
-    geid = requests.get(ConfigClass.COMMON_SERVICE+"utility/id").json().get("result")
+    # take the geid from the pre-allocated pool
+    geid = get_geid()
     file_name = new_name if new_name else source_file.get("name")
     # format minio object path
     fuf_path = relative_path+"/"+file_name
@@ -216,8 +257,12 @@ def archived_file_node(
         # target_minio_path = location.split("//")[-1]
         # _, target_bucket, target_obj_path = tuple(target_minio_path.split("/", 2))
 
-        result = minio_client.client.remove_object(src_bucket, src_obj_path)
-        print("Minio delete %s/%s Success"%(src_bucket, src_obj_path))
+        if object_remover is not None:
+            # removed later together with other objects in one multi-object delete request
+            object_remover.add(src_bucket, src_obj_path)
+        else:
+            result = minio_client.client.remove_object(src_bucket, src_obj_path)
+            print("Minio delete %s/%s Success"%(src_bucket, src_obj_path))
     except Exception as e:
         print("error when uploading: "+str(e))
 
@@ -244,7 +289,7 @@ def create_folder_node(
     if extra_fields is None:
         extra_fields = {}
 
-    geid = requests.get(ConfigClass.COMMON_SERVICE + "utility/id").json().get("result")
+    geid = get_geid()
     folder_name = source_folder.get("name")
     if new_name is not None:
         folder_name = new_name
@@ -280,13 +325,13 @@ def create_node_with_parent(node_label, node_property, parent_id) -> Tuple[Node,
     # - create_time: neo4j timeobject (API will create but not passed in api)
     # - location: indicate the minio location as minio://http://<domain>/object
     create_node_url = ConfigClass.NEO4J_SERVICE_V1 + 'nodes/' + node_label
-    response = requests.post(create_node_url, json=node_property)
+    response = http.post(create_node_url, json=node_property)
     new_node = response.json()[0]
 
     # now create the relationship
     # the parent can be two possible: 1.dataset 2.folder under it
     create_node_url = ConfigClass.NEO4J_SERVICE_V1 + 'relations/own'
-    new_relation = requests.post(create_node_url, json={"start_id": parent_id, "end_id": new_node.get("id")})
+    new_relation = http.post(create_node_url, json={"start_id": parent_id, "end_id": new_node.get("id")})
 
     return Node(new_node), new_relation
 
@@ -299,7 +344,7 @@ class Neo4jPathCheck:
 
     def _get_node(self, payload: Dict[str, Any]) -> Optional[Node]:
         url = f'{ConfigClass.NEO4J_SERVICE_V2}nodes/query'
-        response = requests.post(url, json=payload, timeout=15)
+        response = http.post(url, json=payload, timeout=15)
         if response.status_code == 200:
             result = response.json()['result']
             if len(result) > 0:
@@ -321,6 +366,9 @@ class Neo4jPathCheck:
 
         return bool(node)
 
+    def add_node(self, node: Node) -> None:
+        """Register node created by the job at destination, nothing is stored by default."""
+
     def get_file(self, project_code: str, path: str) -> Optional[Node]:
         """Return file that exists within project at specified path or None."""
 
@@ -396,3 +444,165 @@ class Neo4jPathCheck:
             parent_folder_node = folder
 
         return parent_folder_node
+
+
+class Neo4jPathIndex(Neo4jPathCheck):
+    """Answer destination path checks from an in-memory index of folder children.
+
+    Children of every destination folder are listed once with the first check of any path inside that folder.
+    Nodes created by the job should be registered with add_node() to keep the index up to date.
+    File paths are used with the bucket name ('core-project-code/admin/file.txt') and folder paths without it, same
+    as in Neo4jPathCheck.
+    """
+
+    def __init__(self, zone: str) -> None:
+        super().__init__(zone)
+
+        # guards the dicts below only, folders are fetched without holding it
+        self._mutex = threading.Lock()
+        # folder path -> {(label, name): node} or None if folder does not exist
+        self._folders: Dict[Tuple[str, str], Optional[Dict[Tuple[str, str], Node]]] = {}
+        # folder path -> future of the fetch in progress, concurrent checks within the same folder wait for it
+        self._fetching: Dict[Tuple[str, str], Future] = {}
+        # folder path -> nodes registered with add_node() while the folder is fetched
+        self._added: Dict[Tuple[str, str], List[Node]] = {}
+
+    @staticmethod
+    def _get_child_key(node: Node) -> Tuple[str, str]:
+        label = ResourceType.FILE if node.is_file else ResourceType.FOLDER
+        return label, node.name
+
+    def _fetch_folder(self, project_code: str, folder_path: str) -> Optional[Dict[Tuple[str, str], Node]]:
+        """Fetch children of folder by their label and name or return None if folder does not exist."""
+
+        folder = None
+        if folder_path:
+            folder = super().get_folder(project_code, folder_path)
+
+        if not folder:
+            return None
+
+        children = {}
+        for child in get_children_nodes(folder.geid):
+            child = Node(child)
+            if self.zone not in child['labels'] or child.get('archived', False):
+                continue
+            children[self._get_child_key(child)] = child
+
+        return children
+
+    def _store_folder(
+        self, key: Tuple[str, str], children: Optional[Dict[Tuple[str, str], Node]]
+    ) -> Optional[Dict[Tuple[str, str], Node]]:
+        """Store fetched children of folder together with nodes added during the fetch, must hold the mutex."""
+
+        added = self._added.pop(key)
+        if key in self._folders:
+            # folder was created by the job while it was fetched
+            children = self._folders[key]
+
+        if children is None:
+            if not added:
+                self._folders[key] = None
+            # otherwise folder appeared while it was fetched and it will be fetched again with the next check
+            return None
+
+        for node in added:
+            children[self._get_child_key(node)] = node
+        self._folders[key] = children
+
+        return children
+
+    def _list_folder(self, project_code: str, folder_path: str) -> Optional[Dict[Tuple[str, str], Node]]:
+        """Return children of folder by their label and name, fetch them if folder was not listed yet."""
+
+        key = (project_code, folder_path)
+        with self._mutex:
+            if key in self._folders:
+                return self._folders[key]
+
+            future = self._fetching.get(key)
+            is_fetched_by_other_thread = future is not None
+            if not is_fetched_by_other_thread:
+                future = self._fetching[key] = Future()
+                self._added[key] = []
+
+        if is_fetched_by_other_thread:
+            return future.result()
+
+        try:
+            children = self._fetch_folder(project_code, folder_path)
+        except BaseException as e:
+            with self._mutex:
+                del self._fetching[key]
+                del self._added[key]
+            future.set_exception(e)
+            raise
+
+        with self._mutex:
+            del self._fetching[key]
+            children = self._store_folder(key, children)
+
+        future.set_result(children)
+
+        return children
+
+    def _get_child(self, project_code: str, path: Union[str, Path], label: str) -> Optional[Node]:
+        path = Path(path)
+
+        folder_path = str(path.parent)
+        if folder_path == '.':
+            folder_path = ''
+
+        children = self._list_folder(project_code, folder_path)
+        if not children:
+            return None
+
+        return children.get((label, path.name))
+
+    def add_node(self, node: Node) -> None:
+        """Register node created by the job at destination."""
+
+        node = Node(node)
+        path = Path(node['display_path'])
+        project_code = node['project_code']
+
+        folder_path = str(path.parent)
+        if folder_path == '.':
+            folder_path = ''
+        parent_key = (project_code, folder_path)
+
+        with self._mutex:
+            if node.is_folder:
+                # new folder has no children yet, so there is nothing to fetch later
+                self._folders[(project_code, str(path))] = {}
+
+            if parent_key in self._fetching:
+                # listing of parent folder may not include the new node, so it is added when the fetch is done
+                self._added[parent_key].append(node)
+                return
+
+            children = self._folders.get(parent_key)
+            if children is None:
+                # parent folder is not listed yet (or was unknown), so it will be fetched with the new node included
+                self._folders.pop(parent_key, None)
+                return
+
+            children[self._get_child_key(node)] = node
+
+    def get_file(self, project_code: str, path: str) -> Optional[Node]:
+        """Return file that exists within project at specified path (with bucket name) or None."""
+
+        _, display_path = path.split('/', 1)
+
+        return self._get_child(project_code, display_path, ResourceType.FILE)
+
+    def get_folder(self, project_code: str, path: Union[str, Path]) -> Optional[Node]:
+        """Return folder that exists within project at specified path or None."""
+
+        path = Path(path)
+        if str(path.parent) == '.':
+            # top level folders do not have parent folder node to be listed
+            return super().get_folder(project_code, path)
+
+        return self._get_child(project_code, path, ResourceType.FOLDER)
@@ -0,0 +1,188 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+from collections import defaultdict
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from minio_client import MAX_COPY_OBJECT_SIZE
+from minio_client import MULTIPART_COPY_PART_SIZE
+from models import Node
+
+NEO4J = 'neo4j'
+UTILITY = 'utility'
+DATA_OPS = 'data-ops'
+PROVENANCE = 'provenance'
+CATALOGUING = 'cataloguing'
+MINIO = 'minio'
+
+# phases of the job, calls of one phase are made with the same concurrency
+PREPARE = 'prepare'
+LOCK = 'lock'
+WALK = 'walk'
+DATA = 'data'
+METADATA = 'metadata'
+
+# seconds per call, used for the services which are not called during planning
+DEFAULT_LATENCIES = {
+    NEO4J: 0.05,
+    UTILITY: 0.02,
+    DATA_OPS: 0.03,
+    PROVENANCE: 0.1,
+    CATALOGUING: 0.15,
+    MINIO: 0.05,
+}
+# bytes per second of one server side copy stream
+DEFAULT_COPY_THROUGHPUT = 100 * 1024 ** 2
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f'{hours}h {minutes:02d}m'
+    if minutes:
+        return f'{minutes}m {seconds:02d}s'
+    return f'{seconds}s'
+
+
+def format_size(size: float) -> str:
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024:
+            return f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} TiB'
+
+
+class PlanReport:
+    """Work which folder copy or move would do with the estimate of its wall time.
+
+    Service calls are counted per job phase. Wall time is estimated from per call latencies, latencies measured while
+    planning replace the default ones.
+    """
+
+    def __init__(
+        self,
+        operation: str,
+        latencies: Optional[Dict[str, float]] = None,
+        copy_throughput: float = DEFAULT_COPY_THROUGHPUT,
+        lock_workers: int = 16,
+    ) -> None:
+        self.operation = operation
+        self.latencies = dict(DEFAULT_LATENCIES)
+        self.latencies.update(latencies or {})
+        self.copy_throughput = copy_throughput
+        self.lock_workers = lock_workers
+
+        self.files = 0
+        self.folders = 0
+        self.total_bytes = 0
+        self.large_files = 0
+        self.copied_bytes = 0
+        self.collisions: List[str] = []
+        self.calls: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.measured: Dict[str, float] = {}
+
+    def add_calls(self, phase: str, service: str, count: int = 1) -> None:
+        self.calls[(phase, service)] += count
+
+    def add_file(self, node: Node, copied: bool = True) -> None:
+        """Count file node, size of copied files is also counted for the data transfer time."""
+
+        size = node.get('file_size') or 0
+        self.files += 1
+        self.total_bytes += size
+        if size >= MAX_COPY_OBJECT_SIZE:
+            self.large_files += 1
+        if copied:
+            self.copied_bytes += size
+
+    def add_folder(self) -> None:
+        self.folders += 1
+
+    def add_object_copy(self, phase: str, node: Node) -> None:
+        """Count minio calls needed to copy the object of file node."""
+
+        size = node.get('file_size') or 0
+        # stat and copy
+        calls = 2
+        if size >= MAX_COPY_OBJECT_SIZE:
+            # stat, create and complete multipart upload and one request for every part
+            calls = 3 + -(-size // MULTIPART_COPY_PART_SIZE)
+        self.add_calls(phase, MINIO, calls)
+
+    def measure(self, service: str, elapsed: float, calls: int) -> None:
+        """Use average latency of calls made while planning for the estimate."""
+
+        if calls <= 0:
+            return
+
+        self.latencies[service] = elapsed / calls
+        self.measured[service] = self.latencies[service]
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def get_calls_by_service(self) -> Dict[str, int]:
+        calls = defaultdict(int)
+        for (_, service), count in self.calls.items():
+            calls[service] += count
+        return dict(calls)
+
+    def get_phase_time(self, phase: str) -> float:
+        return sum(count * self.latencies[service] for (p, service), count in self.calls.items() if p == phase)
+
+    def estimate(self, workers: int = 1, metadata_workers: Optional[int] = None) -> float:
+        """Return estimated wall time in seconds, data and metadata phases run at the same time."""
+
+        if metadata_workers is None:
+            metadata_workers = workers
+
+        prepare = self.get_phase_time(PREPARE) + self.get_phase_time(LOCK) / self.lock_workers
+        walk = self.get_phase_time(WALK)
+        data = (self.get_phase_time(DATA) + self.copied_bytes / self.copy_throughput) / workers
+        metadata = self.get_phase_time(METADATA) / metadata_workers
+
+        return prepare + walk + max(data, metadata)
+
+    def format(self, workers_options: Iterable[int] = (1, 4, 8, 16)) -> List[str]:
+        lines = [
+            f'Plan for {self.operation}',
+            f' - files: {self.files} ({self.large_files} over 5GiB)',
+            f' - folders: {self.folders}',
+            f' - total size: {format_size(self.total_bytes)} ({self.total_bytes} bytes)',
+            f' - name collisions: {len(self.collisions)}',
+        ]
+        lines.extend(f'   - {path}' for path in self.collisions)
+
+        lines.append(f' - service calls: {self.total_calls}')
+        for service, count in sorted(self.get_calls_by_service().items()):
+            source = 'measured' if service in self.measured else 'default'
+            lines.append(f'   - {service}: {count} ({self.latencies[service] * 1000:.0f}ms per call, {source})')
+
+        lines.append(' - estimated wall time:')
+        for workers in workers_options:
+            lines.append(f'   - {workers} workers: {format_duration(self.estimate(workers))}')
+
+        return lines
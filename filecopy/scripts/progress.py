@@ -0,0 +1,136 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import threading
+import time
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Optional
+
+
+class ProgressReporter:
+    """Report job progress from a background thread every interval seconds.
+
+    Workers only update in-memory counters, so the number of job updates does not depend on the number of files.
+    Progress is based on bytes, or on files when the total size is unknown. Files finished by previous run of the
+    job count to the progress, but not to the throughput and the estimate of the remaining time.
+    """
+
+    def __init__(
+        self,
+        report: Callable[[int, Dict[str, Any]], None],
+        total_files: int,
+        total_bytes: int,
+        interval: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.report = report
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.clock = clock
+
+        self.files_done = 0
+        self.bytes_done = 0
+        self.resumed_files = 0
+        self.resumed_bytes = 0
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at = clock()
+        self._last_at = self._started_at
+        self._last_bytes = 0
+
+    def __enter__(self) -> 'ProgressReporter':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def add_file(self, size: int, resumed: bool = False) -> None:
+        """Count finished file, resumed file was copied by previous run of the job."""
+
+        with self._lock:
+            self.files_done += 1
+            self.bytes_done += size or 0
+            if resumed:
+                self.resumed_files += 1
+                self.resumed_bytes += size or 0
+
+    def get_progress(self) -> int:
+        """Return progress in percents."""
+
+        if self.total_bytes:
+            return min(100, int(self.bytes_done * 100 / self.total_bytes))
+        if self.total_files:
+            return min(100, int(self.files_done * 100 / self.total_files))
+        return 100
+
+    def get_status(self) -> Dict[str, Any]:
+        """Return counters with throughput since the previous call and overall estimate of the remaining time."""
+
+        now = self.clock()
+        with self._lock:
+            files_done, bytes_done = self.files_done, self.bytes_done
+            # only files copied by this run show how fast the job is going
+            files_copied, bytes_copied = files_done - self.resumed_files, bytes_done - self.resumed_bytes
+
+        elapsed = now - self._last_at
+        throughput = (bytes_copied - self._last_bytes) / elapsed if elapsed > 0 else 0.0
+        self._last_at, self._last_bytes = now, bytes_copied
+
+        eta = None
+        total_elapsed = now - self._started_at
+        if self.total_bytes and bytes_copied and total_elapsed > 0:
+            eta = int((self.total_bytes - bytes_done) * total_elapsed / bytes_copied)
+        elif not self.total_bytes and files_copied and total_elapsed > 0:
+            eta = int((self.total_files - files_done) * total_elapsed / files_copied)
+
+        return {
+            'files_done': files_done,
+            'files_total': self.total_files,
+            'bytes_done': bytes_done,
+            'bytes_total': self.total_bytes,
+            'throughput': int(throughput),
+            'eta': eta,
+        }
+
+    def send(self) -> None:
+        try:
+            self.report(self.get_progress(), self.get_status())
+        except Exception as e:
+            print(f'Unable to report job progress: {e}')
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.send()
+
+    def start(self) -> None:
+        self._started_at = self._last_at = self.clock()
+        self._thread = threading.Thread(target=self._run, name='progress-reporter', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -18,23 +18,37 @@
 # permissions and limitations under the Licence.
 # 
 
+import threading
+from collections import defaultdict
+from typing import Dict
+from typing import Iterable
+from typing import List
 from typing import Optional
+from uuid import UUID as PythonUUID
 from uuid import uuid4
 
 from sqlalchemy import Column
 from sqlalchemy import create_engine
 from sqlalchemy import MetaData
 from sqlalchemy import select
+from sqlalchemy import String
 from sqlalchemy import Table
 from sqlalchemy import update
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.future import Engine
 
 from config import ConfigClass
+from services.approval.models import ApprovalEntities
 from services.approval.models import ApprovalEntity
 from services.approval.models import ApprovalRequest
+from services.approval.models import ApprovedApprovalEntities
 from services.approval.models import CopyStatus
-from services.approval.models import ApprovalEntities
+from services.approval.models import EntityType
+from services.approval.models import ReviewStatus
+from tracing import trace_engine
+
+# rows fetched from the server-side cursor at once while entities are loaded
+STREAM_BUFFER_SIZE = 5000
 
 
 class ApprovalServiceClient:
@@ -43,47 +57,81 @@ class ApprovalServiceClient:
     def __init__(self, engine: Optional[Engine] = None, metadata: Optional[MetaData] = None):
         if engine is None:
             engine = create_engine(url=ConfigClass.RDS_DB_URI, future=True)
+            trace_engine(engine)
         self.engine = engine
 
         if metadata is None:
             metadata = MetaData(schema=ConfigClass.RDS_SCHEMA_DEFAULT)
         self.metadata = metadata
 
+        # only columns used by the models are declared, so no schema reflection is needed at startup
         self.approval_entity = Table(
             'approval_entity',
             self.metadata,
             Column('id', UUID(as_uuid=True), unique=True, primary_key=True, default=uuid4),
+            Column('request_id', UUID(as_uuid=True)),
+            Column('entity_geid', String()),
+            Column('entity_type', String()),
+            Column('review_status', String()),
+            Column('parent_geid', String()),
+            Column('copy_status', String()),
+            Column('name', String()),
             keep_existing=True,
-            autoload_with=self.engine,
         )
         self.approval_request = Table(
             'approval_request',
             self.metadata,
             Column('id', UUID(as_uuid=True), unique=True, primary_key=True, default=uuid4),
+            Column('destination_geid', String()),
+            Column('source_geid', String()),
+            Column('destination_path', String()),
+            Column('source_path', String()),
             keep_existing=True,
-            autoload_with=self.engine,
         )
 
     def get_approval_request(self, request_id: str) -> ApprovalRequest:
         """Return approval request by id."""
 
         statement = select(self.approval_request).filter_by(id=request_id)
-        cursor = self.engine.connect().execute(statement)
-
-        approval_request = ApprovalRequest.from_orm(cursor.fetchone())
+        with self.engine.connect() as connection:
+            cursor = connection.execute(statement)
+            approval_request = ApprovalRequest.from_orm(cursor.fetchone())
 
         return approval_request
 
-    def get_approval_entities(self, request_id: str) -> ApprovalEntities:
-        """Return all approval entities related to request id."""
+    def get_approval_entities(self, request_id: str, entity_type: Optional[EntityType] = None) -> ApprovalEntities:
+        """Return all approval entities related to request id, optionally only entities of one type."""
 
         statement = select(self.approval_entity).filter_by(request_id=request_id)
-        cursor = self.engine.connect().execute(statement)
+        if entity_type is not None:
+            statement = statement.filter_by(entity_type=entity_type.value)
 
-        request_approval_entities = ApprovalEntities.from_cursor(cursor)
+        with self.engine.connect() as connection:
+            cursor = connection.execution_options(stream_results=True, max_row_buffer=STREAM_BUFFER_SIZE).execute(
+                statement
+            )
+            request_approval_entities = ApprovalEntities.from_cursor(cursor)
 
         return request_approval_entities
 
+    def get_approved_entities(self, request_id: str) -> ApprovedApprovalEntities:
+        """Return approved file entities with pending copy status related to request id."""
+
+        statement = select(self.approval_entity).filter_by(
+            request_id=request_id,
+            entity_type=EntityType.FILE.value,
+            review_status=ReviewStatus.APPROVED.value,
+            copy_status=CopyStatus.PENDING.value,
+        )
+
+        with self.engine.connect() as connection:
+            cursor = connection.execution_options(stream_results=True, max_row_buffer=STREAM_BUFFER_SIZE).execute(
+                statement
+            )
+            approved_entities = ApprovedApprovalEntities.from_cursor(cursor)
+
+        return approved_entities
+
     def update_copy_status(self, approval_entity: ApprovalEntity, copy_status: CopyStatus) -> None:
         """Update copy status field for approval entity."""
 
@@ -95,3 +143,100 @@ class ApprovalServiceClient:
 
         with self.engine.begin() as connection:
             connection.execute(statement)
+
+    def update_copy_status_bulk(self, approval_entity_ids: Iterable[PythonUUID], copy_status: CopyStatus) -> None:
+        """Update copy status field for several approval entities with one statement."""
+
+        # ids are bound as text, same as the postgres UUID column type does with uuid values
+        ids = [str(approval_entity_id) for approval_entity_id in approval_entity_ids]
+        if not ids:
+            return
+
+        statement = (
+            update(self.approval_entity)
+            .where(self.approval_entity.columns.id.in_(ids))
+            .values(copy_status=copy_status)
+        )
+
+        with self.engine.begin() as connection:
+            connection.execute(statement)
+
+
+class CopyStatusUpdater:
+    """Buffer copy status updates of approval entities and write them in chunks.
+
+    Buffered updates are written when there are chunk_size of them, every flush_interval seconds from a background
+    thread and when the updater is closed. Failed background writes are retried with the next flush, close() raises if
+    the remaining updates can not be written.
+    """
+
+    def __init__(self, client: ApprovalServiceClient, chunk_size: int = 500, flush_interval: float = 10.0) -> None:
+        self.client = client
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+
+        self._pending: Dict[CopyStatus, List[PythonUUID]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'CopyStatusUpdater':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(ids) for ids in self._pending.values())
+
+    def update_copy_status(self, approval_entity: ApprovalEntity, copy_status: CopyStatus) -> None:
+        """Queue copy status update for approval entity, write the chunk if it is full."""
+
+        with self._lock:
+            ids = self._pending[copy_status]
+            ids.append(approval_entity.id)
+            is_full = len(ids) >= self.chunk_size
+
+        if is_full:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all buffered updates, updates which were not written stay buffered for the next flush."""
+
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(list)
+
+            try:
+                for copy_status in list(pending):
+                    ids = pending[copy_status]
+                    while ids:
+                        self.client.update_copy_status_bulk(ids[: self.chunk_size], copy_status)
+                        del ids[: self.chunk_size]
+            finally:
+                with self._lock:
+                    for copy_status, ids in pending.items():
+                        self._pending[copy_status][:0] = ids
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f'Unable to update copy status, it will be retried: {e}')
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='copy-status-updater', daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stop the background thread and write the remaining updates."""
+
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+        self.flush()
@@ -19,11 +19,15 @@
 # 
 
 from enum import Enum
+from typing import Any
+from typing import Dict
 from typing import Optional
+from typing import Tuple
 from uuid import UUID
 
 from pydantic import BaseModel
 from sqlalchemy.engine import CursorResult
+from sqlalchemy.engine import Row
 
 
 class EntityType(str, Enum):
@@ -42,6 +46,13 @@ class CopyStatus(str, Enum):
     COPIED = 'copied'
 
 
+APPROVAL_ENTITY_ENUM_FIELDS = {
+    'entity_type': EntityType,
+    'review_status': ReviewStatus,
+    'copy_status': CopyStatus,
+}
+
+
 class ApprovalEntity(BaseModel):
     """Model to represent one approval entity."""
 
@@ -57,6 +68,20 @@ class ApprovalEntity(BaseModel):
     class Config:
         orm_mode = True
 
+    @classmethod
+    def from_row(cls, row: Row) -> 'ApprovalEntity':
+        """Create entity from database row without validation.
+
+        Enum columns are stored as strings, so only they are converted, other values are typed by the table columns.
+        """
+
+        values = dict(row._mapping)
+        for field, enum in APPROVAL_ENTITY_ENUM_FIELDS.items():
+            if values.get(field) is not None:
+                values[field] = enum(values[field])
+
+        return cls.construct(**values)
+
     @property
     def is_approved_for_copy(self) -> bool:
         return (
@@ -89,17 +114,37 @@ class ApprovalEntityPath(list):
 class ApprovedApprovalEntities(dict):
     """Store only approved approval entities using entity geid as a key."""
 
+    @classmethod
+    def from_cursor(cls, result: CursorResult):
+        """Load approval entities from sqlalchemy cursor result which is already filtered by approval status."""
+
+        instance = cls()
+        for row in result:
+            approval_entity = ApprovalEntity.from_row(row)
+            instance[approval_entity.entity_geid] = approval_entity
+
+        return instance
+
 
 class ApprovalEntities(dict):
-    """Store multiple approval entities from one request using entity geid as a key."""
+    """Store multiple approval entities from one request using entity geid as a key.
+
+    Top parents and folder paths are memoized with the first lookup, so entities should not be changed after that.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+
+        self._top_parent_geids: Dict[str, str] = {}
+        self._folder_paths: Dict[str, Tuple[ApprovalEntity, ...]] = {}
 
     @classmethod
     def from_cursor(cls, result: CursorResult):
         """Load approval entities from sqlalchemy cursor result."""
 
         instance = cls()
-        for entity in result:
-            approval_entity = ApprovalEntity.from_orm(entity)
+        for row in result:
+            approval_entity = ApprovalEntity.from_row(row)
             instance[approval_entity.entity_geid] = approval_entity
 
         return instance
@@ -118,26 +163,55 @@ class ApprovalEntities(dict):
     def get_top_parent_geid(self, entity_geid: str) -> str:
         """Return top most folder geid among all entities."""
 
-        try:
-            entity = self[entity_geid]
-            assert entity.entity_type == EntityType.FOLDER
-            parent_geid = entity.parent_geid
-        except (KeyError, AssertionError):
-            parent_geid = None
-
-        if parent_geid is None:
-            return entity_geid
-
-        return self.get_top_parent_geid(parent_geid)
+        chain = []
+        visited = set()
+        current_geid = entity_geid
+        while current_geid not in self._top_parent_geids:
+            entity = self.get(current_geid)
+            # a folder which is reached again closes a cycle in broken hierarchy and is used as the top
+            if (
+                entity is None
+                or entity.entity_type != EntityType.FOLDER
+                or entity.parent_geid is None
+                or current_geid in visited
+            ):
+                self._top_parent_geids[current_geid] = current_geid
+                break
+
+            chain.append(current_geid)
+            visited.add(current_geid)
+            current_geid = entity.parent_geid
+
+        top_parent_geid = self._top_parent_geids[current_geid]
+        for geid in chain:
+            self._top_parent_geids[geid] = top_parent_geid
+
+        return top_parent_geid
+
+    def _get_folder_path(self, folder_geid: str) -> Tuple[ApprovalEntity, ...]:
+        """Return folders from the top parent down to the folder itself."""
+
+        chain = []
+        visited = set()
+        current_geid = folder_geid
+        while current_geid and current_geid not in self._folder_paths:
+            if current_geid in visited:
+                raise ValueError(f'Approval entity {current_geid} is its own ancestor')
+            chain.append(current_geid)
+            visited.add(current_geid)
+            current_geid = self[current_geid].parent_geid
+
+        path = self._folder_paths[current_geid] if current_geid else ()
+        for geid in reversed(chain):
+            path = path + (self[geid],)
+            self._folder_paths[geid] = path
+
+        return self._folder_paths[folder_geid]
 
     def get_path_until_top_parent(self, approval_entity: ApprovalEntity) -> ApprovalEntityPath:
         """Return path to one approval entity."""
 
-        current = approval_entity
-        entity_full_path = ApprovalEntityPath()
-
-        while current.parent_geid:
-            current = self[current.parent_geid]
-            entity_full_path.insert(0, current)
+        if not approval_entity.parent_geid:
+            return ApprovalEntityPath()
 
-        return entity_full_path
+        return ApprovalEntityPath(self._get_folder_path(approval_entity.parent_geid))
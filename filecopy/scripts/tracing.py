@@ -0,0 +1,280 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import json
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import TextIO
+from typing import Tuple
+from urllib.parse import urlsplit
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# path segments with ids, geids or object names are replaced to group calls by endpoint
+ID_SEGMENT_PATTERN = re.compile(r'^(\d+|[0-9a-fA-F-]{8,}.*)$')
+SQL_TABLE_PATTERN = re.compile(r'\b(?:FROM|UPDATE|INTO)\s+([\w."]+)', re.IGNORECASE)
+
+
+class LatencyHistogram:
+    """Count call durations in logarithmic buckets, every bucket is 10% wider than the previous one.
+
+    Percentiles are returned as the upper bound of the bucket, so memory does not grow with the number of calls.
+    """
+
+    MIN_DURATION = 0.0001
+    GROWTH = 1.1
+
+    def __init__(self) -> None:
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, duration: float, error: bool = False) -> None:
+        bucket = 0
+        if duration > self.MIN_DURATION:
+            bucket = int(math.ceil(math.log(duration / self.MIN_DURATION, self.GROWTH)))
+
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        if error:
+            self.errors += 1
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+
+        rank = max(1, int(math.ceil(q * self.count)))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.MIN_DURATION * self.GROWTH ** bucket, self.max)
+
+        return self.max
+
+
+class Span:
+    def __init__(self, service: str, endpoint: str) -> None:
+        self.service = service
+        self.endpoint = endpoint
+        self.error: Optional[str] = None
+
+
+class Tracer:
+    """Record timing of outbound calls per service endpoint.
+
+    When a trace is opened every call is also appended to the job trace file as one json line. Closing the trace
+    writes the summary table with latency percentiles next to it.
+    """
+
+    def __init__(self) -> None:
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.summary_path: Optional[str] = None
+
+        self._lock = threading.Lock()
+        self._trace_file: Optional[TextIO] = None
+
+    def open(self, directory: str, name: str) -> None:
+        self._trace_file = open(os.path.join(directory, f'{name}.trace.jsonl'), 'a')
+        self.summary_path = os.path.join(directory, f'{name}.summary.txt')
+
+    def record(
+        self, service: str, endpoint: str, started_at: float, duration: float, error: Optional[str] = None
+    ) -> None:
+        with self._lock:
+            histogram = self.histograms.get((service, endpoint))
+            if histogram is None:
+                histogram = self.histograms[(service, endpoint)] = LatencyHistogram()
+            histogram.add(duration, error is not None)
+
+            if self._trace_file is not None:
+                span = {
+                    'service': service,
+                    'endpoint': endpoint,
+                    'started_at': started_at,
+                    'duration_ms': round(duration * 1000, 3),
+                    'thread': threading.current_thread().name,
+                    'error': error,
+                }
+                self._trace_file.write(json.dumps(span) + '\n')
+
+    @contextmanager
+    def span(self, service: str, endpoint: str) -> Iterator[Span]:
+        span = Span(service, endpoint)
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = span.error or type(e).__name__
+            raise
+        finally:
+            self.record(span.service, span.endpoint, started_at, time.perf_counter() - start, span.error)
+
+    def reset(self) -> None:
+        """Forget all recorded calls, for example between benchmark runs in one process."""
+
+        with self._lock:
+            self.histograms = {}
+
+    def format_summary(self) -> List[str]:
+        header = ('service', 'endpoint', 'calls', 'errors', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms', 'total s')
+        rows = []
+        with self._lock:
+            items = sorted(self.histograms.items(), key=lambda item: item[1].total, reverse=True)
+            for (service, endpoint), histogram in items:
+                rows.append(
+                    (
+                        service,
+                        endpoint,
+                        str(histogram.count),
+                        str(histogram.errors),
+                        f'{histogram.percentile(0.5) * 1000:.1f}',
+                        f'{histogram.percentile(0.95) * 1000:.1f}',
+                        f'{histogram.percentile(0.99) * 1000:.1f}',
+                        f'{histogram.max * 1000:.1f}',
+                        f'{histogram.total:.1f}',
+                    )
+                )
+
+        widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+        return ['  '.join(value.ljust(width) for value, width in zip(row, widths)) for row in [header] + rows]
+
+    def close(self) -> List[str]:
+        """Close the job trace, write the summary table and return its lines."""
+
+        summary = self.format_summary()
+
+        with self._lock:
+            if self._trace_file is not None:
+                self._trace_file.close()
+                self._trace_file = None
+
+        if self.summary_path is not None:
+            with open(self.summary_path, 'w') as summary_file:
+                summary_file.write('\n'.join(summary) + '\n')
+            self.summary_path = None
+
+        return summary
+
+
+tracer = Tracer()
+
+
+def get_http_endpoint(method: str, url: str) -> Tuple[str, str]:
+    """Return service and endpoint name for http call, ids in the url path are replaced with {id}."""
+
+    parts = urlsplit(url)
+    segments = ['{id}' if ID_SEGMENT_PATTERN.match(segment) else segment for segment in parts.path.split('/')]
+    return parts.netloc, f'{method} {"/".join(segments)}'
+
+
+def get_minio_operation(
+    method: str,
+    bucket_name: Optional[str] = None,
+    object_name: Optional[str] = None,
+    headers: Optional[Dict[str, Any]] = None,
+    query_params: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Return S3 operation name like 'PUT object?partNumber&uploadId copy'."""
+
+    target = 'object' if object_name else 'bucket' if bucket_name else 'service'
+    operation = f'{method} {target}'
+    if query_params:
+        operation += '?' + '&'.join(sorted(query_params))
+    if headers and 'x-amz-copy-source' in headers:
+        operation += ' copy'
+    return operation
+
+
+def trace_minio(client: Any, service: str = 'minio') -> None:
+    """Record every request made by minio client, all client api calls go through its _url_open method."""
+
+    url_open = client._url_open
+
+    def traced_url_open(
+        method, region, bucket_name=None, object_name=None, body=None, headers=None, query_params=None, **kwargs
+    ):
+        operation = get_minio_operation(method, bucket_name, object_name, headers, query_params)
+        with tracer.span(service, operation):
+            return url_open(
+                method,
+                region,
+                bucket_name=bucket_name,
+                object_name=object_name,
+                body=body,
+                headers=headers,
+                query_params=query_params,
+                **kwargs,
+            )
+
+    client._url_open = traced_url_open
+
+
+def get_sql_operation(statement: str) -> str:
+    """Return statement name like 'SELECT approval_entity'."""
+
+    words = statement.split(None, 1)
+    if not words:
+        return 'unknown'
+
+    match = SQL_TABLE_PATTERN.search(statement)
+    table = match.group(1) if match else ''
+    return f'{words[0].upper()} {table}'.strip()
+
+
+def trace_engine(engine: Engine, service: str = 'postgres') -> None:
+    """Record every statement executed by SQLAlchemy engine."""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('trace_started', []).append((time.time(), time.perf_counter()))
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started_at, start = conn.info['trace_started'].pop()
+        tracer.record(service, get_sql_operation(statement), started_at, time.perf_counter() - start)
+
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(context):
+        started = context.connection.info.get('trace_started') if context.connection is not None else None
+        if started:
+            started_at, start = started.pop()
+            tracer.record(
+                service,
+                get_sql_operation(context.statement or ''),
+                started_at,
+                time.perf_counter() - start,
+                type(context.original_exception).__name__,
+            )
@@ -0,0 +1,106 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+from models import Node
+from models import NodeList
+from neo4j_helper import get_children_nodes
+
+
+class TreeSnapshot:
+    """Store the whole source node tree fetched once with destination path for every node.
+
+    Destination path is the folder path where node will be placed, for example for file 'admin/a/b.txt' copied
+    into 'project/dest' the destination path is 'project/dest/a'. Archived nodes are kept in the children lists but
+    their subtree is never fetched.
+    """
+
+    def __init__(self, nodes: NodeList, destination_path: str) -> None:
+        self.nodes = nodes
+        self.destination_path = destination_path
+
+        self.children: Dict[str, NodeList] = {}
+        self.destination_paths: Dict[str, str] = {}
+
+    @classmethod
+    def fetch(
+        cls,
+        nodes: List[Dict[str, Any]],
+        destination_path: str,
+        root_name: Optional[str] = None,
+        get_children: Callable[[str], List[Dict[str, Any]]] = get_children_nodes,
+    ) -> 'TreeSnapshot':
+        """Walk the tree starting from nodes and return snapshot.
+
+        When root name is set it is used instead of the root nodes name for the destination path of their children.
+        """
+
+        instance = cls(NodeList(nodes), destination_path)
+
+        stack = [(node, destination_path, root_name) for node in reversed(instance.nodes)]
+        while stack:
+            node, current_destination_path, new_name = stack.pop()
+            instance.destination_paths[node.geid] = current_destination_path
+
+            if node.get('archived', False) or not node.is_folder:
+                continue
+
+            children_nodes = NodeList(get_children(node.geid))
+            instance.children[node.geid] = children_nodes
+
+            next_destination_path = f'{current_destination_path}/{new_name or node.name}'
+            stack.extend((child, next_destination_path, None) for child in reversed(children_nodes))
+
+        return instance
+
+    def __len__(self) -> int:
+        return len(self.destination_paths)
+
+    def __contains__(self, node: Node) -> bool:
+        return node.geid in self.destination_paths
+
+    def get_children(self, node: Node) -> NodeList:
+        """Return children of folder node or empty list for other nodes."""
+
+        return self.children.get(node.geid, NodeList([]))
+
+    def get_destination_path(self, node: Node) -> str:
+        """Return folder path where node will be placed at destination."""
+
+        return self.destination_paths[node.geid]
+
+    def walk(self) -> Iterator[Node]:
+        """Yield all not archived nodes in depth-first order, parent folder always goes before its children."""
+
+        stack = list(reversed(self.nodes))
+        while stack:
+            node = stack.pop()
+            if node.get('archived', False):
+                continue
+
+            yield node
+
+            stack.extend(reversed(self.get_children(node)))
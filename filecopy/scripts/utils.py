@@ -18,16 +18,20 @@
 # permissions and limitations under the Licence.
 # 
 
+import atexit
 import datetime
 import os
+import threading
+from concurrent.futures import Future
 from typing import Any
 from typing import Dict
 from typing import Optional
 
-import requests
 from requests import Response
 
 from config import ConfigClass
+from http_client import http
+from log_shipper import LogShipper
 from models import Node
 
 
@@ -41,7 +45,7 @@ def http_query_node(primary_label, query_params=None):
         **query_params
     }
     node_query_url = ConfigClass.NEO4J_SERVICE_V1 + "nodes/{}/query".format(primary_label)
-    response = requests.post(node_query_url, json=payload)
+    response = http.post(node_query_url, json=payload)
     return response
 
 
@@ -52,7 +56,7 @@ def get_resource_by_geid(geid: str) -> Node:
     """
 
     url = ConfigClass.NEO4J_SERVICE_V1 + "nodes/geid/%s" % geid
-    res = requests.get(url)
+    res = http.get(url)
     nodes = res.json()
 
     if len(nodes) == 0:
@@ -64,7 +68,7 @@ def get_resource_by_geid(geid: str) -> Node:
 def http_update_node(primary_label, neo4j_id, update_json):
     # update neo4j node
     update_url = ConfigClass.NEO4J_SERVICE_V1 + "nodes/{}/node/{}".format(primary_label, neo4j_id)
-    res = requests.put(url=update_url, json=update_json)
+    res = http.put(url=update_url, json=update_json)
     print(update_json)
     print(res.json())
     return res
@@ -79,7 +83,7 @@ def lock_resource(resource_key: str, operation: str) -> Dict[str, Any]:
         "operation": operation
     }
 
-    response = requests.post(url, json=post_json)
+    response = http.post(url, json=post_json)
     if response.status_code != 200:
         raise Exception("resource %s already in used"%resource_key)
 
@@ -95,7 +99,7 @@ def unlock_resource(resource_key: str, operation: str) -> Dict[str, Any]:
         "operation": operation
     }
 
-    response = requests.delete(url, json=post_json)
+    response = http.delete(url, json=post_json)
     if response.status_code != 200:
         raise Exception("Error when unlock resource %s"%resource_key)
 
@@ -104,7 +108,7 @@ def unlock_resource(resource_key: str, operation: str) -> Dict[str, Any]:
 
 def debug_message_sender(message: str) -> None:
     url = ConfigClass.DATA_OPS_UT_V1 + "files/actions/message"
-    response = requests.post(url, json={
+    response = http.post(url, json={
         "message": message,
         "channel": "pipelinewatch"
     })
@@ -113,11 +117,62 @@ def debug_message_sender(message: str) -> None:
     return
 
 
+# seconds the job waits at exit for buffered log messages to be sent
+LOG_SHIPPER_CLOSE_TIMEOUT = 10
+
+log_shipper = LogShipper(debug_message_sender)
+atexit.register(log_shipper.close, LOG_SHIPPER_CLOSE_TIMEOUT)
+
+
 def logger_info(message: str):
-    debug_message_sender(message)
+    log_shipper.log(message)
     print(message)
 
 
+class ManifestCache:
+    """Store manifests fetched from the entity info service during one job.
+
+    Every manifest is fetched once, concurrent callers asking for the same manifest wait for that one request.
+    Manifests that failed to load are not stored, so the next call tries again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._manifests: Dict[Any, Future] = {}
+
+    def _fetch(self, manifest_id) -> Optional[Dict[str, Any]]:
+        res = http.get(ConfigClass.ENTITY_INFO_SERVICE + f"manifest/{manifest_id}")
+        if res.status_code == 200:
+            return res.json()['result']
+
+        return None
+
+    def get(self, manifest_id) -> Optional[Dict[str, Any]]:
+        """Return manifest by id or None if it can not be fetched."""
+
+        with self._lock:
+            future = self._manifests.get(manifest_id)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._manifests[manifest_id] = future
+
+        if is_owner:
+            try:
+                manifest = self._fetch(manifest_id)
+            except Exception as e:
+                manifest = None
+                future.set_exception(e)
+            else:
+                future.set_result(manifest)
+
+            if manifest is None:
+                with self._lock:
+                    self._manifests.pop(manifest_id, None)
+
+        return future.result()
+
+
 class MetaDataFactory:
     def __init__(
         self, project: dict, operator: str, zone: str, pipeline_name: str, pipeline_desc: str, operation_type: str
@@ -130,6 +185,9 @@ class MetaDataFactory:
         self.pipeline_desc = pipeline_desc
         self.operation_type = operation_type
 
+        # manifests are shared by many files of one job
+        self.manifest_cache = ManifestCache()
+
     def create_lineage_v3(self, input_geid, output_geid, create_time=None) -> Dict[str, Any]:
         """Create lineage between input and output into atlas."""
 
@@ -142,7 +200,7 @@ class MetaDataFactory:
             "pipeline_name": self.pipeline_name,
             "description": self.pipeline_desc
         }
-        res = requests.post(url=my_url+'lineage', json=payload)
+        res = http.post(url=my_url+'lineage', json=payload)
         if res.status_code == 200:
             return res.json()
 
@@ -167,7 +225,7 @@ class MetaDataFactory:
             "project_code": self.project.get("code"),
             "extra": extra
         }
-        res_audit_logs = requests.post(
+        res_audit_logs = http.post(
             url_audit_log,
             json=payload_audit_log
         )
@@ -194,7 +252,7 @@ class MetaDataFactory:
             }
         }
         logger_info(f"es delete file payload: {es_payload}")
-        es_res = requests.put(
+        es_res = http.put(
             ConfigClass.PROVENANCE_SERVICE + 'entity/file', json=es_payload)
         logger_info(f"es delete trash file response: {es_res.text}")
 
@@ -233,11 +291,8 @@ class MetaDataFactory:
             full_path = new_node['full_path']
 
             attributes = []
-            res = requests.get(
-                ConfigClass.ENTITY_INFO_SERVICE + f"manifest/{manifest_id}")
-            if res.status_code == 200:
-                manifest_data = res.json()
-                manifest = manifest_data['result']
+            manifest = self.manifest_cache.get(manifest_id)
+            if manifest is not None:
                 sql_attributes = manifest['attributes']
 
                 for sql_attribute in sql_attributes:
@@ -258,7 +313,7 @@ class MetaDataFactory:
 
             new_node.update({"attributes":attributes})
 
-        es_res = requests.post(ConfigClass.PROVENANCE_SERVICE + 'entity/file', json=new_node)
+        es_res = http.post(ConfigClass.PROVENANCE_SERVICE + 'entity/file', json=new_node)
         if es_res.json().get("code") >= 300:
             raise Exception("Error in create_es_search_index "+str(es_res.json()))
 
@@ -275,7 +330,7 @@ class MetaDataFactory:
         payload.update({"path": payload.get("location")})
         payload.update({"namespace": ConfigClass.CORE_ZONE_LABEL.lower()})
 
-        res = requests.post(url=ConfigClass.CATALOGUING_SERVICE_V2 + 'filedata', json=payload)
+        res = http.post(url=ConfigClass.CATALOGUING_SERVICE_V2 + 'filedata', json=payload)
 
         if res.status_code == 200:
             json_payload = res.json()
@@ -301,7 +356,7 @@ def update_job(
 
 def update_job(session_id, job_id, status, add_payload={}, progress=0):
     url = ConfigClass.DATA_OPS_UT_V1 + "tasks"
-    response = requests.put(url, json={
+    response = http.put(url, json={
         'session_id': session_id,
         'job_id': job_id,
         'status': status,
@@ -313,7 +368,7 @@ def update_job(session_id, job_id, status, add_payload={}, progress=0):
 
 def get_job(job_id):
     url = ConfigClass.DATA_OPS_UT_V1 + "tasks"
-    task_response = requests.get(
+    task_response = http.get(
         url,
         params={
             "session_id": "*",
@@ -18,85 +18,105 @@
 # permissions and limitations under the Licence.
 # 
 
-import requests
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from http_client import http
+from workers import map_concurrently
+
+
+class VirtualFileDeletion:
+    """Result of virtual files removal for one geid or path."""
+
+    def __init__(self, value: str) -> None:
+        self.value = value
+        self.deleted: List[int] = []
+        self.errors: List[Dict[str, Any]] = []
+
+    @property
+    def is_successful(self) -> bool:
+        return not self.errors
+
+
+def get_error(response) -> Dict[str, Any]:
+    return {
+        "error": "archive vr files in neo4j failed",
+        "errorcode": response.status_code,
+        "error_msg": response.text
+    }
+
 
 class SrvVRMgr():
-    def __init__(self, ConfigClass) -> None:
+    def __init__(self, ConfigClass, chunk_size: int = 500, workers: int = 8) -> None:
         self.ConfigClass = ConfigClass
+        self.chunk_size = chunk_size
+        self.workers = workers
 
-    def delete_vr_files_by_geid(self, geid):
+    def _query(self, field: str, result: VirtualFileDeletion) -> List[int]:
         neo4j_url = self.ConfigClass.NEO4J_SERVICE_V1 + "nodes/VirtualFile/query"
-        query_body = {
-            "global_entity_id": geid
-        }
-        vr_files_respon = requests.post(neo4j_url, json=query_body)
-        if vr_files_respon.status_code == 200:
-            pass
-        else:
-            print({
-                "error": "archive vr files in neo4j failed",
-                "errorcode": vr_files_respon.status_code,
-                "error_msg": vr_files_respon.text
-            })
-            return {
-                "error": "archive vr files in neo4j failed",
-                "errorcode": vr_files_respon.status_code,
-                "error_msg": vr_files_respon.text
-            }
-        vr_files = vr_files_respon.json()
-        ## deletion
-        for vr_file in vr_files:
-            dele_url = self.ConfigClass.NEO4J_SERVICE_V1 + "nodes/VirtualFile/node/{}".format(vr_file['id'])
-            dele_respon = requests.delete(dele_url)
-            if dele_respon.status_code == 200:
-                pass
+        vr_files_respon = http.post(neo4j_url, json={field: result.value})
+        if vr_files_respon.status_code != 200:
+            result.errors.append(get_error(vr_files_respon))
+            return []
+
+        return [vr_file['id'] for vr_file in vr_files_respon.json()]
+
+    def _delete(self, node_id: int) -> Optional[Dict[str, Any]]:
+        dele_url = self.ConfigClass.NEO4J_SERVICE_V1 + "nodes/VirtualFile/node/{}".format(node_id)
+        dele_respon = http.delete(dele_url)
+        if dele_respon.status_code != 200:
+            return get_error(dele_respon)
+
+        return None
+
+    def delete_chunk(self, field: str, values: List[str]) -> List[VirtualFileDeletion]:
+        """Delete virtual files matching any of the values and return results in the same order."""
+
+        results = [VirtualFileDeletion(value) for value in values]
+        matched = map_concurrently(lambda result: self._query(field, result), results, self.workers)
+
+        # every matched node is deleted, failure of one node does not stop the others
+        node_ids = [(result, node_id) for result, ids in zip(results, matched) for node_id in ids]
+        errors = map_concurrently(lambda item: self._delete(item[1]), node_ids, self.workers)
+
+        for (result, node_id), error in zip(node_ids, errors):
+            if error is None:
+                result.deleted.append(node_id)
             else:
-                print({
-                    "error": "archive vr files in neo4j failed",
-                    "errorcode": dele_respon.status_code,
-                    "error_msg": dele_respon.text
-                })
-                return {
-                    "error": "archive vr files in neo4j failed",
-                    "errorcode": dele_respon.status_code,
-                    "error_msg": dele_respon.text
-                }
+                result.errors.append(error)
+
+        return results
+
+    def delete_vr_files(self, field: str, values: List[str]) -> Dict[str, VirtualFileDeletion]:
+        """Delete virtual files matching any of the values in chunks and return results by value."""
+
+        results = {}
+        # the same geid or path is deleted only once
+        values = list(dict.fromkeys(values))
+        for start in range(0, len(values), self.chunk_size):
+            chunk = values[start : start + self.chunk_size]
+            for result in self.delete_chunk(field, chunk):
+                results[result.value] = result
+                for error in result.errors:
+                    print(error)
 
+        return results
+
+    def delete_vr_files_by_geids(self, geids: List[str]) -> Dict[str, VirtualFileDeletion]:
+        return self.delete_vr_files('global_entity_id', geids)
+
+    def delete_vr_files_by_full_paths(self, full_paths: List[str]) -> Dict[str, VirtualFileDeletion]:
+        return self.delete_vr_files('name', full_paths)
+
+    def delete_vr_files_by_geid(self, geid):
+        # the remaining files are deleted after a failure, only the first error is returned
+        errors = self.delete_vr_files_by_geids([geid])[geid].errors
+        if errors:
+            return errors[0]
 
     def delete_vr_files_by_full_path(self, full_path):
-        neo4j_url = self.ConfigClass.NEO4J_SERVICE_V1 + "nodes/VirtualFile/query"
-        query_body = {
-            "name": full_path
-        }
-        vr_files_respon = requests.post(neo4j_url, json=query_body)
-        if vr_files_respon.status_code == 200:
-            pass
-        else:
-            print({
-                "error": "archive vr files in neo4j failed",
-                "errorcode": vr_files_respon.status_code,
-                "error_msg": vr_files_respon.text
-            })
-            return {
-                "error": "archive vr files in neo4j failed",
-                "errorcode": vr_files_respon.status_code,
-                "error_msg": vr_files_respon.text
-            }
-        vr_files = vr_files_respon.json()
-        ## deletion
-        for vr_file in vr_files:
-            dele_url = self.ConfigClass.NEO4J_SERVICE_V1 + "nodes/VirtualFile/node/{}".format(vr_file['id'])
-            dele_respon = requests.delete(dele_url)
-            if dele_respon.status_code == 200:
-                pass
-            else:
-                print({
-                    "error": "archive vr files in neo4j failed",
-                    "errorcode": dele_respon.status_code,
-                    "error_msg": dele_respon.text
-                })
-                return {
-                    "error": "archive vr files in neo4j failed",
-                    "errorcode": dele_respon.status_code,
-                    "error_msg": dele_respon.text
-                }
+        errors = self.delete_vr_files_by_full_paths([full_path])[full_path].errors
+        if errors:
+            return errors[0]
@@ -0,0 +1,154 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from typing import Callable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+def map_concurrently(fn: Callable[[T], R], items: Sequence[T], workers: int) -> List[R]:
+    """Call function for every item on up to workers threads and return results in the order of items.
+
+    The utility and neo4j services have no bulk endpoints and handle one entity per request (one new geid, one
+    deleted node), so such requests are sent concurrently. The first exception of the function is raised after all
+    calls are finished.
+    """
+
+    if workers <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        futures = [executor.submit(fn, item) for item in items]
+
+    return [future.result() for future in futures]
+
+
+class BoundedExecutor:
+    """Run tasks on a fixed size thread pool with a limited number of pending tasks.
+
+    With one worker tasks are executed immediately in the calling thread. The first exception raised by a task is
+    stored and raised once from submit() or join(), all tasks which did not start yet are skipped after that.
+    """
+
+    def __init__(self, workers: int = 1, max_pending: Optional[int] = None) -> None:
+        if workers < 1:
+            raise ValueError('Number of workers should be greater than zero')
+
+        if max_pending is None:
+            max_pending = workers * 2
+
+        self.workers = workers
+        self._executor = None
+        if workers > 1:
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+        self._error_raised = False
+
+    def __enter__(self) -> 'BoundedExecutor':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            # the job is already failing, do not start anything else and keep the original exception
+            self._set_error(exc_value)
+            self._error_raised = True
+
+        self.join()
+
+    @property
+    def is_concurrent(self) -> bool:
+        return self._executor is not None
+
+    def _set_error(self, error: BaseException) -> None:
+        with self._lock:
+            if self._error is None:
+                self._error = error
+
+    def _run(self, fn: Callable[..., Any], args, kwargs) -> None:
+        try:
+            if self._error is None:
+                fn(*args, **kwargs)
+        except BaseException as e:
+            self._set_error(e)
+        finally:
+            self._slots.release()
+
+    def raise_for_error(self) -> None:
+        """Raise the first exception that happened in one of the tasks (only once)."""
+
+        with self._lock:
+            if self._error is None or self._error_raised:
+                return
+            self._error_raised = True
+
+        raise self._error
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        """Schedule task execution, block while there are too many pending tasks."""
+
+        self.raise_for_error()
+
+        if self._executor is None:
+            fn(*args, **kwargs)
+            return
+
+        self._slots.acquire()
+        try:
+            self.raise_for_error()
+            self._executor.submit(self._run, fn, args, kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def join(self) -> None:
+        """Wait until all scheduled tasks are finished and raise the first task exception if any."""
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+        self.raise_for_error()
+
+
+class MetadataOffload(BoundedExecutor):
+    """Executor moving metadata side effects of copied nodes (catalog, lineage, search index, audit log) off the copy
+    workers.
+
+    It is only an async offload, every metadata call is still sent to its service one by one. With one worker tasks
+    run in the calling thread, so it has effect only with more than one worker. The queue is much longer than the data
+    plane one, so copy workers move on to the next file without waiting for metadata services. The job should be
+    reported as succeeded only after join() returns.
+    """
+
+    def __init__(self, workers: int = 1, max_pending: Optional[int] = None) -> None:
+        if max_pending is None:
+            max_pending = workers * 100
+
+        super().__init__(workers, max_pending)
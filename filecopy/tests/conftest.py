@@ -19,16 +19,20 @@
 # 
 
 import random
+import threading
 import uuid
+from collections import defaultdict
 from typing import Callable
 
 import pytest
 
 from scripts.folder_copy import DuplicatedFileNames
+from scripts.journal import CopyJournal
 from scripts.models import get_timestamp
 from scripts.models import Node
 from scripts.models import ResourceType
 from scripts.neo4j_helper import Neo4jPathCheck
+from scripts.neo4j_helper import Neo4jPathIndex
 
 
 @pytest.fixture
@@ -63,6 +67,62 @@ def duplicated_files():
     yield DuplicatedFileNames()
 
 
+@pytest.fixture
+def journal(tmp_path):
+    journal = CopyJournal(str(tmp_path / 'journal.sqlite'))
+    yield journal
+    journal.close()
+
+
 @pytest.fixture
 def path_check():
     yield Neo4jPathCheck('zone')
+
+
+@pytest.fixture
+def path_index():
+    yield Neo4jPathIndex('zone')
+
+
+class LockServiceStandIn:
+    """In-memory replacement of the data-ops resource lock api.
+
+    Read locks can be shared, write lock is exclusive.
+    """
+
+    def __init__(self) -> None:
+        self.mutex = threading.Lock()
+        self.readers = defaultdict(int)
+        self.writers = set()
+        self.calls = 0
+
+    def lock(self, resource_key: str, operation: str) -> dict:
+        with self.mutex:
+            self.calls += 1
+            if resource_key in self.writers or (operation == 'write' and self.readers[resource_key]):
+                raise Exception(f'resource {resource_key} already in used')
+
+            if operation == 'write':
+                self.writers.add(resource_key)
+            else:
+                self.readers[resource_key] += 1
+
+        return {}
+
+    def unlock(self, resource_key: str, operation: str) -> dict:
+        with self.mutex:
+            self.calls += 1
+            if operation == 'write':
+                self.writers.remove(resource_key)
+            else:
+                self.readers[resource_key] -= 1
+
+        return {}
+
+    def is_locked(self, resource_key: str) -> bool:
+        return resource_key in self.writers or self.readers[resource_key] > 0
+
+
+@pytest.fixture
+def lock_service():
+    yield LockServiceStandIn()
@@ -22,13 +22,20 @@ from uuid import uuid4
 
 import pytest
 from sqlalchemy import Column
+from sqlalchemy import insert
 from sqlalchemy import MetaData
+from sqlalchemy import select
 from sqlalchemy import String
 from sqlalchemy import Table
 from sqlalchemy.future import create_engine
 
 from services.approval.client import ApprovalServiceClient
+from services.approval.client import CopyStatusUpdater
 from services.approval.models import ApprovalEntities
+from services.approval.models import ApprovedApprovalEntities
+from services.approval.models import CopyStatus
+from services.approval.models import EntityType
+from services.approval.models import ReviewStatus
 
 
 @pytest.fixture
@@ -45,8 +52,12 @@ def metadata(inmemory_engine):
         metadata,
         Column('id', String(), unique=True, primary_key=True, default=uuid4),
         Column('request_id', String()),
+        Column('entity_geid', String()),
         Column('entity_type', String()),
         Column('review_status', String()),
+        Column('parent_geid', String()),
+        Column('copy_status', String()),
+        Column('name', String()),
     )
     Table(
         'approval_request',
@@ -78,3 +89,131 @@ class TestApprovalServiceClient:
         result = approval_service_client.get_approval_entities(request_id)
 
         assert isinstance(result, ApprovalEntities)
+
+    def test_get_approved_entities_returns_only_approved_files_with_pending_copy_status(
+        self, approval_service_client, inmemory_engine, faker
+    ):
+        request_id = faker.uuid4()
+        rows = [
+            ('approved', EntityType.FILE, ReviewStatus.APPROVED, CopyStatus.PENDING),
+            ('copied', EntityType.FILE, ReviewStatus.APPROVED, CopyStatus.COPIED),
+            ('denied', EntityType.FILE, ReviewStatus.DENIED, CopyStatus.PENDING),
+            ('folder', EntityType.FOLDER, ReviewStatus.APPROVED, CopyStatus.PENDING),
+        ]
+        with inmemory_engine.begin() as connection:
+            connection.execute(
+                insert(approval_service_client.approval_entity),
+                [
+                    {
+                        'id': faker.uuid4(),
+                        'request_id': request_id,
+                        'entity_geid': entity_geid,
+                        'entity_type': entity_type.value,
+                        'review_status': review_status.value,
+                        'copy_status': copy_status.value,
+                        'name': faker.word(),
+                    }
+                    for entity_geid, entity_type, review_status, copy_status in rows
+                ],
+            )
+
+        result = approval_service_client.get_approved_entities(request_id)
+
+        assert isinstance(result, ApprovedApprovalEntities)
+        assert list(result) == ['approved']
+        assert result['approved'].is_approved_for_copy
+
+    def test_get_approval_entities_filters_by_entity_type(self, approval_service_client, inmemory_engine, faker):
+        request_id = faker.uuid4()
+        with inmemory_engine.begin() as connection:
+            connection.execute(
+                insert(approval_service_client.approval_entity),
+                [
+                    {'id': faker.uuid4(), 'request_id': request_id, 'entity_geid': 'file', 'entity_type': 'file'},
+                    {'id': faker.uuid4(), 'request_id': request_id, 'entity_geid': 'folder', 'entity_type': 'folder'},
+                ],
+            )
+
+        result = approval_service_client.get_approval_entities(request_id, EntityType.FOLDER)
+
+        assert list(result) == ['folder']
+
+    def test_update_copy_status_bulk_updates_only_given_entities(self, approval_service_client, inmemory_engine):
+        table = approval_service_client.approval_entity
+        ids = [uuid4() for _ in range(3)]
+        with inmemory_engine.begin() as connection:
+            connection.execute(
+                insert(table), [{'id': str(entity_id), 'copy_status': CopyStatus.PENDING} for entity_id in ids]
+            )
+
+        approval_service_client.update_copy_status_bulk(ids[:2], CopyStatus.COPIED)
+
+        with inmemory_engine.connect() as connection:
+            rows = dict(connection.execute(select(table.c.id, table.c.copy_status)).all())
+        assert rows == {
+            str(ids[0]): CopyStatus.COPIED,
+            str(ids[1]): CopyStatus.COPIED,
+            str(ids[2]): CopyStatus.PENDING,
+        }
+
+    def test_init_declares_tables_without_database_access(self, mocker):
+        engine = mocker.Mock()
+
+        client = ApprovalServiceClient(engine, MetaData())
+
+        assert 'copy_status' in client.approval_entity.columns
+        assert 'source_path' in client.approval_request.columns
+        assert engine.mock_calls == []
+
+    def test_get_approval_request_returns_connection_to_pool(self, mocker, faker):
+        connection = mocker.MagicMock()
+        connection.__enter__.return_value.execute.return_value.fetchone.return_value = mocker.Mock(
+            id=faker.uuid4(),
+            destination_geid=faker.uuid4(),
+            source_geid=faker.uuid4(),
+            destination_path='admin',
+            source_path='admin',
+        )
+        engine = mocker.Mock()
+        engine.connect.return_value = connection
+        client = ApprovalServiceClient(engine, MetaData())
+
+        client.get_approval_request(faker.uuid4())
+
+        connection.__exit__.assert_called_once()
+
+
+class TestCopyStatusUpdater:
+    def test_update_copy_status_writes_full_chunk(self, mocker):
+        client = mocker.Mock()
+        updater = CopyStatusUpdater(client, chunk_size=2)
+        entities = [mocker.Mock(id=uuid4()) for _ in range(3)]
+
+        for entity in entities:
+            updater.update_copy_status(entity, CopyStatus.COPIED)
+
+        client.update_copy_status_bulk.assert_called_once_with([entities[0].id, entities[1].id], CopyStatus.COPIED)
+        assert len(updater) == 1
+
+    def test_close_writes_remaining_updates(self, mocker):
+        client = mocker.Mock()
+        entity = mocker.Mock(id=uuid4())
+
+        with CopyStatusUpdater(client, flush_interval=60) as updater:
+            updater.update_copy_status(entity, CopyStatus.COPIED)
+
+        client.update_copy_status_bulk.assert_called_once_with([entity.id], CopyStatus.COPIED)
+
+    def test_flush_keeps_updates_which_were_not_written(self, mocker):
+        client = mocker.Mock()
+        client.update_copy_status_bulk.side_effect = [ConnectionError(), None]
+        updater = CopyStatusUpdater(client)
+        entity = mocker.Mock(id=uuid4())
+        updater.update_copy_status(entity, CopyStatus.COPIED)
+
+        with pytest.raises(ConnectionError):
+            updater.flush()
+        updater.flush()
+
+        assert client.update_copy_status_bulk.call_count == 2
+        assert len(updater) == 0
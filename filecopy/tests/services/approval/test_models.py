@@ -20,6 +20,9 @@
 
 import random
 
+import pytest
+
+from services.approval.models import ApprovalEntities
 from services.approval.models import ApprovalEntity
 from services.approval.models import CopyStatus
 from services.approval.models import EntityType
@@ -38,3 +41,109 @@ class TestApprovalEntity:
             copy_status=random.choice(list(CopyStatus)),
             name=faker.word(),
         )
+
+    def test_from_row_creates_entity_without_validation(self, mocker, faker):
+        row = mocker.Mock(
+            _mapping={
+                'id': faker.uuid4(),
+                'request_id': faker.uuid4(),
+                'entity_geid': faker.uuid4(),
+                'entity_type': 'file',
+                'review_status': 'approved',
+                'parent_geid': None,
+                'copy_status': 'pending',
+                'name': faker.word(),
+            }
+        )
+
+        entity = ApprovalEntity.from_row(row)
+
+        assert entity.entity_geid == row._mapping['entity_geid']
+        assert entity.is_approved_for_copy
+
+    def test_from_row_converts_enum_columns(self, mocker, faker):
+        row = mocker.Mock(
+            _mapping={
+                'id': faker.uuid4(),
+                'request_id': faker.uuid4(),
+                'entity_geid': faker.uuid4(),
+                'entity_type': 'folder',
+                'review_status': 'denied',
+                'parent_geid': None,
+                'copy_status': None,
+                'name': faker.word(),
+            }
+        )
+
+        entity = ApprovalEntity.from_row(row)
+
+        assert entity.entity_type is EntityType.FOLDER
+        assert entity.review_status is ReviewStatus.DENIED
+        assert entity.copy_status is None
+
+
+@pytest.fixture
+def create_entity(faker):
+    def _create_entity(entity_geid, parent_geid=None, entity_type=EntityType.FOLDER):
+        return ApprovalEntity(
+            id=faker.uuid4(),
+            entity_geid=entity_geid,
+            entity_type=entity_type,
+            parent_geid=parent_geid,
+            name=entity_geid,
+        )
+
+    return _create_entity
+
+
+@pytest.fixture
+def approval_entities(create_entity):
+    entities = [
+        create_entity('root'),
+        create_entity('a', 'root'),
+        create_entity('b', 'a'),
+        create_entity('file-1', 'b', EntityType.FILE),
+        create_entity('file-2', 'b', EntityType.FILE),
+    ]
+    yield ApprovalEntities({entity.entity_geid: entity for entity in entities})
+
+
+class TestApprovalEntities:
+    def test_get_top_parent_geid_returns_top_most_folder(self, approval_entities):
+        assert approval_entities.get_top_parent_geid('b') == 'root'
+        assert approval_entities.get_top_parent_geid('a') == 'root'
+
+    def test_get_top_parent_geid_returns_same_geid_for_file_or_unknown_entity(self, approval_entities):
+        assert approval_entities.get_top_parent_geid('file-1') == 'file-1'
+        assert approval_entities.get_top_parent_geid('unknown') == 'unknown'
+
+    def test_get_top_parent_geid_stops_at_cycle(self, create_entity):
+        approval_entities = ApprovalEntities({'a': create_entity('a', 'b'), 'b': create_entity('b', 'a')})
+
+        assert approval_entities.get_top_parent_geid('a') == 'a'
+
+    def test_get_path_until_top_parent_returns_parent_folders(self, approval_entities):
+        path = approval_entities.get_path_until_top_parent(approval_entities['file-1'])
+
+        assert str(path) == 'root/a/b'
+
+    def test_get_path_until_top_parent_reuses_path_of_siblings(self, approval_entities):
+        approval_entities.get_path_until_top_parent(approval_entities['file-1'])
+        # the parents are not looked up again once the path of their folder is known
+        del approval_entities['a']
+
+        path = approval_entities.get_path_until_top_parent(approval_entities['file-2'])
+        path.pop(0)
+
+        assert str(approval_entities.get_path_until_top_parent(approval_entities['file-2'])) == 'root/a/b'
+
+    def test_get_path_until_top_parent_returns_empty_path_for_top_entity(self, approval_entities):
+        assert approval_entities.get_path_until_top_parent(approval_entities['root']) == []
+
+    def test_get_path_until_top_parent_stops_at_folder_with_empty_parent(self, create_entity):
+        entities = [create_entity('root', ''), create_entity('a', 'root'), create_entity('file', 'a', EntityType.FILE)]
+        approval_entities = ApprovalEntities({entity.entity_geid: entity for entity in entities})
+
+        path = approval_entities.get_path_until_top_parent(approval_entities['file'])
+
+        assert str(path) == 'root/a'
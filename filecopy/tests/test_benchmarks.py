@@ -0,0 +1,89 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import pytest
+
+from benchmarks import bench_locks
+from benchmarks.bench_folder_copy import format_result
+from benchmarks.bench_folder_copy import parse_latency
+from benchmarks.bench_folder_copy import run
+from benchmarks.fakes import PrefixLockTable
+
+
+class TestFolderCopyBenchmark:
+    def test_run_copies_all_files_of_synthetic_tree(self):
+        result = run(width=2, depth=1, files=3, file_size=1024, workers=4, metadata_workers=2)
+
+        assert result['folders'] == 3
+        assert result['files'] == 9
+        assert result['copied'] == 9
+        assert result['calls']['minio'] == 18
+        assert result['calls']['cataloguing'] == 9
+        assert len(format_result(result)) == 2
+
+    def test_parse_latency_converts_milliseconds_to_seconds(self):
+        assert parse_latency('neo4j=20') == {'neo4j': 0.02}
+
+
+class TestPrefixLockTable:
+    def test_node_locks_only_conflict_on_the_same_key(self):
+        locks = PrefixLockTable()
+
+        locks.lock('core-code/folder', 'write')
+        locks.lock('core-code/folder/file', 'write')
+
+        with pytest.raises(Exception, match='already in used'):
+            locks.lock('core-code/folder', 'read')
+
+    def test_subtree_lock_conflicts_with_locks_below_and_above_it(self):
+        locks = PrefixLockTable()
+        locks.lock('core-code/folder/sub/file', 'read')
+
+        locks.lock('core-code/folder', 'subtree_read')
+        with pytest.raises(Exception, match='already in used'):
+            locks.lock('core-code/folder', 'subtree_write')
+        with pytest.raises(Exception, match='already in used'):
+            locks.lock('core-code/folder/other', 'intent_write')
+
+    def test_intent_locks_are_shared(self):
+        locks = PrefixLockTable()
+
+        locks.lock('core-code', 'intent_write')
+        locks.lock('core-code', 'intent_read')
+        locks.lock('core-code/a', 'subtree_write')
+        locks.unlock('core-code/a', 'subtree_write')
+
+        assert len(locks) == 2
+        with pytest.raises(Exception, match='already in used'):
+            locks.lock('core-code', 'subtree_read')
+
+
+class TestLockBenchmark:
+    def test_concurrent_jobs_never_hold_conflicting_nodes(self):
+        results = {
+            mode: bench_locks.run(mode, jobs=8, width=2, depth=2, files=2, hold_time=0.001, lock_workers=4)
+            for mode in bench_locks.MODES
+        }
+
+        for result in results.values():
+            assert result['violations'] == 0
+            assert result['left_locks'] == 0
+            assert result['acquired'] + result['rejected'] == 8
+        assert results['hierarchical']['requests'] < results['node']['requests']
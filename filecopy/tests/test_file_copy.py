@@ -0,0 +1,136 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import json
+
+import pytest
+
+from scripts.file_copy import FileCopier
+from scripts.file_copy import read_manifest
+from scripts.models import ResourceType
+from scripts.services.approval.models import CopyStatus
+
+
+@pytest.fixture(autouse=True)
+def logger_info(mocker):
+    yield mocker.patch('scripts.file_copy.logger_info')
+
+
+@pytest.fixture
+def file_copier(mocker):
+    mocker.patch('scripts.file_copy.Minio_Client_')
+    yield FileCopier('project', 'admin', None, {'at': '', 'rt': ''})
+
+
+class TestFileCopier:
+    def test_copy_files_reports_result_of_every_file(self, mocker, file_copier):
+        mocker.patch.object(
+            file_copier, 'copy_file', side_effect=[{'versioning': 'version'}, ValueError('Destination is missing')]
+        )
+
+        results = file_copier.copy_files([('admin/a.txt', 'admin/a.txt'), ('admin/b.txt', 'admin/b.txt')])
+
+        assert results == [
+            {'input_path': 'admin/a.txt', 'output_path': 'admin/a.txt', 'status': 'SUCCEED', 'versioning': 'version'},
+            {'input_path': 'admin/b.txt', 'status': 'FAILED', 'error': 'Destination is missing'},
+        ]
+
+    def test_copy_files_buffers_copy_status_updates_until_all_files_are_copied(self, mocker, file_copier):
+        approval_service_client = mocker.Mock()
+        approval_entity = mocker.Mock(id='entity-id')
+        file_copier.approval_service_client = approval_service_client
+
+        def copy_file(input_path, output_path):
+            file_copier.update_copy_status(approval_entity)
+            approval_service_client.update_copy_status_bulk.assert_not_called()
+            return {'versioning': None, 'output_path': output_path}
+
+        mocker.patch.object(file_copier, 'copy_file', side_effect=copy_file)
+
+        file_copier.copy_files([('admin/a.txt', None), ('admin/b.txt', None)])
+
+        approval_service_client.update_copy_status_bulk.assert_called_once_with(
+            ['entity-id', 'entity-id'], CopyStatus.COPIED
+        )
+        approval_service_client.update_copy_status.assert_not_called()
+
+    def test_minio_client_is_created_once_for_all_files(self, mocker):
+        minio_client = mocker.patch('scripts.file_copy.Minio_Client_')
+        file_copier = FileCopier('project', 'admin', None, {'at': '', 'rt': ''})
+        mocker.patch('scripts.file_copy.copy_object_single_file', return_value={'versioning': None})
+        mocker.patch.object(file_copier, 'source_check')
+        mocker.patch.object(file_copier, 'destination_check')
+        file_copier.destination_check.get_folder.return_value.is_archived = False
+        file_copier.destination_check.is_file_exists.return_value = False
+        mocker.patch('scripts.file_copy.lock_resource')
+        mocker.patch('scripts.file_copy.unlock_resource')
+
+        results = file_copier.copy_files([('admin/a.txt', 'admin/a.txt'), ('admin/b.txt', 'admin/b.txt')])
+
+        assert [result['status'] for result in results] == ['SUCCEED', 'SUCCEED']
+        minio_client.assert_called_once()
+
+    def test_copy_file_reuses_nodes_fetched_for_approved_input_paths(self, mocker, file_copier, create_node):
+        input_node = create_node(labels=['Greenroom', ResourceType.FILE], archived=False)
+        input_node['display_path'] = 'admin/a.txt'
+        archived_node = create_node(labels=['Greenroom', ResourceType.FILE], archived=True)
+        archived_node['display_path'] = 'admin/b.txt'
+        file_copier.approved_approval_entities = {
+            'a': mocker.Mock(entity_geid=input_node.geid),
+            'b': mocker.Mock(entity_geid=archived_node.geid),
+        }
+        nodes = {input_node.geid: input_node, archived_node.geid: archived_node}
+        mocker.patch('scripts.file_copy.get_resource_by_geid', side_effect=lambda geid: nodes[geid])
+        get_file = mocker.patch.object(file_copier.source_check, 'get_file', return_value=None)
+
+        input_paths = file_copier.get_approved_input_paths()
+
+        assert input_paths == ['admin/a.txt', 'admin/b.txt']
+        assert file_copier.get_input_node('admin/a.txt') == input_node
+        get_file.assert_not_called()
+        with pytest.raises(ValueError, match='is not found in the database'):
+            file_copier.get_input_node('admin/b.txt')
+        get_file.assert_called_once_with('project', 'gr-project/admin/b.txt')
+
+    def test_create_approved_output_path_places_file_under_request_destination(self, mocker, file_copier):
+        approval_entity = mocker.Mock()
+        approval_entity.name = 'a.txt'
+        file_copier.approval_entities = mocker.Mock()
+        file_copier.approval_entities.get_path_until_top_parent.return_value = 'folder/sub'
+        file_copier.approval_request_destination = {'display_path': 'admin/destination'}
+        create_path = mocker.patch.object(file_copier.destination_check, 'create_path')
+        lock_resource = mocker.patch('scripts.file_copy.lock_resource')
+        unlock_resource = mocker.patch('scripts.file_copy.unlock_resource')
+
+        output_path, destination_folder = file_copier.create_approved_output_path(approval_entity)
+
+        assert output_path == 'admin/destination/folder/sub/a.txt'
+        assert destination_folder == create_path.return_value
+        lock_resource.assert_called_once_with('core-project/admin/destination/folder/sub', 'write')
+        unlock_resource.assert_called_once_with('core-project/admin/destination/folder/sub', 'write')
+
+
+def test_read_manifest_returns_input_and_output_paths(tmp_path):
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(
+        json.dumps([{'input_path': 'admin/a.txt', 'output_path': 'admin/b.txt'}, {'input_path': 'admin/c.txt'}])
+    )
+
+    assert read_manifest(str(manifest)) == [('admin/a.txt', 'admin/b.txt'), ('admin/c.txt', None)]
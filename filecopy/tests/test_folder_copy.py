@@ -20,6 +20,16 @@
 
 from pathlib import Path
 
+import pytest
+
+from scripts.folder_copy import CopyObjects
+from scripts.folder_copy import plan_copy
+from scripts.folder_copy import recursive_lock
+from scripts.journal import JournalStatus
+from scripts.models import ResourceType
+from scripts.services.approval.models import CopyStatus
+from scripts.tree import TreeSnapshot
+
 
 class TestDuplicatedFileNames:
     def test_add_stores_filename_with_timestamp_for_given_filepath(self, duplicated_files, faker):
@@ -45,3 +55,225 @@ class TestDuplicatedFileNames:
         received_filename = duplicated_files.get(filepath, expected_filename)
 
         assert received_filename == expected_filename
+
+
+class TestCopyObjects:
+    def test_copy_one_node_submits_file_node_to_executor(self, mocker, create_node):
+        executor = mocker.Mock()
+        copy_objects = CopyObjects(mocker.Mock(), mocker.Mock(), destination_check=mocker.Mock(), executor=executor)
+        node = create_node(labels=[ResourceType.FILE], archived=False)
+        parent_node = create_node(labels=[ResourceType.FOLDER], archived=False)
+
+        copy_objects.copy_one_node(node, 'admin/folder', parent_node)
+
+        executor.submit.assert_called_once_with(copy_objects.copy_file_node, node, 'admin/folder', parent_node)
+
+    def test_copy_one_node_skips_archived_file_node(self, mocker, create_node):
+        executor = mocker.Mock()
+        copy_objects = CopyObjects(mocker.Mock(), mocker.Mock(), destination_check=mocker.Mock(), executor=executor)
+        node = create_node(labels=[ResourceType.FILE], archived=True)
+
+        copy_objects.copy_one_node(node, 'admin/folder', create_node())
+
+        executor.submit.assert_not_called()
+
+    def test_copy_file_object_queues_metadata_creation_to_metadata_offload(self, mocker, create_node):
+        metadata_offload = mocker.Mock()
+        mocker.patch('scripts.folder_copy.copy_file_object', return_value='version')
+        copy_objects = CopyObjects(
+            mocker.Mock(), mocker.Mock(), destination_check=mocker.Mock(), metadata_offload=metadata_offload
+        )
+        node = create_node()
+        new_node = create_node()
+
+        copy_objects.copy_file_object(node, new_node)
+
+        metadata_offload.submit.assert_called_once_with(copy_objects.finish_file_node, node, new_node, 'version')
+
+    def test_copy_one_node_skips_file_node_finished_by_previous_run(self, mocker, create_node, journal):
+        executor = mocker.Mock()
+        copy_objects = CopyObjects(
+            mocker.Mock(), mocker.Mock(), destination_check=mocker.Mock(), executor=executor, journal=journal
+        )
+        node = create_node(labels=[ResourceType.FILE], archived=False)
+        journal.record(node.geid, JournalStatus.DONE, 'destination', node.name)
+
+        copy_objects.copy_one_node(node, 'admin/folder', create_node())
+
+        executor.submit.assert_not_called()
+
+    def test_copy_one_node_counts_file_node_finished_by_previous_run_as_resumed(self, mocker, create_node, journal):
+        progress = mocker.Mock()
+        copy_objects = CopyObjects(
+            mocker.Mock(), mocker.Mock(), destination_check=mocker.Mock(), journal=journal, progress=progress
+        )
+        node = create_node(labels=[ResourceType.FILE], archived=False)
+        node['file_size'] = 10
+        journal.record(node.geid, JournalStatus.DONE, 'destination', node.name)
+
+        copy_objects.copy_one_node(node, 'admin/folder', create_node())
+
+        progress.add_file.assert_called_once_with(10, resumed=True)
+
+    def test_copy_one_node_resumes_file_node_started_by_previous_run(self, mocker, create_node, journal):
+        copy_objects = CopyObjects(mocker.Mock(), mocker.Mock(), destination_check=mocker.Mock(), journal=journal)
+        node = create_node(labels=[ResourceType.FILE], archived=False)
+        new_node = create_node(labels=[ResourceType.FILE])
+        journal.record(node.geid, JournalStatus.CREATED, new_node.geid, new_node.name)
+        mocker.patch('scripts.folder_copy.get_resource_by_geid', return_value=new_node)
+        copy_file_object = mocker.patch.object(copy_objects, 'copy_file_object')
+        copy_file_node = mocker.patch.object(copy_objects, 'copy_file_node')
+
+        copy_objects.copy_one_node(node, 'admin/folder', create_node())
+
+        copy_file_object.assert_called_once_with(node, new_node)
+        copy_file_node.assert_not_called()
+
+    def test_failed_object_copy_is_redone_when_job_is_resumed(self, mocker, create_node, journal):
+        minio_client = mocker.Mock()
+        minio_client.client.stat_object.return_value.size = 1
+        minio_client.copy_object.side_effect = ConnectionError('minio is down')
+        node = create_node(labels=[ResourceType.FILE], archived=False)
+        node['location'] = 'minio://http://minio/gr-code/admin/file.txt'
+        new_node = create_node(labels=[ResourceType.FILE])
+        new_node['location'] = 'minio://http://minio/core-code/admin/file.txt'
+        mocker.patch('scripts.folder_copy.create_node_with_parent', return_value=(new_node, None))
+        mocker.patch('scripts.folder_copy.get_resource_by_geid', return_value=new_node)
+        copy_objects = CopyObjects(
+            minio_client,
+            mocker.Mock(),
+            destination_check=mocker.Mock(),
+            journal=journal,
+            metadata_offload=mocker.Mock(),
+        )
+        mocker.patch.object(copy_objects, 'get_file_node_attribute')
+
+        with pytest.raises(ConnectionError, match='minio is down'):
+            copy_objects.copy_file_node(node, 'admin', create_node())
+
+        assert journal.get(node.geid).status == JournalStatus.CREATED
+
+        minio_client.copy_object.side_effect = None
+        minio_client.copy_object.return_value.version_id = 'version'
+        resumed_copy_objects = CopyObjects(
+            minio_client,
+            mocker.Mock(),
+            destination_check=mocker.Mock(),
+            journal=journal,
+            metadata_offload=mocker.Mock(),
+        )
+
+        resumed_copy_objects.copy_one_node(node, 'admin', create_node())
+
+        assert minio_client.copy_object.call_count == 2
+        assert journal.get(node.geid) == (node.geid, JournalStatus.COPIED, new_node.geid, new_node.name, 'version')
+
+    def test_finish_file_node_records_node_as_done(self, mocker, create_node, journal):
+        copy_objects = CopyObjects(mocker.Mock(), mocker.Mock(), destination_check=mocker.Mock(), journal=journal)
+        mocker.patch.object(copy_objects, 'create_file_metadata')
+        node = create_node()
+        new_node = create_node()
+
+        copy_objects.finish_file_node(node, new_node, 'version')
+
+        assert journal.get(node.geid) == (node.geid, JournalStatus.DONE, new_node.geid, new_node.name, 'version')
+
+    def test_finish_file_node_queues_copy_status_to_updater(self, mocker, create_node):
+        node = create_node()
+        approval_entity = mocker.Mock()
+        approval_service_client = mocker.Mock()
+        copy_status_updater = mocker.Mock()
+        copy_objects = CopyObjects(
+            mocker.Mock(),
+            mocker.Mock(),
+            destination_check=mocker.Mock(),
+            approved_entities={node.geid: approval_entity},
+            approval_service_client=approval_service_client,
+            copy_status_updater=copy_status_updater,
+        )
+        mocker.patch.object(copy_objects, 'create_file_metadata')
+
+        copy_objects.finish_file_node(node, create_node(), 'version')
+
+        copy_status_updater.update_copy_status.assert_called_once_with(approval_entity, CopyStatus.COPIED)
+        approval_service_client.update_copy_status.assert_not_called()
+
+    def test_copy_one_node_queues_copy_status_of_file_node_finished_by_previous_run(
+        self, mocker, create_node, journal
+    ):
+        node = create_node(labels=[ResourceType.FILE], archived=False)
+        approval_entity = mocker.Mock()
+        copy_status_updater = mocker.Mock()
+        copy_objects = CopyObjects(
+            mocker.Mock(),
+            mocker.Mock(),
+            destination_check=mocker.Mock(),
+            approved_entities={node.geid: approval_entity},
+            approval_service_client=mocker.Mock(),
+            journal=journal,
+            copy_status_updater=copy_status_updater,
+        )
+        journal.record(node.geid, JournalStatus.DONE, 'destination', node.name)
+
+        copy_objects.copy_one_node(node, 'admin/folder', create_node())
+
+        copy_status_updater.update_copy_status.assert_called_once_with(approval_entity, CopyStatus.COPIED)
+
+
+class TestRecursiveLock:
+    def test_file_copied_by_previous_run_keeps_destination_name(self, mocker, create_node, journal):
+        node = create_node(labels=[ResourceType.FILE], archived=False)
+        node['display_path'] = f'admin/{node.name}'
+        node['uploader'] = 'admin'
+        journal.record(node.geid, JournalStatus.DONE, 'destination', 'file_renamed.txt')
+        destination_check = mocker.Mock()
+        lock_set = mocker.Mock()
+
+        recursive_lock(lock_set, 'code', TreeSnapshot.fetch([node], 'admin'), None, destination_check, journal)
+
+        destination_check.is_file_exists.assert_not_called()
+        lock_set.acquire.assert_called_once_with(
+            [(f'gr-code/admin/{node.name}', 'read'), ('core-code/admin/file_renamed.txt', 'write')]
+        )
+
+    def test_hierarchical_mode_locks_source_and_destination_subtrees(self, mocker, create_node):
+        folder = create_node(labels=[ResourceType.FOLDER], archived=False)
+        folder.update({'display_path': f'admin/{folder.name}', 'uploader': 'admin'})
+        files = [create_node(labels=[ResourceType.FILE], archived=False) for _ in range(3)]
+        for node in files:
+            node.update({'display_path': f'admin/{folder.name}/{node.name}', 'uploader': 'admin'})
+        tree = TreeSnapshot.fetch([folder], 'admin', get_children=lambda geid: files)
+        destination_check = mocker.Mock()
+        destination_check.is_file_exists.return_value = False
+        lock_set = mocker.Mock()
+
+        recursive_lock(lock_set, 'code', tree, None, destination_check, hierarchical=True)
+
+        lock_set.acquire.assert_called_once_with(
+            [
+                ('core-code', 'intent_write'),
+                ('gr-code', 'intent_read'),
+                ('core-code/admin', 'intent_write'),
+                ('gr-code/admin', 'intent_read'),
+                (f'core-code/admin/{folder.name}', 'subtree_write'),
+                (f'gr-code/admin/{folder.name}', 'subtree_read'),
+            ]
+        )
+
+
+class TestPlanCopy:
+    def test_plan_copy_counts_tree_without_modifying_anything(self, mocker, create_node):
+        folder = create_node(labels=[ResourceType.FOLDER], archived=False)
+        folder.update({'display_path': f'admin/{folder.name}', 'uploader': 'admin'})
+        files = [create_node(labels=[ResourceType.FILE], archived=False) for _ in range(2)]
+        for i, node in enumerate(files):
+            node.update({'display_path': f'admin/{folder.name}/{node.name}', 'uploader': 'admin', 'file_size': i + 1})
+        tree = TreeSnapshot.fetch([folder], 'admin', get_children=lambda geid: files)
+        destination_check = mocker.Mock()
+        destination_check.is_file_exists.side_effect = [True, False]
+
+        report = plan_copy('code', tree, None, destination_check)
+
+        assert (report.files, report.folders, report.total_bytes) == (2, 1, 3)
+        assert report.collisions == [f'core-code/admin/{folder.name}/{files[0].name}']
+        destination_check.add_node.assert_not_called()
@@ -0,0 +1,135 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import pytest
+
+from scripts.folder_move import check_removed_objects
+from scripts.folder_move import delete_execute
+from scripts.folder_move import DeleteObjects
+from scripts.folder_move import plan_delete
+from scripts.models import ResourceType
+from scripts.plan import DATA
+from scripts.plan import MINIO
+from scripts.tree import TreeSnapshot
+
+
+class TestCheckRemovedObjects:
+    def test_passes_when_all_objects_are_removed(self, mocker):
+        mocker.patch('scripts.folder_move.logger_info')
+
+        check_removed_objects(mocker.Mock(removed=2, errors=[]))
+
+    def test_raises_exception_when_some_objects_are_not_removed(self, mocker):
+        logger_info = mocker.patch('scripts.folder_move.logger_info')
+        object_remover = mocker.Mock(removed=1, errors=[('gr-code', 'admin/file.txt', 'AccessDenied: denied')])
+
+        with pytest.raises(Exception, match='Unable to remove 1 objects from minio'):
+            check_removed_objects(object_remover)
+
+        logger_info.assert_any_call('Unable to remove object gr-code/admin/file.txt: AccessDenied: denied')
+
+
+class TestDeleteObjects:
+    def test_recursive_delete_submits_file_nodes_to_executor(self, mocker, create_node):
+        executor = mocker.Mock()
+        delete_objects = DeleteObjects(mocker.Mock(), mocker.Mock(), executor=executor)
+        node = create_node(labels=[ResourceType.FILE], archived=False)
+        parent_node = create_node(labels=[ResourceType.FOLDER], archived=False)
+
+        delete_objects.recursive_delete([node], 'admin', parent_node, new_name='file')
+
+        executor.submit.assert_called_once_with(delete_objects.delete_file_node, node, 'admin', parent_node, 'file')
+
+    def test_recursive_delete_defers_folder_archiving_until_archive_folder_nodes(self, mocker, create_node):
+        metadata_offload = mocker.Mock()
+        mocker.patch('scripts.folder_move.create_folder_node', return_value=(create_node(), None))
+        delete_objects = DeleteObjects(
+            mocker.Mock(), mocker.Mock(), executor=mocker.Mock(), metadata_offload=metadata_offload
+        )
+        folder = create_node(labels=[ResourceType.FOLDER], archived=False)
+        subfolder = create_node(labels=[ResourceType.FOLDER], archived=False)
+        children = {folder.geid: [subfolder], subfolder.geid: []}
+        mocker.patch.object(delete_objects, 'get_children_nodes', side_effect=lambda node: children[node.geid])
+        finish_folder_node = mocker.patch.object(delete_objects, 'finish_folder_node')
+
+        delete_objects.recursive_delete([folder], 'admin', create_node())
+
+        metadata_offload.submit.assert_not_called()
+        finish_folder_node.assert_not_called()
+
+        delete_objects.archive_folder_nodes()
+
+        assert [call[0][0] for call in finish_folder_node.call_args_list] == [subfolder, folder]
+
+    def test_delete_file_node_queues_object_removal(self, mocker, create_node):
+        archived_file_node = mocker.patch('scripts.folder_move.archived_file_node', return_value=(create_node(), None))
+        object_remover = mocker.Mock()
+        metadata_offload = mocker.Mock()
+        delete_objects = DeleteObjects(
+            mocker.Mock(), mocker.Mock(), metadata_offload=metadata_offload, object_remover=object_remover
+        )
+        node = create_node(labels=[ResourceType.FILE], archived=False)
+
+        delete_objects.delete_file_node(node, 'admin', create_node())
+
+        assert archived_file_node.call_args[1]['object_remover'] is object_remover
+        new_node = archived_file_node.return_value[0]
+        metadata_offload.submit.assert_called_once_with(delete_objects.finish_file_node, node, new_node)
+
+
+def test_delete_execute_does_not_archive_folder_when_child_deletion_fails(mocker, create_node):
+    folder = create_node(labels=[ResourceType.FOLDER], archived=False)
+    folder.update({'display_path': f'admin/{folder.name}', 'uploader': 'admin', 'labels': ['Greenroom', 'Folder']})
+    files = [create_node(labels=[ResourceType.FILE], archived=False) for _ in range(4)]
+    for node in files:
+        node.update({'display_path': f'admin/{folder.name}/{node.name}', 'uploader': 'admin'})
+    tree = TreeSnapshot.fetch([folder], 'admin', get_children=lambda geid: files)
+    mocker.patch('scripts.folder_move.http')
+    mocker.patch('scripts.folder_move.get_resource_by_geid', return_value=folder)
+    mocker.patch('scripts.folder_move.http_query_node')
+    mocker.patch('scripts.folder_move.TreeSnapshot.fetch', return_value=tree)
+    mocker.patch('scripts.folder_move.get_geid_allocator')
+    mocker.patch('scripts.folder_move.recursive_lock', return_value=None)
+    mocker.patch('scripts.folder_move.LockSet')
+    mocker.patch('scripts.folder_move.Minio_Client_')
+    mocker.patch('scripts.folder_move.MetaDataFactory')
+    mocker.patch('scripts.folder_move.ObjectRemover', return_value=mocker.MagicMock(removed=0, errors=[]))
+    mocker.patch('scripts.folder_move.create_folder_node', return_value=(create_node(), None))
+    mocker.patch('scripts.folder_move.archived_file_node', side_effect=ConnectionError('neo4j is down'))
+    http_update_node = mocker.patch('scripts.folder_move.http_update_node')
+
+    with pytest.raises(ConnectionError, match='neo4j is down'):
+        delete_execute('job', folder.geid, 'code', 'admin', {'at': '', 'rt': ''}, workers=2, metadata_workers=2)
+
+    http_update_node.assert_not_called()
+
+
+def test_plan_delete_counts_one_object_removal_request_per_batch(create_node):
+    folder = create_node(labels=[ResourceType.FOLDER], archived=False)
+    folder.update({'display_path': f'admin/{folder.name}', 'uploader': 'admin'})
+    files = [create_node(labels=[ResourceType.FILE], archived=False) for _ in range(1001)]
+    for node in files:
+        node.update({'display_path': f'admin/{folder.name}/{node.name}', 'uploader': 'admin'})
+    tree = TreeSnapshot.fetch([folder], 'admin', get_children=lambda geid: files)
+
+    report = plan_delete(tree)
+
+    assert (report.files, report.folders) == (1001, 1)
+    assert report.calls[(DATA, MINIO)] == 2
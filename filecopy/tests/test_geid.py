@@ -0,0 +1,119 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import itertools
+import threading
+
+import pytest
+
+from scripts.geid import GeidAllocator
+
+
+@pytest.fixture
+def fetch_counter():
+    counter = itertools.count()
+    lock = threading.Lock()
+
+    def fetch():
+        with lock:
+            return f'geid-{next(counter)}'
+
+    yield fetch
+
+
+class TestGeidAllocator:
+    def test_get_returns_unique_geids(self, fetch_counter):
+        allocator = GeidAllocator(batch_size=5, fetch=fetch_counter)
+
+        geids = [allocator.get() for _ in range(23)]
+
+        assert len(set(geids)) == 23
+
+    def test_get_returns_unique_geids_for_concurrent_callers(self, fetch_counter):
+        allocator = GeidAllocator(batch_size=7, fetch=fetch_counter)
+        geids = []
+
+        def take():
+            for _ in range(20):
+                geids.append(allocator.get())
+
+        threads = [threading.Thread(target=take) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(set(geids)) == 100
+
+    def test_get_fetches_geids_in_batches(self, mocker, fetch_counter):
+        fetch = mocker.Mock(side_effect=fetch_counter)
+        allocator = GeidAllocator(batch_size=10, low_watermark=0, fetch=fetch)
+
+        allocator.get()
+
+        assert fetch.call_count == 10
+
+    def test_get_raises_refill_error_once(self):
+        fetch_results = iter([Exception('service is down')] + [f'geid-{number}' for number in range(10)])
+
+        def fetch():
+            result = next(fetch_results)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        allocator = GeidAllocator(batch_size=1, workers=1, fetch=fetch)
+
+        with pytest.raises(Exception, match='service is down'):
+            allocator.get()
+
+        assert allocator.get() == 'geid-0'
+
+    def test_prefill_sizes_refill_to_demand(self, mocker, fetch_counter):
+        fetch = mocker.Mock(side_effect=fetch_counter)
+        allocator = GeidAllocator(batch_size=50, fetch=fetch)
+
+        allocator.prefill(2)
+        geids = [allocator.get() for _ in range(2)]
+
+        assert geids == ['geid-0', 'geid-1']
+        assert fetch.call_count == 2
+
+    def test_prefill_caps_refill_at_batch_size(self, mocker, fetch_counter):
+        fetch = mocker.Mock(side_effect=fetch_counter)
+        allocator = GeidAllocator(batch_size=5, low_watermark=0, fetch=fetch)
+
+        allocator.prefill(100)
+        allocator.get()
+
+        assert fetch.call_count == 5
+
+    def test_get_keeps_geids_fetched_before_refill_error(self):
+        fetch_results = iter(['geid-0', Exception('service is down'), 'geid-1'])
+
+        def fetch():
+            result = next(fetch_results)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        allocator = GeidAllocator(batch_size=3, low_watermark=0, workers=1, fetch=fetch)
+
+        assert [allocator.get(), allocator.get()] == ['geid-0', 'geid-1']
@@ -0,0 +1,77 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import pytest
+
+from scripts.http_client import HttpClient
+
+
+@pytest.fixture
+def http_client():
+    client = HttpClient(timeout=(1, 2), timeouts={'http://neo4j/v1/': (1, 10), 'http://neo4j/v1/slow': (1, 100)})
+    yield client
+    client.close()
+
+
+class TestHttpClient:
+    def test_get_session_returns_same_session_for_one_service(self, http_client):
+        session = http_client.get_session('http://neo4j/v1/neo4j/nodes/File')
+
+        assert http_client.get_session('http://neo4j/v2/neo4j/nodes/query') is session
+        assert http_client.get_session('http://utility/v1/utility/id') is not session
+
+    def test_get_timeout_uses_longest_matching_prefix(self, http_client):
+        assert http_client.get_timeout('http://neo4j/v1/slow/query') == (1, 100)
+        assert http_client.get_timeout('http://neo4j/v1/nodes/File') == (1, 10)
+        assert http_client.get_timeout('http://utility/v1/utility/id') == (1, 2)
+
+    def test_request_uses_endpoint_timeout_unless_passed(self, http_client, mocker):
+        session = http_client.get_session('http://neo4j/v1/nodes/File')
+        request = mocker.patch.object(session, 'request', return_value=mocker.Mock(status_code=200))
+
+        http_client.post('http://neo4j/v1/nodes/File', json={})
+        http_client.post('http://neo4j/v1/nodes/File', json={}, timeout=15)
+
+        assert request.call_args_list[0] == mocker.call('POST', 'http://neo4j/v1/nodes/File', json={}, timeout=(1, 10))
+        assert request.call_args_list[1] == mocker.call('POST', 'http://neo4j/v1/nodes/File', json={}, timeout=15)
+
+    def test_configure_recreates_sessions_with_new_pool_size(self, http_client):
+        session = http_client.get_session('http://neo4j/v1/nodes/File')
+
+        http_client.configure(pool_size=64)
+        new_session = http_client.get_session('http://neo4j/v1/nodes/File')
+
+        assert new_session is not session
+        assert new_session.get_adapter('http://neo4j/')._pool_maxsize == 64
+
+    def test_configure_keeps_replaced_session_open_until_close(self, http_client, mocker):
+        session = http_client.get_session('http://neo4j/v1/nodes/File')
+        close = mocker.patch.object(session, 'close')
+
+        http_client.configure(pool_size=64)
+
+        close.assert_not_called()
+        http_client.close()
+        close.assert_called_once()
+
+    def test_get_timeout_returns_no_timeout_by_default(self):
+        http_client = HttpClient(timeouts={'http://neo4j/v1/': (1, 10)})
+
+        assert http_client.get_timeout('http://utility/v1/utility/id') is None
@@ -0,0 +1,48 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+from scripts.journal import CopyJournal
+from scripts.journal import JournalStatus
+
+
+class TestCopyJournal:
+    def test_get_returns_last_recorded_entry(self, journal):
+        journal.record('source', JournalStatus.CREATED, 'destination', 'file.txt')
+        journal.record('source', JournalStatus.COPIED, 'destination', 'file.txt', 'version')
+
+        entry = journal.get('source')
+
+        assert entry.status == JournalStatus.COPIED
+        assert entry.destination_geid == 'destination'
+        assert entry.version_id == 'version'
+
+    def test_get_returns_none_for_unknown_source(self, journal):
+        assert journal.get('source') is None
+
+    def test_entries_are_loaded_when_journal_is_reopened(self, journal):
+        journal.record('source', JournalStatus.DONE, 'destination', 'file_1.txt')
+        journal.close()
+
+        reopened = CopyJournal(journal.path)
+
+        assert len(reopened) == 1
+        assert reopened.get('source').status == JournalStatus.DONE
+        assert reopened.get('source').destination_name == 'file_1.txt'
+        reopened.close()
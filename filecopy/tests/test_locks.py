@@ -0,0 +1,145 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import pytest
+
+from benchmarks.fakes import PrefixLockTable
+from scripts.locks import get_hierarchical_keys
+from scripts.locks import LockSet
+
+
+@pytest.fixture
+def lock_set(lock_service):
+    yield LockSet(workers=4, lock=lock_service.lock, unlock=lock_service.unlock)
+
+
+class TestLockSet:
+    def test_acquire_locks_all_keys(self, lock_set, lock_service):
+        keys = [(f'gr-code/folder/file_{number}', 'read') for number in range(10)]
+
+        lock_set.acquire(keys)
+
+        assert len(lock_set) == 10
+        assert all(lock_service.is_locked(key) for key, _ in keys)
+
+    def test_acquire_skips_keys_that_are_already_held_by_the_set(self, lock_set, lock_service):
+        lock_set.acquire([('core-code/folder', 'write')])
+
+        lock_set.acquire([('core-code/folder', 'write'), ('core-code/folder', 'write')])
+
+        assert len(lock_set) == 1
+        assert lock_service.calls == 1
+
+    def test_acquire_rolls_back_all_keys_when_one_key_is_already_in_use(self, lock_set, lock_service):
+        lock_service.lock('core-code/folder/file_5', 'write')
+        keys = [(f'core-code/folder/file_{number}', 'write') for number in range(10)]
+
+        with pytest.raises(Exception, match='already in used'):
+            lock_set.acquire(keys)
+
+        assert len(lock_set) == 0
+        assert [key for key, _ in keys if lock_service.is_locked(key)] == ['core-code/folder/file_5']
+
+    def test_acquire_keeps_keys_locked_by_previous_calls_when_rolling_back(self, lock_set, lock_service):
+        lock_set.acquire([('gr-code/folder', 'read')])
+        lock_service.lock('core-code/folder', 'write')
+
+        with pytest.raises(Exception, match='already in used'):
+            lock_set.acquire([('core-code/folder', 'write')])
+
+        assert ('gr-code/folder', 'read') in lock_set
+        assert lock_service.is_locked('gr-code/folder')
+
+    def test_acquire_skips_duplicated_keys_of_large_tree(self):
+        calls = []
+        lock_set = LockSet(workers=1, lock=lambda key, operation: calls.append(key), unlock=lambda key, operation: {})
+        keys = [(f'core-code/folder/file_{number}', operation) for number in range(40000) for operation in ('r', 'w')]
+
+        lock_set.acquire(keys + keys[:1000])
+        lock_set.acquire(keys[-1000:])
+
+        assert len(lock_set) == 80000
+        assert len(calls) == 80000
+        assert keys[-1] in lock_set
+
+    def test_release_unlocks_all_keys(self, lock_set, lock_service):
+        keys = [(f'gr-code/folder/file_{number}', 'read') for number in range(10)]
+        lock_set.acquire(keys)
+
+        lock_set.release()
+
+        assert len(lock_set) == 0
+        assert not any(lock_service.is_locked(key) for key, _ in keys)
+
+    def test_release_unlocks_remaining_keys_when_one_unlock_fails(self, lock_service):
+        def unlock(resource_key, operation):
+            if resource_key == 'gr-code/folder/file_1':
+                raise Exception('unlock error')
+            return lock_service.unlock(resource_key, operation)
+
+        lock_set = LockSet(workers=4, lock=lock_service.lock, unlock=unlock)
+        keys = [(f'gr-code/folder/file_{number}', 'read') for number in range(3)]
+        lock_set.acquire(keys)
+
+        with pytest.raises(Exception, match='unlock error'):
+            lock_set.release()
+
+        assert not lock_service.is_locked('gr-code/folder/file_0')
+        assert not lock_service.is_locked('gr-code/folder/file_2')
+
+
+class TestGetHierarchicalKeys:
+    def test_subtree_is_locked_with_intent_locks_on_its_ancestors(self):
+        keys = [('core-code/admin/folder', 'write')]
+        keys += [(f'core-code/admin/folder/file_{number}', 'write') for number in range(10)]
+
+        hierarchical_keys = get_hierarchical_keys(keys)
+
+        assert hierarchical_keys == [
+            ('core-code', 'intent_write'),
+            ('core-code/admin', 'intent_write'),
+            ('core-code/admin/folder', 'subtree_write'),
+        ]
+
+    def test_read_subtree_with_write_key_below_it_is_locked_for_write(self):
+        keys = [
+            ('gr-code/admin/folder', 'read'),
+            ('gr-code/admin/folder/file', 'write'),
+            ('gr-code/admin/file', 'read'),
+        ]
+
+        hierarchical_keys = get_hierarchical_keys(keys)
+
+        assert hierarchical_keys == [
+            ('gr-code', 'intent_write'),
+            ('gr-code/admin', 'intent_write'),
+            ('gr-code/admin/file', 'subtree_read'),
+            ('gr-code/admin/folder', 'subtree_write'),
+        ]
+
+    def test_hierarchical_locks_conflict_with_node_locks_of_other_jobs(self):
+        locks = PrefixLockTable()
+        lock_set = LockSet(workers=1, lock=locks.lock, unlock=locks.unlock)
+        locks.lock('core-code/admin/folder/sub/file', 'read')
+
+        with pytest.raises(Exception, match='already in used'):
+            lock_set.acquire(get_hierarchical_keys([('core-code/admin/folder', 'write')]))
+
+        assert len(locks) == 1
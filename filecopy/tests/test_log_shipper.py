@@ -0,0 +1,130 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import threading
+
+from scripts.log_shipper import LogShipper
+
+
+class MessageCollector:
+    def __init__(self):
+        self.messages = []
+        self.lock = threading.Lock()
+
+    def __call__(self, message):
+        with self.lock:
+            self.messages.append(message)
+
+
+class TestLogShipper:
+    def test_close_sends_buffered_messages_in_one_batch(self):
+        send = MessageCollector()
+        shipper = LogShipper(send, flush_interval=60)
+
+        for i in range(3):
+            shipper.log(f'message {i}')
+        shipper.close()
+
+        assert send.messages == ['message 0\nmessage 1\nmessage 2']
+
+    def test_batch_is_sent_when_it_reaches_max_size(self):
+        send = MessageCollector()
+        shipper = LogShipper(send, max_batch_size=2, flush_interval=60)
+
+        for i in range(5):
+            shipper.log(f'message {i}')
+        shipper.close()
+
+        assert send.messages == ['message 0\nmessage 1', 'message 2\nmessage 3', 'message 4']
+
+    def test_flush_waits_until_messages_are_sent(self):
+        send = MessageCollector()
+        shipper = LogShipper(send, flush_interval=60)
+
+        shipper.log('message')
+        shipper.flush(timeout=5)
+
+        assert send.messages == ['message']
+        shipper.close()
+
+    def test_messages_over_buffer_size_are_dropped_and_reported(self):
+        started = threading.Event()
+        release = threading.Event()
+        send = MessageCollector()
+
+        def blocked_send(message):
+            started.set()
+            release.wait(5)
+            send(message)
+
+        shipper = LogShipper(blocked_send, max_batch_size=1, flush_interval=0, max_buffer_size=2)
+        shipper.log('in flight')
+        started.wait(5)
+        for i in range(4):
+            shipper.log(f'message {i}')
+        release.set()
+        shipper.close()
+
+        assert send.messages == ['in flight', 'message 0\n[2 log messages dropped]', 'message 1']
+
+    def test_send_error_does_not_stop_shipping(self):
+        send = MessageCollector()
+        calls = []
+
+        def failing_send(message):
+            calls.append(message)
+            if len(calls) == 1:
+                raise ConnectionError('data ops is down')
+            send(message)
+
+        shipper = LogShipper(failing_send, max_batch_size=1)
+        shipper.log('lost')
+        shipper.log('delivered')
+        shipper.close()
+
+        assert send.messages == ['delivered']
+
+    def test_messages_after_close_are_ignored(self):
+        send = MessageCollector()
+        shipper = LogShipper(send)
+
+        shipper.close()
+        shipper.log('message')
+
+        assert send.messages == []
+
+    def test_close_drops_messages_not_sent_within_timeout(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocked_send(message):
+            started.set()
+            release.wait(5)
+
+        shipper = LogShipper(blocked_send, max_batch_size=1, flush_interval=0)
+        shipper.log('in flight')
+        started.wait(5)
+        for i in range(3):
+            shipper.log(f'message {i}')
+
+        dropped = shipper.close(timeout=0.1)
+        release.set()
+
+        assert dropped == 3
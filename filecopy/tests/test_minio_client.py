@@ -0,0 +1,211 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import base64
+import datetime
+import json
+
+import pytest
+from minio.credentials import Credentials
+from minio.deleteobjects import DeleteError
+
+from scripts import minio_client
+from scripts.minio_client import CachedCredentialsProvider
+from scripts.minio_client import get_cached_credentials_provider
+from scripts.minio_client import get_token_subject
+from scripts.minio_client import Minio_Client_
+from scripts.minio_client import multipart_copy_object
+from scripts.minio_client import ObjectRemover
+
+
+@pytest.fixture
+def minio(mocker):
+    client = mocker.MagicMock()
+    client.stat_object.return_value = mocker.Mock(size=10, etag='source-etag')
+    client._create_multipart_upload.return_value = 'upload-id'
+    client._upload_part_copy.side_effect = lambda bucket, obj, upload_id, part_number, headers: (
+        f'etag-{part_number}',
+        None,
+    )
+    yield client
+
+
+class TestMultipartCopyObject:
+    def test_parts_cover_whole_source_object(self, minio):
+        multipart_copy_object(minio, 'core', 'dest/file', 'greenroom', 'src/file', part_size=4)
+
+        ranges = sorted(
+            (call[0][3], call[0][4]['x-amz-copy-source-range']) for call in minio._upload_part_copy.call_args_list
+        )
+        assert ranges == [(1, 'bytes=0-3'), (2, 'bytes=4-7'), (3, 'bytes=8-9')]
+
+    def test_parts_are_copied_from_source_object_version(self, minio):
+        multipart_copy_object(minio, 'core', 'dest/file', 'greenroom', 'src/file', part_size=4)
+
+        headers = minio._upload_part_copy.call_args[0][4]
+        assert headers['x-amz-copy-source'] == '/greenroom/src/file'
+        assert headers['x-amz-copy-source-if-match'] == 'source-etag'
+
+    def test_upload_is_completed_with_ordered_parts(self, minio):
+        result = multipart_copy_object(minio, 'core', 'dest/file', 'greenroom', 'src/file', part_size=4, workers=3)
+
+        bucket, obj, upload_id, parts = minio._complete_multipart_upload.call_args[0]
+        assert (bucket, obj, upload_id) == ('core', 'dest/file', 'upload-id')
+        assert [(part.part_number, part.etag) for part in parts] == [(1, 'etag-1'), (2, 'etag-2'), (3, 'etag-3')]
+        assert result is minio._complete_multipart_upload.return_value
+
+    def test_upload_is_aborted_when_part_copy_fails(self, minio):
+        minio._upload_part_copy.side_effect = ConnectionError('minio is down')
+
+        with pytest.raises(ConnectionError):
+            multipart_copy_object(minio, 'core', 'dest/file', 'greenroom', 'src/file', part_size=4)
+
+        minio._abort_multipart_upload.assert_called_once_with('core', 'dest/file', 'upload-id')
+        minio._complete_multipart_upload.assert_not_called()
+
+    def test_part_size_grows_to_stay_within_parts_limit(self, minio):
+        minio.stat_object.return_value.size = 20001
+
+        multipart_copy_object(minio, 'core', 'dest/file', 'greenroom', 'src/file', part_size=1)
+
+        parts = minio._complete_multipart_upload.call_args[0][3]
+        assert len(parts) == 6667
+
+
+class TestObjectRemover:
+    def test_objects_are_removed_in_batches_per_bucket(self, mocker, minio):
+        mocker.patch('scripts.minio_client.DeleteObject', side_effect=lambda name: name)
+        minio.remove_objects.side_effect = lambda bucket, objects: iter([])
+
+        with ObjectRemover(minio, batch_size=2) as remover:
+            for name in ('a', 'b', 'c'):
+                remover.add('core', name)
+            remover.add('greenroom', 'd')
+
+            assert minio.remove_objects.call_count == 1
+
+        batches = [call[0] for call in minio.remove_objects.call_args_list]
+        assert batches == [('core', ['a', 'b']), ('core', ['c']), ('greenroom', ['d'])]
+        assert remover.removed == 4
+
+    def test_failed_removals_are_collected(self, minio):
+        minio.remove_objects.side_effect = [
+            iter([DeleteError('AccessDenied', 'Access Denied', 'b', None)]),
+            ConnectionError('minio is down'),
+        ]
+        remover = ObjectRemover(minio, batch_size=2)
+
+        for name in ('a', 'b', 'c'):
+            remover.add('core', name)
+        remover.flush()
+
+        assert remover.removed == 1
+        assert remover.errors == [('core', 'b', 'AccessDenied: Access Denied'), ('core', 'c', 'minio is down')]
+
+    def test_batch_size_is_limited_by_s3_api(self, minio):
+        with pytest.raises(ValueError):
+            ObjectRemover(minio, batch_size=1001)
+
+
+def create_token(subject):
+    payload = base64.urlsafe_b64encode(json.dumps({'sub': subject}).encode()).decode().rstrip('=')
+    return f'Bearer header.{payload}.signature'
+
+
+def create_credentials(lifetime):
+    return Credentials('access', 'secret', 'session', datetime.datetime.utcnow() + datetime.timedelta(seconds=lifetime))
+
+
+@pytest.fixture
+def client_grants_provider(mocker):
+    provider = mocker.patch('scripts.minio_client.ClientGrantsProvider')
+    provider.return_value.retrieve.side_effect = lambda: create_credentials(3600)
+    yield provider
+
+
+@pytest.fixture
+def credentials_providers():
+    minio_client._credentials_providers.clear()
+    yield minio_client._credentials_providers
+    for provider in minio_client._credentials_providers.values():
+        if provider._timer is not None:
+            provider._timer.cancel()
+    minio_client._credentials_providers.clear()
+
+
+class TestCachedCredentialsProvider:
+    def test_retrieve_reuses_credentials_until_they_expire(self, client_grants_provider):
+        provider = CachedCredentialsProvider(lambda: {}, 'http://minio')
+
+        credentials = provider.retrieve()
+        provider._timer.cancel()
+
+        assert provider.retrieve() is credentials
+        assert provider.is_valid
+        client_grants_provider.return_value.retrieve.assert_called_once()
+
+    def test_retrieve_refreshes_expired_credentials(self, client_grants_provider):
+        client_grants_provider.return_value.retrieve.side_effect = [create_credentials(-60), create_credentials(3600)]
+        provider = CachedCredentialsProvider(lambda: {}, 'http://minio')
+
+        expired = provider.retrieve()
+        credentials = provider.retrieve()
+        provider._timer.cancel()
+
+        assert credentials is not expired
+        assert not credentials.is_expired()
+
+    def test_credentials_are_refreshed_in_background_before_expiration(self, client_grants_provider):
+        client_grants_provider.return_value.retrieve.side_effect = [create_credentials(0.2), create_credentials(3600)]
+        provider = CachedCredentialsProvider(lambda: {}, 'http://minio', refresh_margin=datetime.timedelta(0))
+
+        provider.retrieve()
+        provider._timer.join(5)
+        provider._timer.cancel()
+
+        assert client_grants_provider.return_value.retrieve.call_count == 2
+
+
+class TestGetCachedCredentialsProvider:
+    def test_provider_is_shared_by_clients_of_the_same_user(self, credentials_providers):
+        first = get_cached_credentials_provider(create_token('user'), lambda: {}, 'http://minio')
+        second = get_cached_credentials_provider(create_token('user'), lambda: {}, 'http://minio')
+        other = get_cached_credentials_provider(create_token('other'), lambda: {}, 'http://minio')
+
+        assert first is second
+        assert first is not other
+
+    def test_get_token_subject_falls_back_to_token_hash(self):
+        assert get_token_subject(create_token('user')) == 'user'
+        assert len(get_token_subject('not a jwt')) == 64
+
+
+class TestMinioClient:
+    def test_list_buckets_check_is_skipped_with_cached_credentials(
+        self, mocker, client_grants_provider, credentials_providers
+    ):
+        minio = mocker.patch('scripts.minio_client.Minio')
+        minio.return_value.list_buckets.side_effect = lambda: minio.call_args[1]['credentials'].retrieve()
+
+        Minio_Client_(create_token('user'), 'refresh')
+        Minio_Client_(create_token('user'), 'refresh')
+
+        minio.return_value.list_buckets.assert_called_once()
+        client_grants_provider.return_value.retrieve.assert_called_once()
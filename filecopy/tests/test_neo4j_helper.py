@@ -18,6 +18,12 @@
 # permissions and limitations under the Licence.
 # 
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.models import ResourceType
+
+
 class TestNeo4jPathCheck:
     def test_is_file_exists_returns_true_if_node_exists(self, path_check, mocker, create_node):
         mocker.patch.object(path_check, '_get_node', return_value=create_node())
@@ -76,3 +82,133 @@ class TestNeo4jPathCheck:
         received_response = path_check.get_file('code', 'path')
 
         assert received_response is None
+
+
+class TestNeo4jPathIndex:
+    def test_get_file_returns_node_from_listed_parent_folder(self, path_index, mocker, create_node):
+        folder = create_node(labels=['zone', ResourceType.FOLDER])
+        file = create_node(name='file.txt', labels=['zone', ResourceType.FILE], archived=False)
+        mocker.patch.object(path_index, '_get_node', return_value=folder)
+        mocker.patch('scripts.neo4j_helper.get_children_nodes', return_value=[file])
+
+        received_response = path_index.get_file('code', 'core-code/admin/folder/file.txt')
+
+        assert received_response == file
+
+    def test_get_file_lists_parent_folder_only_once(self, path_index, mocker, create_node):
+        folder = create_node(labels=['zone', ResourceType.FOLDER])
+        get_node = mocker.patch.object(path_index, '_get_node', return_value=folder)
+        get_children_nodes = mocker.patch('scripts.neo4j_helper.get_children_nodes', return_value=[])
+
+        for name in ['first.txt', 'second.txt', 'third.txt']:
+            path_index.is_file_exists('code', f'core-code/admin/folder/{name}')
+
+        assert get_node.call_count == 1
+        assert get_children_nodes.call_count == 1
+
+    def test_get_file_ignores_archived_nodes_and_nodes_from_other_zone(self, path_index, mocker, create_node):
+        folder = create_node(labels=['zone', ResourceType.FOLDER])
+        archived_file = create_node(name='archived.txt', labels=['zone', ResourceType.FILE], archived=True)
+        other_zone_file = create_node(name='other.txt', labels=['other', ResourceType.FILE], archived=False)
+        mocker.patch.object(path_index, '_get_node', return_value=folder)
+        mocker.patch('scripts.neo4j_helper.get_children_nodes', return_value=[archived_file, other_zone_file])
+
+        assert path_index.is_file_exists('code', 'core-code/admin/folder/archived.txt') is False
+        assert path_index.is_file_exists('code', 'core-code/admin/folder/other.txt') is False
+
+    def test_get_file_returns_none_when_parent_folder_does_not_exist(self, path_index, mocker):
+        mocker.patch.object(path_index, '_get_node', return_value=None)
+        get_children_nodes = mocker.patch('scripts.neo4j_helper.get_children_nodes')
+
+        received_response = path_index.get_file('code', 'core-code/admin/folder/file.txt')
+
+        assert received_response is None
+        get_children_nodes.assert_not_called()
+
+    def test_get_folder_returns_folder_registered_with_add_node(self, path_index, mocker, create_node):
+        folder = create_node(name='folder', labels=['zone', ResourceType.FOLDER], archived=False)
+        folder.update({'display_path': 'admin/folder', 'project_code': 'code'})
+        mocker.patch.object(path_index, '_get_node', return_value=create_node(labels=['zone', ResourceType.FOLDER]))
+        mocker.patch('scripts.neo4j_helper.get_children_nodes', return_value=[])
+        assert path_index.get_folder('code', 'admin/folder') is None
+
+        path_index.add_node(folder)
+
+        assert path_index.get_folder('code', 'admin/folder') == folder
+
+    def test_add_node_marks_new_folder_as_empty(self, path_index, mocker, create_node):
+        folder = create_node(name='folder', labels=['zone', ResourceType.FOLDER], archived=False)
+        folder.update({'display_path': 'admin/folder', 'project_code': 'code'})
+        get_node = mocker.patch.object(path_index, '_get_node')
+        get_children_nodes = mocker.patch('scripts.neo4j_helper.get_children_nodes')
+
+        path_index.add_node(folder)
+
+        assert path_index.is_file_exists('code', 'core-code/admin/folder/file.txt') is False
+        get_node.assert_not_called()
+        get_children_nodes.assert_not_called()
+
+    def test_concurrent_checks_of_the_same_folder_fetch_it_once(self, path_index, mocker, create_node):
+        folder = create_node(labels=['zone', ResourceType.FOLDER])
+        file = create_node(name='file.txt', labels=['zone', ResourceType.FILE], archived=False)
+        fetch_started = threading.Event()
+        release_fetch = threading.Event()
+
+        def get_children_nodes(geid):
+            fetch_started.set()
+            release_fetch.wait(5)
+            return [file]
+
+        mocker.patch.object(path_index, '_get_node', return_value=folder)
+        get_children_nodes = mocker.patch('scripts.neo4j_helper.get_children_nodes', side_effect=get_children_nodes)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            first = executor.submit(path_index.is_file_exists, 'code', 'core-code/admin/folder/file.txt')
+            fetch_started.wait(5)
+            others = [
+                executor.submit(path_index.is_file_exists, 'code', 'core-code/admin/folder/file.txt')
+                for _ in range(3)
+            ]
+            release_fetch.set()
+            results = [first.result(5), *(future.result(5) for future in others)]
+
+        assert results == [True, True, True, True]
+        assert get_children_nodes.call_count == 1
+
+    def test_fetch_does_not_block_checks_of_other_folders(self, path_index, mocker, create_node):
+        folder = create_node(name='folder', labels=['zone', ResourceType.FOLDER], archived=False)
+        folder.update({'display_path': 'admin/folder', 'project_code': 'code'})
+        fetch_started = threading.Event()
+        release_fetch = threading.Event()
+
+        def get_node(payload):
+            fetch_started.set()
+            release_fetch.wait(5)
+            return None
+
+        mocker.patch.object(path_index, '_get_node', side_effect=get_node)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(path_index.is_file_exists, 'code', 'core-code/admin/other/file.txt')
+            fetch_started.wait(5)
+            path_index.add_node(folder)
+            is_file_exists = path_index.is_file_exists('code', 'core-code/admin/folder/file.txt')
+            release_fetch.set()
+
+        assert is_file_exists is False
+        assert future.result(5) is False
+
+    def test_add_node_during_fetch_of_parent_folder_registers_node(self, path_index, mocker, create_node):
+        folder = create_node(labels=['zone', ResourceType.FOLDER])
+        file = create_node(name='file.txt', labels=['zone', ResourceType.FILE], archived=False)
+        file.update({'display_path': 'admin/folder/file.txt', 'project_code': 'code'})
+        mocker.patch.object(path_index, '_get_node', return_value=folder)
+
+        def get_children_nodes(geid):
+            # node is created after the listing was sent
+            path_index.add_node(file)
+            return []
+
+        mocker.patch('scripts.neo4j_helper.get_children_nodes', side_effect=get_children_nodes)
+
+        assert path_index.is_file_exists('code', 'core-code/admin/folder/file.txt') is True
@@ -0,0 +1,85 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import pytest
+
+from scripts.models import Node
+from scripts.plan import DATA
+from scripts.plan import format_duration
+from scripts.plan import LOCK
+from scripts.plan import METADATA
+from scripts.plan import MINIO
+from scripts.plan import NEO4J
+from scripts.plan import PlanReport
+from scripts.plan import WALK
+
+
+@pytest.fixture
+def report():
+    yield PlanReport('test', latencies={NEO4J: 1, MINIO: 1}, copy_throughput=100, lock_workers=2)
+
+
+class TestPlanReport:
+    def test_add_file_counts_large_files(self, report):
+        report.add_file(Node({'file_size': 10}))
+        report.add_file(Node({'file_size': 6 * 1024 ** 3}))
+
+        assert report.files == 2
+        assert report.large_files == 1
+        assert report.total_bytes == 6 * 1024 ** 3 + 10
+
+    def test_add_object_copy_counts_multipart_requests_for_large_files(self, report):
+        report.add_object_copy(DATA, Node({'file_size': 10}))
+        report.add_object_copy(DATA, Node({'file_size': 6 * 1024 ** 3}))
+
+        assert report.calls[(DATA, MINIO)] == 2 + 3 + 12
+
+    def test_estimate_divides_data_phase_between_workers(self, report):
+        report.add_calls(DATA, MINIO, 8)
+        report.add_file(Node({'file_size': 200}))
+
+        assert report.estimate(1) == 10
+        assert report.estimate(2) == 5
+
+    def test_estimate_runs_data_and_metadata_phases_at_the_same_time(self, report):
+        report.add_calls(LOCK, NEO4J, 4)
+        report.add_calls(WALK, NEO4J, 3)
+        report.add_calls(DATA, MINIO, 4)
+        report.add_calls(METADATA, NEO4J, 6)
+
+        assert report.estimate(2) == 2 + 3 + 3
+
+    def test_measure_replaces_default_latency(self, report):
+        report.measure(NEO4J, 3, 6)
+
+        assert report.latencies[NEO4J] == 0.5
+        assert report.measured == {NEO4J: 0.5}
+
+
+@pytest.mark.parametrize(
+    'seconds,expected',
+    [
+        (4.4, '4s'),
+        (125, '2m 05s'),
+        (3 * 3600 + 60 * 7, '3h 07m'),
+    ],
+)
+def test_format_duration(seconds, expected):
+    assert format_duration(seconds) == expected
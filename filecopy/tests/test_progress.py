@@ -0,0 +1,119 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import threading
+
+import pytest
+
+from scripts.progress import ProgressReporter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    yield FakeClock()
+
+
+class TestProgressReporter:
+    def test_get_progress_is_based_on_bytes(self, clock):
+        reporter = ProgressReporter(lambda *args: None, total_files=2, total_bytes=400, clock=clock)
+
+        reporter.add_file(100)
+
+        assert reporter.get_progress() == 25
+
+    def test_get_progress_is_based_on_files_when_size_is_unknown(self, clock):
+        reporter = ProgressReporter(lambda *args: None, total_files=4, total_bytes=0, clock=clock)
+
+        reporter.add_file(0)
+
+        assert reporter.get_progress() == 25
+
+    def test_get_status_returns_throughput_since_previous_call_and_eta(self, clock):
+        reporter = ProgressReporter(lambda *args: None, total_files=3, total_bytes=300, clock=clock)
+        clock.now = 10
+        reporter.add_file(100)
+        reporter.get_status()
+        clock.now = 20
+        reporter.add_file(50)
+
+        status = reporter.get_status()
+
+        assert status == {
+            'files_done': 2,
+            'files_total': 3,
+            'bytes_done': 150,
+            'bytes_total': 300,
+            'throughput': 5,
+            'eta': 20,
+        }
+
+    def test_get_status_excludes_resumed_files_from_throughput_and_eta(self, clock):
+        reporter = ProgressReporter(lambda *args: None, total_files=4, total_bytes=400, clock=clock)
+        reporter.start()
+        reporter.stop()
+        # files finished by previous run are found while the tree is walked after start
+        clock.now = 1
+        reporter.add_file(100, resumed=True)
+        reporter.add_file(100, resumed=True)
+        clock.now = 10
+        reporter.add_file(50)
+
+        status = reporter.get_status()
+
+        assert reporter.get_progress() == 62
+        assert status['bytes_done'] == 250
+        assert status['throughput'] == 5
+        assert status['eta'] == 30
+
+    def test_reporter_sends_progress_on_timer(self):
+        reported = threading.Event()
+        calls = []
+
+        def report(progress, status):
+            calls.append((progress, status['files_done']))
+            reported.set()
+
+        reporter = ProgressReporter(report, total_files=1, total_bytes=10, interval=0.01)
+        reporter.add_file(10)
+        with reporter:
+            assert reported.wait(5)
+
+        assert calls[-1] == (100, 1)
+
+    def test_report_error_does_not_stop_reporter(self):
+        calls = []
+
+        def report(progress, status):
+            calls.append(progress)
+            raise ConnectionError('data ops is down')
+
+        reporter = ProgressReporter(report, total_files=1, total_bytes=10)
+        reporter.send()
+        reporter.send()
+
+        assert len(calls) == 2
@@ -0,0 +1,124 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import json
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.future import create_engine
+
+from scripts.tracing import get_http_endpoint
+from scripts.tracing import get_minio_operation
+from scripts.tracing import get_sql_operation
+from scripts.tracing import LatencyHistogram
+from scripts.tracing import trace_engine
+from scripts.tracing import Tracer
+
+
+@pytest.fixture
+def tracer(mocker):
+    tracer = Tracer()
+    mocker.patch('scripts.tracing.tracer', tracer)
+    yield tracer
+
+
+class TestLatencyHistogram:
+    def test_percentile_is_within_ten_percent_of_duration(self):
+        histogram = LatencyHistogram()
+        for duration in range(1, 101):
+            histogram.add(duration / 1000)
+
+        assert 0.050 <= histogram.percentile(0.5) <= 0.055
+        assert 0.095 <= histogram.percentile(0.95) <= 0.1045
+        assert histogram.percentile(0.99) <= histogram.max == 0.1
+
+    def test_add_counts_errors(self):
+        histogram = LatencyHistogram()
+
+        histogram.add(0.1)
+        histogram.add(0.1, error=True)
+
+        assert (histogram.count, histogram.errors) == (2, 1)
+
+
+class TestTracer:
+    def test_span_records_error_of_failed_call(self, tracer):
+        with pytest.raises(ConnectionError):
+            with tracer.span('neo4j', 'POST /v1/neo4j/nodes/File'):
+                raise ConnectionError()
+
+        assert tracer.histograms[('neo4j', 'POST /v1/neo4j/nodes/File')].errors == 1
+
+    def test_close_writes_trace_and_summary_files(self, tracer, tmp_path):
+        tracer.open(str(tmp_path), 'job')
+        tracer.record('neo4j', 'GET /v1/neo4j/nodes/geid/{id}', 0, 0.2)
+        tracer.record('minio', 'PUT object copy', 0, 1.5, 'ConnectionError')
+
+        summary = tracer.close()
+
+        spans = [json.loads(line) for line in (tmp_path / 'job.trace.jsonl').read_text().splitlines()]
+        assert [span['service'] for span in spans] == ['neo4j', 'minio']
+        assert spans[1]['error'] == 'ConnectionError'
+        assert (tmp_path / 'job.summary.txt').read_text().splitlines() == summary
+        assert summary[1].startswith('minio')
+
+    def test_reset_forgets_recorded_calls(self, tracer):
+        tracer.record('neo4j', 'GET /v1/neo4j/nodes/geid/{id}', 0, 0.2)
+
+        tracer.reset()
+
+        assert tracer.histograms == {}
+        assert len(tracer.format_summary()) == 1
+
+    def test_trace_engine_records_statements(self, tracer):
+        engine = create_engine('sqlite://')
+        trace_engine(engine)
+
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+
+        assert tracer.histograms[('postgres', 'SELECT')].count == 1
+
+
+@pytest.mark.parametrize(
+    'url,expected',
+    [
+        (
+            'http://neo4j:5062/v1/neo4j/nodes/geid/0a1b2c3d-4e5f-6789-abcd-ef0123456789-1630000000',
+            'GET /v1/neo4j/nodes/geid/{id}',
+        ),
+        ('http://neo4j:5062/v1/neo4j/nodes/File/node/1234', 'GET /v1/neo4j/nodes/File/node/{id}'),
+        ('http://neo4j:5062/v1/neo4j/relations/query', 'GET /v1/neo4j/relations/query'),
+    ],
+)
+def test_get_http_endpoint_groups_urls_with_ids(url, expected):
+    assert get_http_endpoint('GET', url) == ('neo4j:5062', expected)
+
+
+def test_get_minio_operation_describes_multipart_copy():
+    operation = get_minio_operation(
+        'PUT', 'core', 'file', {'x-amz-copy-source': '/gr/file'}, {'uploadId': 'id', 'partNumber': '1'}
+    )
+
+    assert operation == 'PUT object?partNumber&uploadId copy'
+
+
+def test_get_sql_operation_returns_statement_and_table():
+    assert get_sql_operation('UPDATE approval_entity SET copy_status=%(copy_status)s') == 'UPDATE approval_entity'
@@ -0,0 +1,76 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+from scripts.models import ResourceType
+from scripts.tree import TreeSnapshot
+
+
+class TestTreeSnapshot:
+    def test_fetch_requests_children_once_for_every_folder(self, mocker, create_node):
+        root = create_node(name='root', labels=[ResourceType.FOLDER], archived=False)
+        folder = create_node(name='folder', labels=[ResourceType.FOLDER], archived=False)
+        file = create_node(name='file', labels=[ResourceType.FILE], archived=False)
+        children = {root.geid: [folder, file], folder.geid: []}
+        get_children = mocker.Mock(side_effect=lambda geid: children[geid])
+
+        TreeSnapshot.fetch([root], 'dest', get_children=get_children)
+
+        assert get_children.call_count == 2
+
+    def test_fetch_does_not_request_children_of_archived_folder(self, mocker, create_node):
+        root = create_node(labels=[ResourceType.FOLDER], archived=True)
+        get_children = mocker.Mock(return_value=[])
+
+        tree = TreeSnapshot.fetch([root], 'dest', get_children=get_children)
+
+        get_children.assert_not_called()
+        assert list(tree.walk()) == []
+
+    def test_get_destination_path_returns_folder_path_where_node_will_be_placed(self, create_node):
+        root = create_node(name='root', labels=[ResourceType.FOLDER], archived=False)
+        folder = create_node(name='folder', labels=[ResourceType.FOLDER], archived=False)
+        file = create_node(name='file', labels=[ResourceType.FILE], archived=False)
+        children = {root.geid: [folder], folder.geid: [file]}
+
+        tree = TreeSnapshot.fetch([root], 'dest', get_children=children.get)
+
+        assert tree.get_destination_path(root) == 'dest'
+        assert tree.get_destination_path(folder) == 'dest/root'
+        assert tree.get_destination_path(file) == 'dest/root/folder'
+
+    def test_get_destination_path_uses_root_name_for_root_children(self, create_node):
+        root = create_node(name='root', labels=[ResourceType.FOLDER], archived=False)
+        file = create_node(name='file', labels=[ResourceType.FILE], archived=False)
+        children = {root.geid: [file]}
+
+        tree = TreeSnapshot.fetch([root], 'dest', root_name='renamed', get_children=children.get)
+
+        assert tree.get_destination_path(file) == 'dest/renamed'
+
+    def test_walk_yields_parent_folder_before_its_children(self, create_node):
+        root = create_node(name='root', labels=[ResourceType.FOLDER], archived=False)
+        folder = create_node(name='folder', labels=[ResourceType.FOLDER], archived=False)
+        first_file = create_node(name='first', labels=[ResourceType.FILE], archived=False)
+        second_file = create_node(name='second', labels=[ResourceType.FILE], archived=False)
+        children = {root.geid: [folder, second_file], folder.geid: [first_file]}
+
+        tree = TreeSnapshot.fetch([root], 'dest', get_children=children.get)
+
+        assert [node.name for node in tree.walk()] == ['root', 'folder', 'first', 'second']
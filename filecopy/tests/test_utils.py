@@ -0,0 +1,71 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import threading
+import time
+
+import pytest
+
+from scripts.utils import ManifestCache
+
+
+@pytest.fixture
+def manifest_cache():
+    yield ManifestCache()
+
+
+class TestManifestCache:
+    def test_get_fetches_manifest_only_once(self, manifest_cache, mocker):
+        fetch = mocker.patch.object(manifest_cache, '_fetch', return_value={'name': 'manifest', 'attributes': []})
+
+        for _ in range(10):
+            manifest_cache.get(1)
+
+        fetch.assert_called_once_with(1)
+
+    def test_get_shares_one_fetch_between_concurrent_callers(self, manifest_cache, mocker):
+        def slow_fetch(manifest_id):
+            time.sleep(0.05)
+            return {'name': 'manifest', 'attributes': []}
+
+        fetch = mocker.patch.object(manifest_cache, '_fetch', side_effect=slow_fetch)
+        results = []
+
+        threads = [threading.Thread(target=lambda: results.append(manifest_cache.get(1))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert fetch.call_count == 1
+        assert len(results) == 8
+
+    def test_get_fetches_manifest_again_when_previous_fetch_failed(self, manifest_cache, mocker):
+        fetch = mocker.patch.object(manifest_cache, '_fetch', side_effect=[None, {'name': 'manifest'}])
+
+        assert manifest_cache.get(1) is None
+        assert manifest_cache.get(1) == {'name': 'manifest'}
+        assert fetch.call_count == 2
+
+    def test_get_raises_fetch_exception(self, manifest_cache, mocker):
+        mocker.patch.object(manifest_cache, '_fetch', side_effect=ConnectionError('entity info is down'))
+
+        with pytest.raises(ConnectionError):
+            manifest_cache.get(1)
@@ -0,0 +1,57 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+from scripts.vr_mgr import SrvVRMgr
+from scripts.vr_mgr import VirtualFileDeletion
+
+
+class TestSrvVRMgr:
+    def test_delete_chunk_continues_after_failed_deletion(self, mocker):
+        http = mocker.patch('scripts.vr_mgr.http')
+        http.post.side_effect = lambda url, json: mocker.Mock(
+            status_code=200, json=lambda: [{'id': 1}, {'id': 2}] if json['name'] == 'a' else [{'id': 3}]
+        )
+        http.delete.side_effect = lambda url: mocker.Mock(status_code=500 if url.endswith('/1') else 200, text='')
+        manager = SrvVRMgr(mocker.Mock(NEO4J_SERVICE_V1='http://neo4j/v1/neo4j/'), workers=2)
+
+        results = manager.delete_chunk('name', ['a', 'b'])
+
+        assert [result.deleted for result in results] == [[2], [3]]
+        assert results[0].errors[0]['errorcode'] == 500
+        assert results[1].is_successful
+        assert http.delete.call_count == 3
+
+    def test_delete_vr_files_sends_unique_values_in_chunks(self, mocker):
+        manager = SrvVRMgr(mocker.Mock(), chunk_size=2)
+        delete_chunk = mocker.patch.object(
+            manager, 'delete_chunk', side_effect=lambda field, values: [VirtualFileDeletion(value) for value in values]
+        )
+
+        results = manager.delete_vr_files_by_geids(['a', 'b', 'a', 'c'])
+
+        assert [call[0][1] for call in delete_chunk.call_args_list] == [['a', 'b'], ['c']]
+        assert list(results) == ['a', 'b', 'c']
+
+    def test_delete_vr_files_by_geid_returns_first_error(self, mocker):
+        manager = SrvVRMgr(mocker.Mock())
+        result = mocker.Mock(value='a', errors=[{'errorcode': 500}, {'errorcode': 404}])
+        mocker.patch.object(manager, 'delete_chunk', return_value=[result])
+
+        assert manager.delete_vr_files_by_geid('a') == {'errorcode': 500}
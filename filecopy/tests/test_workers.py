@@ -0,0 +1,126 @@
+# Copyright 2022 Indoc Research
+# 
+# Licensed under the EUPL, Version 1.2 or – as soon they
+# will be approved by the European Commission - subsequent
+# versions of the EUPL (the "Licence");
+# You may not use this work except in compliance with the
+# Licence.
+# You may obtain a copy of the Licence at:
+# 
+# https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12
+# 
+# Unless required by applicable law or agreed to in
+# writing, software distributed under the Licence is
+# distributed on an "AS IS" basis,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied.
+# See the Licence for the specific language governing
+# permissions and limitations under the Licence.
+# 
+
+import threading
+
+import pytest
+
+from scripts.workers import BoundedExecutor
+from scripts.workers import map_concurrently
+from scripts.workers import MetadataOffload
+
+
+class TestBoundedExecutor:
+    def test_submit_runs_task_in_calling_thread_when_one_worker_is_used(self):
+        executor = BoundedExecutor(1)
+        received_threads = []
+
+        executor.submit(lambda: received_threads.append(threading.current_thread()))
+
+        assert received_threads == [threading.current_thread()]
+
+    def test_join_waits_until_all_submitted_tasks_are_finished(self):
+        executor = BoundedExecutor(4)
+        results = []
+
+        for number in range(20):
+            executor.submit(results.append, number)
+        executor.join()
+
+        assert sorted(results) == list(range(20))
+
+    def test_join_raises_first_task_exception_only_once(self):
+        executor = BoundedExecutor(2)
+
+        def fail():
+            raise ValueError('failure')
+
+        executor.submit(fail)
+
+        with pytest.raises(ValueError):
+            executor.join()
+
+        executor.raise_for_error()
+
+    def test_submit_skips_tasks_after_task_failure(self):
+        executor = BoundedExecutor(2, max_pending=1)
+        results = []
+
+        def fail():
+            raise ValueError('failure')
+
+        executor.submit(fail)
+        with pytest.raises(ValueError):
+            for number in range(10):
+                executor.submit(results.append, number)
+            executor.join()
+
+        assert len(results) < 10
+
+    def test_context_manager_keeps_original_exception(self):
+        with pytest.raises(KeyError):
+            with BoundedExecutor(2) as executor:
+                executor.submit(lambda: None)
+                raise KeyError('walker failure')
+
+    def test_new_instance_raises_value_error_when_number_of_workers_is_not_positive(self):
+        with pytest.raises(ValueError):
+            BoundedExecutor(0)
+
+
+class TestMetadataOffload:
+    def test_join_waits_until_all_queued_tasks_are_finished(self):
+        metadata_offload = MetadataOffload(3)
+        results = []
+
+        for number in range(50):
+            metadata_offload.submit(results.append, number)
+        metadata_offload.join()
+
+        assert sorted(results) == list(range(50))
+
+    def test_join_raises_task_exception(self):
+        metadata_offload = MetadataOffload(2)
+
+        def fail():
+            raise ValueError('catalog error')
+
+        metadata_offload.submit(fail)
+
+        with pytest.raises(ValueError, match='catalog error'):
+            metadata_offload.join()
+
+
+def test_map_concurrently_returns_results_in_order_of_items():
+    assert map_concurrently(lambda number: number * 2, [3, 1, 2], workers=2) == [6, 2, 4]
+
+
+def test_map_concurrently_raises_error_after_all_calls_are_finished():
+    calls = []
+
+    def call(number):
+        calls.append(number)
+        if number == 1:
+            raise ValueError('failed')
+
+    with pytest.raises(ValueError, match='failed'):
+        map_concurrently(call, [1, 2, 3], workers=2)
+
+    assert sorted(calls) == [1, 2, 3]